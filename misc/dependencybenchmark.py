@@ -0,0 +1,100 @@
+"""
+Copyright (c) 2025, salesforce.com, inc.
+All rights reserved.
+SPDX-License-Identifier: BSD-3-Clause
+For full license text, see the LICENSE file in the repo root or https://opensource.org/licenses/BSD-3-Clause
+
+Measures the memory footprint of dependency and artifact def instances, and
+the time it takes to sort and hash dependencies, the way the crawler and the
+pom generators use them.
+
+Only the public api of these classes is used, so that the output can be
+compared across pomgen versions.
+"""
+
+from crawl import buildpom
+from crawl import dependency
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+
+
+def _parse_arguments(args):
+    parser = argparse.ArgumentParser(description="Dependency Benchmark")
+    parser.add_argument("--count", type=int, required=False, default=200000,
+        help="optional - the number of dependency instances to create")
+    parser.add_argument("--repeat", type=int, required=False, default=5,
+        help="optional - how many times each timed operation runs, the best time is reported")
+    return parser.parse_args(args)
+
+
+def _new_third_party_dep(i):
+    return dependency.ThirdPartyDependency(
+        "maven", "com.group%i" % (i % 1000), "artifact-%i" % i, "1.0.%i" % i,
+        classifier="tests" if i % 7 == 0 else None,
+        scope="test" if i % 5 == 0 else None)
+
+
+def _new_artifact_def(i):
+    return buildpom.MavenArtifactDef(
+        "com.group%i" % (i % 1000), "artifact-%i" % i, "1.0.%i" % i,
+        bazel_package="projects/libs/lib%i" % i)
+
+
+def _new_monorepo_dep(i):
+    return dependency.MonorepoDependency(_new_artifact_def(i))
+
+
+def _measure_memory(new_instance, count):
+    """
+    Returns the number of bytes allocated per instance.
+    """
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    instances = [new_instance(i) for i in range(count)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # do not count the list holding the instances
+    return (after - before - sys.getsizeof(instances)) / len(instances)
+
+
+def _measure_time(operation, repeat):
+    """
+    Returns the best time, in milliseconds.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        operation()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def main(args):
+    count = args.count
+    print("Memory, bytes per instance (including attribute values):")
+    for name, new_instance in (("ThirdPartyDependency", _new_third_party_dep),
+                               ("MonorepoDependency", _new_monorepo_dep),
+                               ("MavenArtifactDef", _new_artifact_def)):
+        print("  %-22s %8.1f" % (name, _measure_memory(new_instance, count)))
+
+    deps = [_new_third_party_dep(i) for i in range(count)]
+    deps += [_new_monorepo_dep(i) for i in range(count // 10)]
+    random.Random(0).shuffle(deps)
+
+    deps_set = set(deps)
+
+    print("Time for %i dependencies, ms:" % len(deps))
+    for name, operation in (
+            ("sort", lambda: sorted(deps)),
+            ("set", lambda: set(deps)),
+            ("membership", lambda: [dep in deps_set for dep in deps]),
+            ("bazel_label_name", lambda: [dep.bazel_label_name for dep in deps]),
+            ("maven_coordinates_name", lambda: [dep.maven_coordinates_name for dep in deps])):
+        print("  %-22s %8.1f" % (name, _measure_time(operation, args.repeat)))
+
+
+if __name__ == "__main__":
+    main(_parse_arguments(sys.argv[1:]))
@@ -13,23 +13,43 @@ import os
 class Label(object):
     """
     Represents a bazel Label.
-    """
 
-    def __init__(self, name):
-        """
-        Initializes a Label with the given string label representation.
-        """
-        assert name is not None
-        name = name.strip()
-        if name.endswith("/"):
-            name = name[:-1]
+    Labels are immutable and interned: creating a Label for a label string
+    that has been seen before returns the existing instance. The components
+    of the label are parsed once, when the instance is created.
+    """
+    __slots__ = ("_name", "_repository_prefix", "_package_path", "_target",
+                 "_canonical_form", "_hash")
+
+    def __new__(cls, name):
+        """
+        Returns the Label instance for the given string label representation.
+        """
+        label = _NAME_TO_LABEL.get(name)
+        if label is None:
+            assert name is not None
+            normalized_name = name.strip()
+            if normalized_name.endswith("/"):
+                normalized_name = normalized_name[:-1]
+            label = _NAME_TO_LABEL.get(normalized_name)
+            if label is None:
+                label = super(Label, cls).__new__(cls)
+                label._parse(normalized_name)
+                # setdefault: labels may be created concurrently
+                label = _NAME_TO_LABEL.setdefault(normalized_name, label)
+            label = _NAME_TO_LABEL.setdefault(name, label)
+        return label
+
+    def _parse(self, name):
         self._name = name
-
-    @property
-    def package_path(self):
-        """
-        Returns the package of this label as a relative path.
-        """
+        self._repository_prefix = self._parse_repository_prefix()
+        self._package_path = self._parse_package_path()
+        self._target = self._parse_target()
+        target = "" if self.is_default_target else ":%s" % self._target
+        self._canonical_form = "%s//%s%s" % (self._repository_prefix, self._package_path, target)
+        self._hash = hash((self._repository_prefix, self._package_path, self._target))
+
+    def _parse_package_path(self):
         start_index = self._name.find("//")
         if start_index == -1:
             start_index = 0
@@ -45,16 +65,33 @@ class Label(object):
             path = path[:-1]
         return path
 
+    def _parse_target(self):
+        i = self._name.rfind(":")
+        if i == -1:
+            return os.path.basename(self._name)
+        return self._name[i+1:]
+
+    def _parse_repository_prefix(self):
+        if self._name.startswith("@"):
+            i = self._name.find("//")
+            if i != -1:
+                return self._name[0:i]
+        return ""
+
+    @property
+    def package_path(self):
+        """
+        Returns the package of this label as a relative path.
+        """
+        return self._package_path
+
     @property
     def target(self):
         """
         The bazel target of this label.
         For example, for "//a/b/c:foo", returns "foo".
         """
-        i = self._name.rfind(":")
-        if i == -1:
-            return os.path.basename(self._name)
-        return self._name[i+1:]
+        return self._target
 
     @property
     def is_default_target(self):
@@ -89,11 +126,7 @@ class Label(object):
         For example, for a label like "@pomgen//maven", this method returns
         "@pomgen", for "//foo/path" it returns "".
         """
-        if self._name.startswith("@"):
-           i = self._name.find("//")
-           if i != -1:
-               return self._name[0:i]
-        return ""
+        return self._repository_prefix
     
     @property
     def is_source_ref(self):
@@ -111,8 +144,7 @@ class Label(object):
 
         References to the default target are omitted.
         """
-        target = "" if self.is_default_target else ":%s" % self.target
-        return "%s//%s%s" % (self.repository_prefix, self.package_path, target)
+        return self._canonical_form
 
     def with_target(self, new_target_name):
         """
@@ -125,21 +157,32 @@ class Label(object):
         return Label("%s:%s" % (label, new_target_name))
 
     def __hash__(self):
-        return hash((self.repository_prefix, self.package_path, self.target))
+        return self._hash
 
     def __eq__(self, other):
         if other is self:
             return True
         if not isinstance(other, Label):
             return False
-        return (self.repository_prefix == other.repository_prefix and
-                self.package_path == other.package_path and
-                self.target == other.target)
+        # different label strings may refer to the same label, for example
+        # "//a/b" and "//a/b:b"
+        return (self._hash == other._hash and
+                self._repository_prefix == other._repository_prefix and
+                self._package_path == other._package_path and
+                self._target == other._target)
 
     def __ne__(self, other):
         return not self == other
 
+    def __reduce__(self):
+        # unpickled instances are interned too
+        return (Label, (self._name,))
+
     def __repr__(self):
-        return self.canonical_form
+        return self._canonical_form
 
     __str__ = __repr__
+
+
+# label string -> Label instance
+_NAME_TO_LABEL = {}
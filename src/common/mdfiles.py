@@ -11,6 +11,7 @@ of the various metadata files pomgen reads and writes.
 It also has methods to read and write those metadata files.
 """
 
+from common import outputfile
 import os
 
 
@@ -83,7 +84,10 @@ def write_file(content, root_path, package_path, md_file_name):
 
     The root_path + package_path must point to a valid directory.
 
-    Returns the path the file was written to, which can be used for logging.
+    The file is not written if it already has the specified content.
+
+    Returns the path of the file, which can be used for logging, and whether
+    the file was written, as a tuple: (path, written)
     """
     _validate_paths(root_path, package_path)
 
@@ -92,10 +96,9 @@ def write_file(content, root_path, package_path, md_file_name):
         os.mkdir(abs_md_dir_path)
     
     path = os.path.join(abs_md_dir_path, md_file_name)
-    with open(path, "w") as f:
-        f.write(content)
+    written = outputfile.write_file(path, content)
 
-    return path
+    return (path, written)
 
 
 def move_files(root_path, packages, src_md_dir_name, dest_md_dir_name):
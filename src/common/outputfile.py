@@ -0,0 +1,71 @@
+"""
+Copyright (c) 2025, salesforce.com, inc.
+All rights reserved.
+SPDX-License-Identifier: BSD-3-Clause
+For full license text, see the LICENSE file in the repo root or https://opensource.org/licenses/BSD-3-Clause
+
+
+Writes generated files, such as poms, only if their content changed.
+
+Skipping unchanged files keeps their mtime, so that tools downstream of
+pomgen (Maven's incremental build, rsync, file watchers) do not consider them
+changed. Files are written to a temporary file first, which is then renamed,
+so a file is never left half-written.
+"""
+
+import hashlib
+import os
+import uuid
+
+
+def write_file(path, content):
+    """
+    Writes the specified content (a str) to the file at the specified path,
+    unless the file already has this content.
+
+    Returns True if the file was written, False if it was left unchanged.
+    """
+    data = content.encode("utf-8")
+    if _has_content(path, data):
+        return False
+    directory, file_name = os.path.split(path)
+    tmp_path = os.path.join(directory, ".%s.%s.tmp" % (file_name, uuid.uuid4().hex))
+    # like open(), os.open applies the umask to the mode of a new file
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        mode = _get_file_mode(path)
+        if mode is not None:
+            os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return True
+
+
+def _has_content(path, data):
+    """
+    Returns True if the file at the specified path exists and has the
+    specified content: the sizes are compared first, so that the file only
+    needs to be read if they are the same.
+    """
+    try:
+        if os.stat(path).st_size != len(data):
+            return False
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).digest() == hashlib.sha256(data).digest()
+    except FileNotFoundError:
+        return False
+
+
+def _get_file_mode(path):
+    """
+    Returns the mode of the existing file at the specified path, None if
+    there is no such file.
+    """
+    try:
+        return os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,52 @@
+"""
+Copyright (c) 2025, salesforce.com, inc.
+All rights reserved.
+SPDX-License-Identifier: BSD-3-Clause
+For full license text, see the LICENSE file in the repo root or https://opensource.org/licenses/BSD-3-Clause
+
+
+Runs CPU-bound work, such as rendering poms, on a pool of processes.
+
+The worker processes are forked, so they inherit the state of the parent
+process (for example the crawled graph) instead of having it pickled: only
+the index of each item is sent to the workers, and only the results are
+sent back.
+"""
+
+import concurrent.futures
+import multiprocessing
+
+
+def parallel_map(function, items, jobs):
+    """
+    Returns the list [function(item) for item in items], in the order of the
+    items, using up to jobs processes. The results must be picklable.
+
+    The items are processed in the current process if jobs is 1, or if
+    processes cannot be forked on this platform.
+    """
+    items = list(items)
+    if jobs <= 1 or len(items) <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        return [function(item) for item in items]
+    # the initializer arguments are inherited by the forked worker processes,
+    # they are not pickled
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=min(jobs, len(items)),
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_worker, initargs=(function, items)) as executor:
+        chunksize = max(1, len(items) // (jobs * 4))
+        return list(executor.map(_run, range(len(items)), chunksize=chunksize))
+
+
+# (function, items), set in each worker process by _init_worker
+_worker_task = None
+
+
+def _init_worker(function, items):
+    global _worker_task
+    _worker_task = (function, items)
+
+
+def _run(i):
+    function, items = _worker_task
+    return function(items[i])
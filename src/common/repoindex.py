@@ -0,0 +1,155 @@
+"""
+Copyright (c) 2025, salesforce.com, inc.
+All rights reserved.
+SPDX-License-Identifier: BSD-3-Clause
+For full license text, see the LICENSE file in the repo root or https://opensource.org/licenses/BSD-3-Clause
+
+
+An in-memory index of the Maven metadata (MVN-INF) directories in the
+repository, so that the repository only has to be walked once per process.
+"""
+
+from common import logger
+from common import mdfiles
+import os
+
+
+# directories that never have any Maven metadata - skipped while walking
+PRUNED_DIR_NAMES = (".git", "node_modules",)
+PRUNED_DIR_NAME_PREFIXES = ("bazel-",)
+
+
+class RepositoryIndex:
+    """
+    Knows about all artifact packages (directories with a MVN-INF/BUILD.pom
+    file) and all library packages (directories with a MVN-INF/LIBRARY.root
+    file).
+
+    The index is built lazily: the first time a path is requested, the
+    directory tree below that path is walked and indexed. Requests for paths
+    below an indexed path are answered from memory.
+    """
+    def __init__(self, repo_root_path, verbose=False):
+        self.repo_root_path = repo_root_path
+        self.verbose = verbose
+        self._indexed_path_to_artifact_packages = {} # indexed path -> artifact packages, in walk order
+        self._library_paths = set() # library packages in indexed paths
+
+    def get_artifact_packages(self, rel_path):
+        """
+        Returns all artifact packages at or below the specified path (relative
+        to the repository root), as a list of relative paths, in the order
+        os.walk would find them.
+        """
+        rel_path = _normalize(rel_path)
+        indexed_path = self._get_indexed_path(rel_path)
+        if indexed_path is None:
+            self._index(rel_path)
+            indexed_path = rel_path
+        artifact_packages = self._indexed_path_to_artifact_packages[indexed_path]
+        return [_to_package(p) for p in artifact_packages if _is_at_or_below(p, rel_path)]
+
+    def is_library_package(self, rel_path):
+        """
+        Returns True if the specified path (relative to the repository root)
+        is a library root package.
+        """
+        rel_path = _normalize(rel_path)
+        if self._get_indexed_path(rel_path) is None:
+            return mdfiles.is_library_package(os.path.join(self.repo_root_path, rel_path))
+        return rel_path in self._library_paths
+
+    def _get_indexed_path(self, rel_path):
+        for indexed_path in self._indexed_path_to_artifact_packages.keys():
+            if _is_at_or_below(rel_path, indexed_path):
+                return indexed_path
+        return None
+
+    def _index(self, rel_path):
+        artifact_packages = []
+        library_paths = set()
+        # pre-order walk, using the same traversal order as os.walk
+        dir_paths = [rel_path]
+        while len(dir_paths) > 0:
+            dir_path = dir_paths.pop()
+            if self.verbose:
+                logger.debug("Checking for artifact package at [%s]" % dir_path)
+            try:
+                entries = list(os.scandir(os.path.join(self.repo_root_path, dir_path)))
+            except OSError:
+                # like os.walk, ignore directories that cannot be read
+                continue
+            child_dir_paths = []
+            for entry in entries:
+                if entry.name == mdfiles.MD_DIR_NAME:
+                    md_file_names = _get_file_names(entry.path)
+                    if mdfiles.BUILD_POM_FILE_NAME in md_file_names:
+                        if self.verbose:
+                            logger.debug("Found artifact package [%s]" % _to_package(dir_path))
+                        artifact_packages.append(dir_path)
+                    if mdfiles.LIB_ROOT_FILE_NAME in md_file_names:
+                        library_paths.add(dir_path)
+                elif _is_pruned(entry.name):
+                    continue
+                elif entry.is_dir(follow_symlinks=False):
+                    child_dir_paths.append(os.path.join(dir_path, entry.name))
+            dir_paths += reversed(child_dir_paths)
+
+        # the new indexed path may contain previously indexed paths
+        for indexed_path in list(self._indexed_path_to_artifact_packages.keys()):
+            if _is_at_or_below(indexed_path, rel_path):
+                del self._indexed_path_to_artifact_packages[indexed_path]
+        self._indexed_path_to_artifact_packages[rel_path] = artifact_packages
+        self._library_paths.update(library_paths)
+
+
+_REPO_ROOT_PATH_TO_INDEX = {}
+
+
+def get_repository_index(repo_root_path, verbose=False):
+    """
+    Returns the RepositoryIndex instance for the specified repository root,
+    there is a single instance per repository root and process.
+    """
+    if repo_root_path not in _REPO_ROOT_PATH_TO_INDEX:
+        _REPO_ROOT_PATH_TO_INDEX[repo_root_path] = RepositoryIndex(repo_root_path, verbose)
+    return _REPO_ROOT_PATH_TO_INDEX[repo_root_path]
+
+
+def clear():
+    """
+    Drops all RepositoryIndex instances, for example after Maven metadata
+    files have been added or removed.
+    """
+    _REPO_ROOT_PATH_TO_INDEX.clear()
+
+
+def _get_file_names(dir_path):
+    try:
+        return set([e.name for e in os.scandir(dir_path)])
+    except OSError:
+        return set()
+
+
+def _is_pruned(dir_name):
+    if dir_name in PRUNED_DIR_NAMES:
+        return True
+    for prefix in PRUNED_DIR_NAME_PREFIXES:
+        if dir_name.startswith(prefix):
+            return True
+    return False
+
+
+def _normalize(rel_path):
+    rel_path = os.path.normpath(rel_path)
+    return "" if rel_path == "." else rel_path
+
+
+def _to_package(rel_path):
+    return "." if rel_path == "" else rel_path
+
+
+def _is_at_or_below(rel_path, parent_rel_path):
+    return (parent_rel_path == "" or
+            rel_path == parent_rel_path or
+            rel_path.startswith(parent_rel_path + "/"))
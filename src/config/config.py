@@ -51,8 +51,12 @@ def load(repo_root, verbose=False):
         maven_install_paths=gen("maven_install_paths", ("maven_install.json",)),
         override_file_paths=gen("override_file_paths", ()),
         pom_base_filename=gen("pom_base_filename", "pom"),
+        maven_install_cache_dir=gen("maven_install_cache_dir", None),
         excluded_dependency_paths=crawl("excluded_dependency_paths", ()),
         excluded_dependency_labels=crawl("excluded_dependency_labels", ()),
+        dependency_discovery_mode=crawl("dependency_discovery_mode", "query", valid_values=("query", "batch_query", "offline")),
+        query_cache_dir=crawl("query_cache_dir", None),
+        crawl_cache_dir=crawl("crawl_cache_dir", None),
         excluded_src_relpaths=artifact("excluded_relative_paths", ("src/test",)),
         excluded_src_file_names=artifact("excluded_filenames", (".gitignore",)),
         excluded_src_file_extensions=artifact("excluded_extensions", (".md",)),
@@ -86,8 +90,12 @@ class Config:
                  maven_install_paths=(),
                  override_file_paths=(),
                  pom_base_filename="pom",
+                 maven_install_cache_dir=None,
                  excluded_dependency_paths=(),
                  excluded_dependency_labels=(),
+                 dependency_discovery_mode="query",
+                 query_cache_dir=None,
+                 crawl_cache_dir=None,
                  excluded_src_relpaths=(),
                  excluded_src_file_names=(),
                  excluded_src_file_extensions=(),
@@ -100,11 +108,15 @@ class Config:
         self.maven_install_paths = _to_tuple(maven_install_paths)
         self.override_file_paths = _to_tuple(override_file_paths)
         self.pom_base_filename = pom_base_filename
+        self.maven_install_cache_dir = maven_install_cache_dir
 
         # crawler
         self.excluded_dependency_paths = _add_pathsep(_to_tuple(excluded_dependency_paths))
         # stored as common.label.Label instances
         self.excluded_dependency_labels = _to_tuple_of_labels(excluded_dependency_labels)
+        self.dependency_discovery_mode = dependency_discovery_mode
+        self.query_cache_dir = query_cache_dir
+        self.crawl_cache_dir = crawl_cache_dir
 
         # artifact
         self.excluded_src_relpaths = _add_pathsep(_to_tuple(excluded_src_relpaths))
@@ -145,10 +157,14 @@ pom_template_path=%s
 maven_install_paths=%s
 override_file_paths=%s
 pom_base_filename=%s
+maven_install_cache_dir=%s
 
 [crawler]
 excluded_dependency_paths=%s
 excluded_dependency_labels=%s
+dependency_discovery_mode=%s
+query_cache_dir=%s
+crawl_cache_dir=%s
 
 [artifact]
 excluded_relative_paths=%s
@@ -161,8 +177,12 @@ change_detection_enabled=%s
        self.maven_install_paths,
        self.override_file_paths,
        self.pom_base_filename,
+       self.maven_install_cache_dir,
        self.excluded_dependency_paths,
        self.excluded_dependency_labels,
+       self.dependency_discovery_mode,
+       self.query_cache_dir,
+       self.crawl_cache_dir,
        self.excluded_src_relpaths,
        self.excluded_src_file_names,
        self.excluded_src_file_extensions,
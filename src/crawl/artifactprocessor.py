@@ -21,7 +21,12 @@ import os
 def augment_artifact_def(repo_root_path,
                          art_def,
                          source_exclusions,
-                         change_detection_enabled):
+                         change_detection_enabled,
+                         git_status=None):
+    """
+    git_status: optional git.GitStatus instance, used to check for local
+    edits. If not specified, "git status" runs for the artifact's package.
+    """
 
     # library path
     art_def.library_path = _get_library_path(repo_root_path, art_def)
@@ -40,7 +45,10 @@ def augment_artifact_def(repo_root_path,
             else:
                 # check for local edits - if found, set requires_release -
                 # this is to support a better local dev experience
-                local_edits = git.has_uncommitted_changes(repo_root_path, art_def.bazel_package, source_exclusions)
+                if git_status is None:
+                    local_edits = git.has_uncommitted_changes(repo_root_path, art_def.bazel_package, source_exclusions)
+                else:
+                    local_edits = git_status.has_uncommitted_changes(art_def.bazel_package, source_exclusions)
                 if local_edits:
                     art_def.requires_release = True
                     art_def.release_reason = releasereason.ReleaseReason.UNCOMMITTED_CHANGES
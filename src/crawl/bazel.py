@@ -11,13 +11,17 @@ Whenever possible, the code here delegates to "bazel query" to gather the
 requested data.
 """
 
+from common import label as labelm
 from common import logger
-from common import mdfiles
+from common import repoindex
 from common.os_util import run_cmd
 from collections import defaultdict
 from crawl import dependency
+from crawl import traversal
 import os
 import json
+import subprocess
+import tempfile
 
 
 def query_java_library_deps_attributes(repository_root_path, target_pattern,
@@ -56,23 +60,102 @@ def query_java_library_deps_attributes(repository_root_path, target_pattern,
     return reversed(deps)
 
 
+def query_java_library_deps_attributes_batch(repository_root_path,
+                                             target_pattern_to_dep_attributes,
+                                             verbose=False):
+    """
+    Batched version of query_java_library_deps_attributes: runs a single
+    bazel query for all specified targets, instead of one query per target.
+
+    target_pattern_to_dep_attributes is a dictionary of target_pattern ->
+    dep_attributes, see query_java_library_deps_attributes.
+
+    Returns a dictionary of target_pattern -> list of strings, the combined
+    values of the dep_attributes of that target. For each target, the
+    returned labels are ordered the way they are listed in the BUILD file,
+    attribute by attribute.
+
+    Target patterns that do not resolve to a rule are missing from the
+    returned dictionary.
+    """
+    for target_pattern in target_pattern_to_dep_attributes.keys():
+        if target_pattern.endswith("..."):
+            raise Exception("target_pattern must be more specific")
+
+    query = "set(%s)" % " ".join(target_pattern_to_dep_attributes.keys())
+    # the query file keeps us clear of command line length limits
+    with tempfile.NamedTemporaryFile("w", suffix=".query") as f:
+        f.write(query)
+        f.flush()
+        # --keep_going: a target that does not exist should not fail the
+        # query for all other targets, it is missing from the result instead
+        cmd = "bazel query --keep_going --noimplicit_deps --output=streamed_jsonproto --query_file=%s" % f.name
+        if verbose:
+            logger.debug("Running query: %s" % query)
+        try:
+            output = run_cmd(cmd, cwd=repository_root_path)
+        except subprocess.CalledProcessError as e:
+            # exit code 3: the query completed, but some targets were bad
+            if e.returncode != 3:
+                raise
+            output = e.output
+    return _parse_streamed_jsonproto_deps(output, target_pattern_to_dep_attributes)
+
+
+def _parse_streamed_jsonproto_deps(output, target_pattern_to_dep_attributes):
+    """
+    Splits the output of a "--output=streamed_jsonproto" bazel query into the
+    dependency labels of each queried target.
+    """
+    canonical_label_to_target_pattern = {}
+    for target_pattern in target_pattern_to_dep_attributes.keys():
+        canonical_form = labelm.Label(target_pattern).canonical_form
+        canonical_label_to_target_pattern[canonical_form] = target_pattern
+
+    target_pattern_to_deps = {}
+    for line in output.splitlines():
+        line = line.strip()
+        if not line.startswith("{"):
+            # log lines from tools/bazel can fall into here
+            continue
+        rule = json.loads(line).get("rule")
+        if rule is None:
+            # source files etc
+            continue
+        canonical_form = labelm.Label(rule["name"]).canonical_form
+        target_pattern = canonical_label_to_target_pattern.get(canonical_form)
+        if target_pattern is None:
+            continue
+        dep_attributes = target_pattern_to_dep_attributes[target_pattern]
+        name_to_attribute = {a["name"]: a for a in rule.get("attribute", ())}
+        deps = []
+        for attr in dep_attributes:
+            if attr in name_to_attribute:
+                deps += _get_label_list_attribute_values(name_to_attribute[attr])
+        deps = _sanitize_deps(deps)
+        target_pattern_to_deps[target_pattern] = _ensure_unique_deps(deps)
+    return target_pattern_to_deps
+
+
+def _get_label_list_attribute_values(attribute):
+    values = list(attribute.get("stringListValue", ()))
+    # configurable attributes (select) - like labels(), we return the labels
+    # of all branches
+    selector_list = attribute.get("selectorList")
+    if selector_list is not None:
+        for element in selector_list.get("elements", ()):
+            for entry in element.get("entries", ()):
+                values += entry.get("stringListValue", ())
+    return values
+
+
 def query_all_artifact_packages(repository_root_path, target_pattern, verbose=False):
     """
     Returns all packages in the specified target pattern, as a list of strings,
     that are "maven aware" packages.
     """
-    path = os.path.join(repository_root_path, target_pattern_to_path(target_pattern))
-
-    maven_artifact_packages = []
-    for rootdir, dirs, files in os.walk(path):
-        if verbose:
-            logger.debug("Checking for artifact package at [%s]" % rootdir)
-        if mdfiles.is_artifact_package(rootdir):
-            relpath = os.path.relpath(rootdir, repository_root_path)
-            if verbose:
-                logger.debug("Found artifact package [%s]" % relpath)
-            maven_artifact_packages.append(relpath)
-    return maven_artifact_packages
+    index = repoindex.get_repository_index(repository_root_path, verbose)
+    return index.get_artifact_packages(target_pattern_to_path(target_pattern))
 
 
 def query_all_libraries(repository_root_path, packages, verbose=False):
@@ -80,13 +163,13 @@ def query_all_libraries(repository_root_path, packages, verbose=False):
     Given a list of packages (directories), walks the paths up to find the root
     library directories, and returns those (without duplicates).
     """
+    index = repoindex.get_repository_index(repository_root_path, verbose)
     lib_roots = set()
     for package in packages:
         while len(package) > 0 and package != '/':
-            abs_package_path = os.path.join(repository_root_path, package)
             if verbose:
-                logger.debug("Checking path for library [%s]" % abs_package_path)
-            if mdfiles.is_library_package(abs_package_path):
+                logger.debug("Checking path for library [%s]" % package)
+            if index.is_library_package(package):
                 if verbose:
                     logger.debug("Found library [%s]" % package)
                 lib_roots.add(package)
@@ -148,9 +231,10 @@ def parse_maven_install(names_and_paths, label_to_overridden_fq_label={}, verbos
     dep_and_transitives = []
 
     # compute transitive closure for each top level dep and assemble the result
-    for dep in fq_label_to_dep.values():
+    deps = list(fq_label_to_dep.values())
+    for dep, transitives in zip(deps, _get_transitive_closures(deps)):
         unwrapped_dep = dep.dep
-        unwrapped_transitives = [t.dep for t in dep.get_transitive_closure()]
+        unwrapped_transitives = [t.dep for t in transitives]
         dep_and_transitives.append((unwrapped_dep, unwrapped_transitives,))
 
     return dep_and_transitives
@@ -337,15 +421,40 @@ def _get_alt_lookup_coords(coord_wo_vers):
     return alternate_coords
 
 
-def is_never_link_dep(repository_root_path, package):
+def query_never_link_labels(repository_root_path, labels, verbose=False):
     """
-    Check if the dependency has neverlink set to 1
+    Returns the subset of the specified labels (strings) that point to a
+    target that has neverlink set to 1, as a set of label strings in their
+    canonical form. All labels are checked using a single bazel query.
+
     java_library with neverlink set to 1 should not be considered because required only at compilation time
     Bazel ref: https://docs.bazel.build/versions/main/be/java.html#java_library.neverlink:~:text=on%20this%20target.-,neverlink,-Boolean%3B%20optional%3B%20default
     """
-    query = "bazel query 'attr('neverlink', 1, %s)'" % package
-    stdout = run_cmd(query, cwd=repository_root_path)
-    return package in stdout
+    if len(labels) == 0:
+        return set()
+    query = "attr('neverlink', 1, set(%s))" % " ".join(labels)
+    # the query file keeps us clear of command line length limits
+    with tempfile.NamedTemporaryFile("w", suffix=".query") as f:
+        f.write(query)
+        f.flush()
+        # --keep_going: labels that do not exist are not neverlink, and they
+        # should not fail the query for all other labels
+        cmd = "bazel query --keep_going --query_file=%s" % f.name
+        if verbose:
+            logger.debug("Running query: %s" % query)
+        try:
+            output = run_cmd(cmd, cwd=repository_root_path)
+        except subprocess.CalledProcessError as e:
+            # exit code 3: the query completed, but some labels were bad
+            if e.returncode != 3:
+                raise
+            output = e.output
+    never_link_labels = set()
+    for line in output.splitlines():
+        line = line.strip()
+        if line.startswith("//") or line.startswith("@"):
+            never_link_labels.add(labelm.Label(line).canonical_form)
+    return never_link_labels
 
 
 class _DepWithDirects:
@@ -359,14 +468,89 @@ class _DepWithDirects:
         self.dep = dep
         self.directs = []
 
-    def get_transitive_closure(self):
-        transitive_closure = []
-        _DepWithDirects._collect_directs(self, transitive_closure)
-        return transitive_closure
-
-    @classmethod
-    def _collect_directs(clazz, current_dep, all_deps):
-        for d in current_dep.directs:
-            if d not in all_deps:
-                all_deps.append(d)
-                _DepWithDirects._collect_directs(d, all_deps)
+
+def _get_transitive_closures(deps):
+    """
+    Returns the transitive closure of each of the specified _DepWithDirects
+    instances, as a list of lists of _DepWithDirects instances.
+
+    The deps of each transitive closure are ordered the way a depth-first,
+    pre-order traversal of the directs encounters them.
+
+    The strongly connected components of the dependency graph are computed
+    once, the closures are then built bottom-up, in reverse topological
+    order, re-using the closures of the direct deps. Only deps that are part
+    of a cycle are traversed individually.
+    """
+    # work with integer ids instead of instances
+    nodes = list(deps)
+    dep_id_to_node_id = {id(d): i for i, d in enumerate(nodes)}
+    i = 0
+    while i < len(nodes):
+        for d in nodes[i].directs:
+            if id(d) not in dep_id_to_node_id:
+                dep_id_to_node_id[id(d)] = len(nodes)
+                nodes.append(d)
+        i += 1
+    directs = [[dep_id_to_node_id[id(d)] for d in n.directs] for n in nodes]
+
+    # the closure of each node, as collected by a traversal that has already
+    # seen the node itself - this is what gets re-used by referencing nodes
+    closures = [None] * len(nodes)
+    # the closures of the requested nodes that are part of a cycle: since
+    # they have not been seen initially, the traversal may reach them again
+    cyclic_closures = {}
+    # Tarjan returns the components in reverse topological order: all deps
+    # referenced by a component are in a previously returned component
+    for component in traversal.get_strongly_connected_components(
+            range(len(directs)), directs.__getitem__):
+        if len(component) == 1 and component[0] not in directs[component[0]]:
+            node_id = component[0]
+            closure = []
+            seen = set()
+            for direct in directs[node_id]:
+                if direct not in seen:
+                    seen.add(direct)
+                    closure.append(direct)
+                    for t in closures[direct]:
+                        if t not in seen:
+                            seen.add(t)
+                            closure.append(t)
+            closures[node_id] = closure
+        else:
+            component_node_ids = set(component)
+            for node_id in component:
+                closures[node_id] = _get_cyclic_transitive_closure(
+                    node_id, directs, closures, component_node_ids,
+                    seen=set([node_id]))
+                if node_id < len(deps):
+                    cyclic_closures[node_id] = _get_cyclic_transitive_closure(
+                        node_id, directs, closures, component_node_ids,
+                        seen=set())
+
+    return [[nodes[t] for t in cyclic_closures.get(i, closures[i])] for i in range(len(deps))]
+
+
+def _get_cyclic_transitive_closure(node_id, directs, closures, component_node_ids, seen):
+    """
+    Depth-first, pre-order traversal starting at the specified node, which is
+    part of a cycle. Deps outside of the node's strongly connected component
+    are not traversed, their (already computed) closure is used instead.
+    """
+    closure = []
+    stack = [iter(directs[node_id])]
+    while len(stack) > 0:
+        direct = next(stack[-1], None)
+        if direct is None:
+            stack.pop()
+        elif direct not in seen:
+            seen.add(direct)
+            closure.append(direct)
+            if direct in component_node_ids:
+                stack.append(iter(directs[direct]))
+            else:
+                for t in closures[direct]:
+                    if t not in seen:
+                        seen.add(t)
+                        closure.append(t)
+    return closure
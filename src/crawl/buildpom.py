@@ -109,8 +109,20 @@ class MavenArtifactDef(object):
         - properties are kept read-only whenever possible
         - the constructor provides default values for easier instantiation
           in test code
+        - instances use __slots__, to keep the memory footprint of large
+          crawls down
 
     """
+    __slots__ = ("_group_id", "_artifact_id", "_version",
+                 "_pom_generation_mode", "_custom_pom_template_content",
+                 "_include_deps", "_change_detection",
+                 "_additional_change_detected_packages",
+                 "_gen_dependency_management_pom", "_jar_path", "_deps",
+                 "_version_increment_strategy_name", "_released_version",
+                 "_released_artifact_hash", "_bazel_package", "_bazel_target",
+                 "_library_path", "_requires_release", "_release_reason",
+                 "_released_pom_content", "_emitted_dependencies")
+
     def __init__(self,
                  group_id,
                  artifact_id,
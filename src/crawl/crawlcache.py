@@ -0,0 +1,210 @@
+"""
+Copyright (c) 2025, salesforce.com, inc.
+All rights reserved.
+SPDX-License-Identifier: BSD-3-Clause
+For full license text, see the LICENSE file in the repo root or https://opensource.org/licenses/BSD-3-Clause
+
+
+This module persists the outcome of crawling each bazel package across
+pomgen invocations, so that the next crawl only has to discover the
+dependencies of packages that have changed.
+
+The crawl snapshot is a single pickle file. For each crawled target, it has
+the fingerprint of the target's package and the labels the target depends
+on, which are the edges of the crawled graph. The fingerprint of a package
+combines the digest of its BUILD file (and of the .bzl files it loads), the
+digest of its BUILD.pom file and the git hash of its content. A snapshot
+written with another dependency_discovery_mode is not used, because the query
+backends do not return dependency labels in the same order.
+"""
+
+from common import label as labelm
+from common import logger
+from common import mdfiles
+from crawl import git
+from crawl import querycache
+import hashlib
+import importlib
+import os
+import pickle
+import tempfile
+import threading
+
+
+# bump this when the format of the snapshot changes
+CACHE_FORMAT_VERSION = "1"
+
+
+CACHE_FILE_NAME = "crawl.pickle"
+
+
+class CrawlCache:
+    """
+    On-disk snapshot of the dependency labels discovered for each crawled
+    target.
+
+    The snapshot is read the first time it is needed, and written by save.
+    Entries of targets that have not been crawled again are retained.
+    """
+    def __init__(self, repo_root_path, cache_dir, source_exclusions,
+                 verbose=False, dependency_discovery_mode="query"):
+        self.repo_root_path = repo_root_path
+        self.cache_dir = cache_dir
+        self.source_exclusions = source_exclusions
+        self.dependency_discovery_mode = dependency_discovery_mode
+        self.verbose = verbose
+        self._target_to_entry = None # label string -> (fingerprint, label strings)
+        self._build_file_digests = querycache.BuildFileDigests(repo_root_path)
+        self._package_to_fingerprint = {}
+        self._updated = False
+        self._lock = threading.Lock() # targets may be crawled concurrently
+
+    @property
+    def cache_file_path(self):
+        return os.path.join(self.cache_dir, CACHE_FILE_NAME)
+
+    def get(self, label):
+        """
+        Returns the dependency labels (common.label.Label instances) of the
+        specified target (common.label.Label instance), None if the snapshot
+        does not have them or if the target's package has changed.
+        """
+        with self._lock:
+            target_to_entry = self._get_target_to_entry()
+        entry = target_to_entry.get(label.canonical_form)
+        if entry is None:
+            return None
+        fingerprint, labels = entry
+        if fingerprint != self._get_fingerprint(label.package_path):
+            if self.verbose:
+                logger.debug("Package [%s] has changed since it was last crawled" % label.package_path)
+            return None
+        return [labelm.Label(lbl) for lbl in labels]
+
+    def put(self, label, labels):
+        """
+        Stores the dependency labels (common.label.Label instances) of the
+        specified target (common.label.Label instance).
+        """
+        entry = (self._get_fingerprint(label.package_path),
+                 [lbl.canonical_form for lbl in labels])
+        with self._lock:
+            target_to_entry = self._get_target_to_entry()
+            if target_to_entry.get(label.canonical_form) != entry:
+                target_to_entry[label.canonical_form] = entry
+                self._updated = True
+
+    def save(self):
+        """
+        Writes the snapshot, if it has been updated.
+        """
+        with self._lock:
+            if not self._updated:
+                return
+            snapshot = {
+                "version": CACHE_FORMAT_VERSION,
+                "key": _get_key(),
+                "dependency_discovery_mode": self.dependency_discovery_mode,
+                "targets": self._target_to_entry,
+            }
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.cache_file_path)
+            self._updated = False
+            if self.verbose:
+                logger.debug("Wrote crawl snapshot with %i targets [%s]" % (len(self._target_to_entry), self.cache_file_path))
+
+    def _get_target_to_entry(self):
+        if self._target_to_entry is None:
+            self._target_to_entry = self._load()
+        return self._target_to_entry
+
+    def _load(self):
+        try:
+            with open(self.cache_file_path, "rb") as f:
+                snapshot = pickle.load(f)
+            if snapshot.get("version") != CACHE_FORMAT_VERSION:
+                raise Exception("unexpected snapshot format version [%s]" % snapshot.get("version"))
+            if snapshot.get("key") != _get_key():
+                raise Exception("pomgen has changed")
+            if snapshot.get("dependency_discovery_mode") != self.dependency_discovery_mode:
+                raise Exception("the dependency_discovery_mode has changed")
+            target_to_entry = snapshot["targets"]
+        except Exception as e:
+            # missing, stale or unreadable snapshot
+            if self.verbose:
+                logger.debug("Not using crawl snapshot [%s]: %s" % (self.cache_file_path, e))
+            return {}
+        if self.verbose:
+            logger.debug("Loaded crawl snapshot with %i targets [%s]" % (len(target_to_entry), self.cache_file_path))
+        return target_to_entry
+
+    def _get_fingerprint(self, package_path):
+        fingerprint = self._package_to_fingerprint.get(package_path)
+        if fingerprint is None:
+            build_pom_path = os.path.join(self.repo_root_path, package_path,
+                                          mdfiles.MD_DIR_NAME,
+                                          mdfiles.BUILD_POM_FILE_NAME)
+            digest = hashlib.sha256()
+            digest.update(self._build_file_digests.get_digest(package_path).encode())
+            digest.update(b"\0")
+            digest.update(_get_file_digest(build_pom_path).encode())
+            digest.update(b"\0")
+            digest.update(git.get_dir_hash(self.repo_root_path, [package_path],
+                                           self.source_exclusions).encode())
+            fingerprint = digest.hexdigest()
+            self._package_to_fingerprint[package_path] = fingerprint
+        return fingerprint
+
+
+class _NoopCrawlCache:
+    def get(self, label):
+        return None
+
+    def put(self, label, labels):
+        pass
+
+    def save(self):
+        pass
+
+
+NOOP = _NoopCrawlCache()
+
+
+def get_crawl_cache(repo_root_path, cache_dir, source_exclusions, enabled=True,
+                    verbose=False, dependency_discovery_mode="query"):
+    """
+    Returns the CrawlCache instance to use, NOOP if the cache is disabled
+    or if no cache_dir is configured.
+    """
+    if not enabled or cache_dir is None:
+        return NOOP
+    cache_dir = os.path.join(repo_root_path, os.path.expanduser(cache_dir))
+    return CrawlCache(repo_root_path, cache_dir, source_exclusions, verbose,
+                      dependency_discovery_mode)
+
+
+# the crawl logic is part of the snapshot key, so that a snapshot written by
+# another version of pomgen is not used
+_VERSIONED_MODULE_NAMES = ("crawl.bazel", "crawl.buildpom", "crawl.crawler",
+                           "crawl.querybackend", __name__)
+
+
+def _get_key():
+    key = hashlib.sha256()
+    key.update(CACHE_FORMAT_VERSION.encode())
+    for module_name in _VERSIONED_MODULE_NAMES:
+        key.update(b"\0")
+        module = importlib.import_module(module_name)
+        key.update(_get_file_digest(module.__file__).encode())
+    return key.hexdigest()
+
+
+def _get_file_digest(path):
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return "missing"
@@ -7,16 +7,24 @@ For full license text, see the LICENSE file in the repo root or https://opensour
 
 Crawls Bazel BUILD file dependencies and builds a DAG.
 """
+from array import array
 from collections import defaultdict
 from common import label as labelm
 from common import logger
+from common import processpool
 from crawl import artifactgenctx
 from crawl import buildpom
 from crawl import dependency
 from crawl import bazel
+from crawl import crawlcache
+from crawl import pomdigestcache
 from crawl import pomparser
+from crawl import querycache
+from crawl import traversal
 from crawl.releasereason import ReleaseReason
+import concurrent.futures
 import difflib
+import threading
 
 
 class Node:
@@ -40,12 +48,12 @@ class Node:
         self.children = []
 
     def pretty_print(self):
-        self._pretty_print(self, 0)
-
-    def _pretty_print(self, node, indent):
-        print("%s%s:%s" % (' '*indent, node.artifact_def.group_id, node.artifact_def.artifact_id))
-        for child in node.children:
-            self._pretty_print(child, indent+2)
+        def pre_visit(node, parent, parent_indent):
+            indent = 0 if parent is None else parent_indent + 2
+            print("%s%s:%s" % (' '*indent, node.artifact_def.group_id, node.artifact_def.artifact_id))
+            return indent
+        traversal.walk([self], lambda node: node.children, pre_visit,
+                       memoize=False)
 
 
 class CrawlerResult:
@@ -66,16 +74,27 @@ class CrawlerResult:
 
 class Crawler:
 
-    def __init__(self, workspace, generation_strategy, pom_template, verbose=False):
+    def __init__(self, workspace, generation_strategy, pom_template,
+                 verbose=False, query_cache=querycache.NOOP, jobs=1,
+                 crawl_cache=crawlcache.NOOP,
+                 pom_digest_cache=pomdigestcache.NOOP):
         self.workspace = workspace
         self.generation_strategy = generation_strategy
         self.pom_template = pom_template
         self.verbose = verbose # verbose logging
+        self.query_cache = query_cache # persisted bazel query results
+        self.jobs = jobs # the number of packages processed concurrently
+        self.crawl_cache = crawl_cache # persisted dependency labels of crawled targets
+        self.pom_digest_cache = pom_digest_cache # persisted digests of released poms
         self.package_to_artifact = {} # bazel package -> artifact def instance
         self.library_to_artifact = defaultdict(list) # library root path -> list of its artifact def instances
         self.library_to_nodes = defaultdict(list) # library root path -> list of its DAG Node instances
         self.target_to_node = {} # label.Label -> Node for that target
         self.target_to_dependencies = {} # label.Label -> target's deps
+        self.dependency_table = dependency.DependencyTable() # interned deps, for transitive closures
+        self.target_to_queried_labels = {} # label.Label -> prefetched dep labels (batch_query mode)
+        self.target_to_discovered_labels = {} # label.Label -> dep labels discovered concurrently (jobs > 1)
+        self.artifactless_labels = {} # source labels without BUILD.pom, neverlink unless proven otherwise (insertion-ordered, values are None)
 
         self.genctxs = [] # ArtifactGenerationContext instances
         self.leafnodes = [] # all leafnodes discovered while crawling
@@ -134,6 +153,14 @@ class Crawler:
                 if self.verbose:
                     self._print_debug_banner("No missing packages found")
 
+        # all source labels without a BUILD.pom file have been skipped while
+        # crawling, because they are expected to be neverlink targets - this
+        # is verified using a single bazel query
+        self._verify_artifactless_labels_are_never_link()
+
+        # the next crawl only discovers the dependencies of changed packages
+        self.crawl_cache.save()
+
 
         # crawling is complete at this point, now process the nodes
         
@@ -148,11 +175,11 @@ class Crawler:
         # computing the set of dependencies for each Node is done
 
         # now compute the transitive closure of deps for each node
-        target_to_transitive_closure_deps = self._compute_transitive_closures_of_deps()
+        target_to_transitive_closure = self._compute_transitive_closures_of_deps()
 
 
         # add discovered deps to artifact generation contexts
-        self._register_dependencies(target_to_transitive_closure_deps)
+        self._register_dependencies(target_to_transitive_closure)
 
 
         # for each artifact, if its manifest (for ex pom.xml) has changed since
@@ -174,31 +201,45 @@ class Crawler:
 
         return CrawlerResult(ctxs, nodes, crawled_bazel_packages)
 
-    def _register_dependencies(self, target_to_transitive_closure_deps):
+    def _register_dependencies(self, target_to_transitive_closure):
         """
         This method sets dependency lists on generation contexts:
 
         - the direct dependencies of the artifact
         - the transitive closure of the direct dependenices
         - the transitive closure of the library's dependencies
+
+        target_to_transitive_closure has the transitive closure of each
+        target, as dependency ids (see _compute_transitive_closures_of_deps),
+        this is where they are materialized as dependency instances.
+
+        The transitive closure of each library is computed once, and shared
+        by all artifacts of the library.
         """
+        library_to_transitive_closure = {}
         for ctx in self.genctxs:
             additional_deps, excluded_deps = self._load_custom_output_dependencies(ctx.artifact_def)
             directs = [dep for dep in self.target_to_dependencies[ctx.label] if dep not in excluded_deps] + additional_deps
             ctx.register_artifact_directs(directs)
 
-            transitive_closure = [dep for dep in target_to_transitive_closure_deps[ctx.label] if dep not in excluded_deps]
+            transitive_closure = self.dependency_table.get_dependencies(target_to_transitive_closure[ctx.label])
+            transitive_closure = [dep for dep in transitive_closure if dep not in excluded_deps]
             ctx.register_artifact_transitive_closure(transitive_closure)
 
-            lib_transitive_closure = [dep for dep in self\
-                ._get_deps_transitive_closure_for_library(
-                    ctx.artifact_def.library_path,
-                    target_to_transitive_closure_deps) if dep not in excluded_deps]
+            library_path = ctx.artifact_def.library_path
+            if library_path not in library_to_transitive_closure:
+                library_to_transitive_closure[library_path] = self._get_deps_transitive_closure_for_library(
+                    library_path, target_to_transitive_closure)
+            lib_transitive_closure = [dep for dep in library_to_transitive_closure[library_path] if dep not in excluded_deps]
             ctx.register_library_transitive_closure(lib_transitive_closure)
 
     def _load_custom_output_dependencies(self, artifact_def):
+        """
+        Returns the additional dependencies (a list) and the excluded
+        dependencies (a set) of the specified artifact.
+        """
         additional_deps = []
-        excluded_deps = []
+        excluded_deps = set()
         for str_repr in artifact_def.emitted_dependencies:
             exclude = False
             if str_repr.startswith("-"):
@@ -206,18 +247,23 @@ class Crawler:
                 exclude = True
             dep = self.generation_strategy.load_dependency_by_native_repr(str_repr)
             if exclude:
-                excluded_deps.append(dep)
+                excluded_deps.add(dep)
             else:
                 additional_deps.append(dep)
         return additional_deps, excluded_deps
 
     def _get_deps_transitive_closure_for_library(
-            self, library_path, target_to_transitive_closure_deps):
+            self, library_path, target_to_transitive_closure):
         all_deps = set()
 
+        processed_key_ids = set()
         nodes = self.library_to_nodes[library_path]
         for n in nodes:
-            all_deps.update(target_to_transitive_closure_deps[n.label])
+            for dep_id in target_to_transitive_closure[n.label]:
+                key_id = self.dependency_table.get_key_id(dep_id)
+                if key_id not in processed_key_ids:
+                    processed_key_ids.add(key_id)
+                    all_deps.add(self.dependency_table.get_dependency(dep_id))
 
         # also include every artifact that is part of this library
         # (we have already collected them above if they all reference each
@@ -258,58 +304,135 @@ class Crawler:
         whether its current manifest (for ex pom.xml) is different the
         previously released manifest. If it has changed, mark the artifact def
         as needing to be released.
+
+        The manifests are compared using their digests, see
+        pomparser.get_digest_for_comparison. They are only formatted and
+        diffed in verbose mode.
         """
-        for ctx in self.genctxs:
+        ctxs = [ctx for ctx in self.genctxs
+                if not ctx.artifact_def.requires_release and ctx.artifact_def.released_pom_content is not None]
+        # the manifests are generated concurrently - the goldfile manifest
+        # does not depend on the requires_release flags, so they are only
+        # updated afterwards
+        def get_manifest_digests(ctx):
+            return _get_manifest_digests(ctx, self.pom_digest_cache)
+        # the forked processes inherit the loaded cache, instead of each of
+        # them reading the cache file
+        self.pom_digest_cache.load()
+        manifest_digests = processpool.parallel_map(get_manifest_digests, ctxs, self.jobs)
+        for ctx, (current_digest, previous_digest) in zip(ctxs, manifest_digests):
             art_def = ctx.artifact_def
-            if not art_def.requires_release and art_def.released_pom_content is not None:
-                # TODO pomparser
-                current_manifest = pomparser.format_for_comparison(ctx.gen_goldfile_manifest())
-                previous_manifest = pomparser.format_for_comparison(art_def.released_pom_content)
-                manifest_changed = current_manifest != previous_manifest
-                if manifest_changed:
-                    art_def.requires_release = True
-                    # TODO release reason
-                    art_def.release_reason = ReleaseReason.POM
+            # the digest may have been computed by another process
+            self.pom_digest_cache.put(art_def.released_pom_content, previous_digest)
+            manifest_changed = current_digest != previous_digest
+            if manifest_changed:
+                art_def.requires_release = True
+                # TODO release reason
+                art_def.release_reason = ReleaseReason.POM
 
-                    if self.verbose:
-                        logger.debug("pom diff %s %s" % (art_def, art_def.bazel_package))
-                        diff = difflib.unified_diff(previous_manifest.splitlines(True), current_manifest.splitlines(True))
-                        logger.raw(''.join(diff))
-                        logger.debug("%s computed manifest:" % art_def)
-                        logger.raw(current_manifest)
-                        logger.debug("%s released manifest:" % art_def)
-                        logger.raw(previous_manifest)
+                if self.verbose:
+                    # TODO pomparser
+                    current_manifest = pomparser.format_for_comparison(ctx.gen_goldfile_manifest())
+                    previous_manifest = pomparser.format_for_comparison(art_def.released_pom_content)
+                    logger.debug("pom diff %s %s" % (art_def, art_def.bazel_package))
+                    diff = difflib.unified_diff(previous_manifest.splitlines(True), current_manifest.splitlines(True))
+                    logger.raw(''.join(diff))
+                    logger.debug("%s computed manifest:" % art_def)
+                    logger.raw(current_manifest)
+                    logger.debug("%s released manifest:" % art_def)
+                    logger.raw(previous_manifest)
+        self.pom_digest_cache.save()
 
 
     def _compute_transitive_closures_of_deps(self):
         """
         For every target, compute its full transitive closure of deps.
         
-        Returns a dictionary: target -> iterable of deps (transitive closure)
+        Returns a dictionary: target -> transitive closure, as an array("I")
+        of dependency ids (see dependency.DependencyTable). Use
+        self.dependency_table to get the dependency instances.
 
         For example, with targets:
         A->B->C, each target referencing also some other (3rd party) 
         dependencies, the deps returns for A include the deps of B and C.
 
-        Algorithm: we just walk up from the leafnodes to parents, accumulating
-        deps along the way.
+        Algorithm: the nodes are processed in a single pass, children before
+        parents, so the closure of each node is computed once, from its own
+        deps and the closures of its children.
+
+        The deps of a node are ordered like this:
+        1) deps from target (with their Maven transitives)
+        2) deps from children, in the order they are discovered when walking
+           up from the leafnodes (in leafnode order) to the parents (in
+           parent order)
+
+        To determine that order without walking all paths, each dep in a
+        closure is associated with the path of the walk that first reached
+        the node with that dep: a tuple of the index of the leafnode
+        followed by the index of the parent at each step. Walks are
+        ordered like tuples. Paths are interned too: for each closure, the
+        path ids are stored in an array("I") that is parallel to the
+        closure.
 
         Note that this method requires the target_to_dependencies dictionary
         to be up-to-date.
         """
-        target_to_all_dependencies = {}
-        for node in self.leafnodes:
-            accumulated_deps = []
-            self._accumulate_deps_and_walk(node, accumulated_deps,
-                                           target_to_all_dependencies)
-        return target_to_all_dependencies
-
-    def _accumulate_deps_and_walk(self, node, accumulated_deps,
-                                  target_to_all_dependencies):
+        table = self.dependency_table
+        target_to_closure = {} # target -> dep ids
+        target_to_path_ids = {} # target -> for each dep in the closure, the path of the walk that found it
+        paths = [] # path id -> path
+        path_to_id = {}
+        node_to_path = {} # node -> path of the first walk reaching the node
+        leafnode_to_index = {node: i for i, node in enumerate(self.leafnodes)}
+        for node, children in self._get_nodes_children_first():
+            this_node_deps = table.get_ids(self._get_deps_and_maven_transitives(node))
+            processed_key_ids = set([table.get_key_id(dep_id) for dep_id in this_node_deps])
+
+            # for each dep of the children: (path, index in child closure, dep id)
+            key_id_to_child_path = {}
+            node_paths = []
+            for child in children:
+                parent_index = child.parents.index(node)
+                child_path_ids = target_to_path_ids[child.label]
+                extended_paths = {} # deps reached on the same walk share the path
+                for i, dep_id in enumerate(target_to_closure[child.label]):
+                    key_id = table.get_key_id(dep_id)
+                    if key_id in processed_key_ids:
+                        continue
+                    path_id = child_path_ids[i]
+                    path = extended_paths.get(path_id)
+                    if path is None:
+                        path = paths[path_id] + (parent_index,)
+                        extended_paths[path_id] = path
+                    current = key_id_to_child_path.get(key_id)
+                    if current is None or (path, i) < current[:2]:
+                        key_id_to_child_path[key_id] = (path, i, dep_id)
+                node_paths.append(node_to_path[child] + (parent_index,))
+
+            if node in leafnode_to_index:
+                node_paths.append((leafnode_to_index[node],))
+            node_to_path[node] = min(node_paths)
+            closure = array("I", this_node_deps)
+            path_ids = array("I", [self._get_path_id(node_to_path[node], paths, path_to_id)]) * len(this_node_deps)
+            for path, _, dep_id in sorted(key_id_to_child_path.values(), key=lambda t: t[:2]):
+                closure.append(dep_id)
+                path_ids.append(self._get_path_id(path, paths, path_to_id))
+            target_to_closure[node.label] = closure
+            target_to_path_ids[node.label] = path_ids
+        return target_to_closure
+
+    def _get_path_id(self, path, paths, path_to_id):
+        path_id = path_to_id.get(path)
+        if path_id is None:
+            path_id = len(paths)
+            paths.append(path)
+            path_to_id[path] = path_id
+        return path_id
+
+    def _get_deps_and_maven_transitives(self, node):
         """
-        node: the current node to process
-        accumulated_deps: a list of deps, each node's deps are added to to it
-        target_to_all_dependencies: the result dictionary being built
+        Returns the deps of the specified node, each dep followed by its
+        transitive closure of Maven deps.
         """
         this_node_deps = self.target_to_dependencies[node.label]
 
@@ -334,26 +457,37 @@ class Crawler:
                     # transitive from a previous dep
                     this_node_all_deps.append(transitive)
                     processed_deps.add(transitive)
+        return this_node_all_deps
 
-
-        # when encountering a duplicate dep, we keep this order:
-        # 1) current deps from target
-        # 2) previous transitive closure computation
-        # 3) accumulated deps from child
-
-        this_node_current_transitives = target_to_all_dependencies.get(node.label, ())
-        this_node_all_deps += [d for d in this_node_current_transitives if d not in processed_deps]
-        processed_deps.update(this_node_all_deps)
-
-        this_node_all_deps += [d for d in accumulated_deps if d not in processed_deps]
-        processed_deps.update(this_node_all_deps)
-
-        target_to_all_dependencies[node.label] = this_node_all_deps
-
-        for parent in node.parents:
-            accumulated_deps = this_node_all_deps + [d for d in accumulated_deps if d not in processed_deps]
-            self._accumulate_deps_and_walk(parent, accumulated_deps,
-                                           target_to_all_dependencies)
+    def _get_nodes_children_first(self):
+        """
+        Returns all nodes reachable from the leafnodes, walking up to the
+        parents, so that each node comes after all its children. Returns
+        tuples: (node, the node's children).
+        """
+        # the children of each node, based on the parents of each node
+        node_to_children = {}
+        nodes = list(self.leafnodes)
+        for node in nodes:
+            node_to_children.setdefault(node, [])
+        for node in nodes:
+            for parent in node.parents:
+                if parent not in node_to_children:
+                    node_to_children[parent] = []
+                    nodes.append(parent)
+                node_to_children[parent].append(node)
+
+        node_to_unprocessed_child_count = {n: len(c) for n, c in node_to_children.items()}
+        ready_nodes = [n for n in nodes if node_to_unprocessed_child_count[n] == 0]
+        ordered_nodes = []
+        while len(ready_nodes) > 0:
+            node = ready_nodes.pop()
+            ordered_nodes.append((node, node_to_children[node]))
+            for parent in node.parents:
+                node_to_unprocessed_child_count[parent] -= 1
+                if node_to_unprocessed_child_count[parent] == 0:
+                    ready_nodes.append(parent)
+        return ordered_nodes
 
     def _push_transitives_to_parent(self):
         """
@@ -365,30 +499,34 @@ class Crawler:
         """
         for node in self.leafnodes:
             processed_nodes = set() # Node instances that were already handled
-            collected_dep_lists = [] # list of list of deps
-            self._push_transitives_and_walk(node, collected_dep_lists, 
-                                            processed_nodes)
-
-    def _push_transitives_and_walk(self, node, collected_dep_lists, 
-                                   processed_nodes):
-        deps = self.target_to_dependencies[node.label]
-        if node.artifact_def.pom_generation_mode.produces_artifact:
-            if len(collected_dep_lists) > 0:
-                deps = self.target_to_dependencies[node.label]
-                collected_dep_lists.append(deps)
-                deps = self._process_collected_dep_lists(collected_dep_lists)
-                self.target_to_dependencies[node.label] = deps
-                collected_dep_lists = []
-        else:
-            if node not in processed_nodes:
-                processed_nodes.add(node)
-                collected_dep_lists.append(deps)
-        for parent in node.parents:
-            # important: for each recursive call, we create a copy of
-            # collected_dep_lists, because otherwise updates to this list
-            # from recursive calls are visible here
-            self._push_transitives_and_walk(parent, list(collected_dep_lists),
-                                            processed_nodes)
+            self._push_transitives_and_walk(node, processed_nodes)
+
+    def _push_transitives_and_walk(self, leafnode, processed_nodes):
+        """
+        Walks up from the specified leaf node, once for each path to the
+        root nodes, collecting the deps of nodes that do not produce an
+        artifact. The context of each visited node is its list of collected
+        dep lists.
+        """
+        def pre_visit(node, child, child_collected_dep_lists):
+            # important: each node gets a copy of collected_dep_lists,
+            # because otherwise updates to this list are visible to the
+            # other parents of the child node
+            collected_dep_lists = [] if child is None else list(child_collected_dep_lists)
+            deps = self.target_to_dependencies[node.label]
+            if node.artifact_def.pom_generation_mode.produces_artifact:
+                if len(collected_dep_lists) > 0:
+                    collected_dep_lists.append(deps)
+                    deps = self._process_collected_dep_lists(collected_dep_lists)
+                    self.target_to_dependencies[node.label] = deps
+                    collected_dep_lists = []
+            else:
+                if node not in processed_nodes:
+                    processed_nodes.add(node)
+                    collected_dep_lists.append(deps)
+            return collected_dep_lists
+        traversal.walk([leafnode], lambda node: node.parents, pre_visit,
+                       memoize=False)
 
     def _process_collected_dep_lists(self, collected_dep_lists):
         deps = reversed(collected_dep_lists)
@@ -417,24 +555,58 @@ class Crawler:
 
         If force_release is set, all artifacts are marked as requiring 
         releasing.
+
+        The library graph is built once, and each library is processed
+        once, after all libraries it references. Libraries that reference
+        each other (through different artifacts) are processed together.
+        """
+        library_to_child_libraries = self._get_library_graph()
+        library_to_requires_release = {}
+        for libraries in traversal.get_strongly_connected_components(
+                library_to_child_libraries.keys(),
+                library_to_child_libraries.__getitem__):
+            # a library requires releasing if a library it references
+            # requires releasing
+            child_library_requires_release = any(
+                library_to_requires_release[child_library]
+                for library in libraries
+                for child_library in library_to_child_libraries[library]
+                if child_library in library_to_requires_release)
+            libraries_requiring_release = [
+                library for library in libraries
+                if self._any_artifact_requires_releasing(self.library_to_artifact[library])[0]]
+            for library in libraries:
+                # libraries that are part of a reference cycle reference each
+                # other
+                transitive_dep_requires_release = (
+                    child_library_requires_release or
+                    any(lib != library for lib in libraries_requiring_release))
+                library_to_requires_release[library] = self._update_req_rel(
+                    library, transitive_dep_requires_release, force_release)
+
+    def _get_library_graph(self):
+        """
+        Returns a dict: library path -> the library paths it references,
+        based on the references between the artifact nodes of the crawled
+        libraries.
+        """
+        library_to_child_libraries = {library_path: {} for library_path in self.library_to_nodes.keys()}
+        for library_path, nodes in self.library_to_nodes.items():
+            for node in nodes:
+                for parent in node.parents:
+                    parent_library_path = parent.artifact_def.library_path
+                    if parent_library_path == library_path:
+                        # no need to crawl within the same library
+                        continue
+                    library_to_child_libraries.setdefault(parent_library_path, {})[library_path] = None
+        return {library_path: list(child_libraries.keys())
+                for library_path, child_libraries in library_to_child_libraries.items()}
+
+    def _update_req_rel(self, library_path, transitive_dep_requires_release, force_release):
+        """
+        Updates the release flag of the artifacts of the specified library,
+        returns whether the library requires releasing.
         """
-        # we start with a leafnode, and walk up (the leaf nodes represent
-        # packages/maven artifacts, not libraries)
-        for node in self.leafnodes:
-            if self.verbose:
-                print("Propagating release state, starting at leaf node", node.artifact_def.bazel_package)
-            processed_nodes = set()
-            self._propagate_req_rel(node,
-                                    transitive_dep_requires_release=False,
-                                    force_release=force_release,
-                                    processed_nodes=processed_nodes)
-
-    def _propagate_req_rel(self, node, transitive_dep_requires_release, force_release, processed_nodes):
-        if node in processed_nodes:
-            return
-        processed_nodes.add(node)
-        art_def = node.artifact_def
-        library_path = art_def.library_path
         all_artifact_defs = self.library_to_artifact[library_path]
         assert len(all_artifact_defs) > 0, "expected some artifact defs"
         sibling_artifact_requires_release, sibling_release_reason = self._any_artifact_requires_releasing(all_artifact_defs)
@@ -468,20 +640,8 @@ class Crawler:
         else: # release not required
             if self.verbose:
                 print("Library", library_path, "does not required to be released")
-        # process all artifact nodes belonging to the current library, 
-        # otherwise we may miss some references to other libraries
-        all_artifact_nodes = self.library_to_nodes[library_path]
-        for n in all_artifact_nodes:
-            for parent in n.parents:
-                if parent.artifact_def.library_path == n.artifact_def.library_path:
-                    # no need to crawl within the same library
-                    continue
-                if n.artifact_def.requires_release and not force_release:
-                    transitive_dep_requires_release = True
-                self._propagate_req_rel(parent,
-                                        transitive_dep_requires_release,
-                                        force_release,
-                                        processed_nodes)
+        # all artifacts of the library have the same release flag now
+        return self._any_artifact_requires_releasing(all_artifact_defs)[0]
 
     def _crawl_packages(self, packages, follow_references):
         """
@@ -494,6 +654,14 @@ class Crawler:
         follow_references: 
             If False, this method doesn't follow BUILD file references.
         """
+        if self.workspace.query_backend.batched:
+            self._prefetch_dependencies(
+                [labelm.Label(package) for package in packages],
+                follow_references)
+        if self.jobs > 1:
+            self._discover_dependencies_concurrently(
+                [labelm.Label(package) for package in packages],
+                follow_references)
         nodes = []
         for package in packages:
             parent_node = None
@@ -505,8 +673,13 @@ class Crawler:
     def _crawl(self, label, parent_node, follow_references):
         """
         Loads and processes the dependencies of the given label. For each source
-        reference, calls this method recursively, unless follow_references is
-        False.
+        reference, processes the referenced label the same way, unless
+        follow_references is False.
+
+        References are followed depth-first, using an explicit stack instead of
+        recursion (see traversal.walk), so that long chains of references do
+        not hit the recursion limit. A reference cycle is reported as an
+        error.
 
         Args:
             label:
@@ -519,32 +692,35 @@ class Crawler:
         Returns a Node instance for the crawled package.
         """
         assert isinstance(label, labelm.Label)
-        artifact_def = self.workspace.parse_maven_artifact_def(label.package_path)
-        if artifact_def is None:
-            raise Exception("No artifact defined at package %s" % label)
-        label = Crawler._merge(label, artifact_def)
-        if label in self.target_to_node:
-            # if we have already processed this target, we can re-use the
-            # children we discovered previously
-            # for example: A -> B -> C is how we found B, and now we got here
-            # through another path: A -> Z -> B -> C
-            # the parent is different, but the children have to be the same
-            cached_node = self.target_to_node[label]
-            if self.verbose:
-                logger.debug("Skipping re-crawling of artifact [%s] with target key [%s]" % (cached_node.artifact_def, label))
-            # also add the new parent to the cached_node - this is important
-            # because we have logic that traverses the nodes from children to
-            # parent nodes
-            if parent_node is not None:
-                assert parent_node not in cached_node.parents
-                cached_node.parents.append(parent_node)
+        label = self._get_artifact_label(label)
+        label_to_source_labels = {} # source labels of the targets being crawled
+
+        def pre_visit(label, parent_label, parent_node):
+            if label in self.target_to_node:
+                # if we have already processed this target, we can re-use the
+                # children we discovered previously
+                # for example: A -> B -> C is how we found B, and now we got here
+                # through another path: A -> Z -> B -> C
+                # the parent is different, but the children have to be the same
+                cached_node = self.target_to_node[label]
                 if self.verbose:
-                    logger.debug("Adding new parent [%s] to cached node [%s]" % (parent_node.artifact_def.bazel_package, cached_node.artifact_def.bazel_package))
-            return cached_node
-        else:
+                    logger.debug("Skipping re-crawling of artifact [%s] with target key [%s]" % (cached_node.artifact_def, label))
+                # also add the new parent to the cached_node - this is important
+                # because we have logic that traverses the nodes from children to
+                # parent nodes
+                if parent_node is not None:
+                    assert parent_node not in cached_node.parents
+                    cached_node.parents.append(parent_node)
+                    if self.verbose:
+                        logger.debug("Adding new parent [%s] to cached node [%s]" % (parent_node.artifact_def.bazel_package, cached_node.artifact_def.bazel_package))
+                if parent_label is not None:
+                    parent_node.children.append(cached_node)
+                return traversal.SKIP
+
             if self.verbose:
                 logger.info("Processing [%s]" % label)
-            
+
+            artifact_def = self.workspace.parse_maven_artifact_def(label.package_path)
             self.package_to_artifact[label.package_path] = artifact_def
             self.library_to_artifact[artifact_def.library_path].append(artifact_def)
 
@@ -553,7 +729,9 @@ class Crawler:
                 self.workspace, self.pom_template, artifact_def, label,
                 excluded_deps)
             self.genctxs.append(artifactctx)
-            labels = self._discover_dependencies(artifact_def, label)
+            labels = self.target_to_discovered_labels.get(label)
+            if labels is None:
+                labels = self._discover_dependencies(artifact_def, label)
             # TODO abstract this, as it assumes maven_install
             #all_deps = self.workspace.parse_dep_labels([lbl.canonical_form for lbl in labels])
             #self.target_to_dependencies[label] = all_deps
@@ -563,30 +741,173 @@ class Crawler:
                 logger.debug("Labels: %s" % "\n".join([lbl.canonical_form for lbl in labels]))
                 logger.debug("Dependencies: %s" % "\n".join([str(d) for d in deps]))
             self.target_to_dependencies[label] = deps
-            node = Node(parent_node, artifact_def, label)
-            if follow_references:
-                # this is where we crawl the source label:
-                for lbl in source_labels:
-                    child_node = self._crawl(lbl, node, follow_references)
-                    node.children.append(child_node)
+            # this is where we crawl the source labels (see get_children)
+            label_to_source_labels[label] = source_labels if follow_references else []
+            return Node(parent_node, artifact_def, label)
+
+        def get_children(label):
+            return [self._get_artifact_label(lbl) for lbl in label_to_source_labels[label]]
+
+        def post_visit(label, parent_label, node):
+            if parent_label is not None:
+                node.parents[0].children.append(node)
             self.target_to_node[label] = node
             self.library_to_nodes[node.artifact_def.library_path].append(node)
             self._store_if_leafnode(node)
-            return node
+
+        traversal.walk([label], get_children, pre_visit, post_visit,
+                       revisit=None, memoize=False)
+        return self.target_to_node[label]
+
+    def _get_artifact_label(self, label):
+        """
+        Returns the label to use as key for the artifact the specified label
+        belongs to, see _merge.
+        """
+        artifact_def = self.workspace.parse_maven_artifact_def(label.package_path)
+        if artifact_def is None:
+            raise Exception("No artifact defined at package %s" % label)
+        return Crawler._merge(label, artifact_def)
+
+    def _prefetch_dependencies(self, labels, follow_references):
+        """
+        Queries the dependencies of all targets reachable from the specified
+        labels, breadth-first, running a single bazel query for each crawl
+        depth. The query results are stored so that _query_labels can pick
+        them up while crawling.
+
+        Targets that cannot be processed here are skipped, _crawl will query
+        them individually (and fail with a meaningful error message if
+        necessary).
+        """
+        processed_labels = set()
+        frontier = labels
+        while len(frontier) > 0:
+            label_to_artifact_def = {}
+            for label in frontier:
+                artifact_def = self.workspace.parse_maven_artifact_def(label.package_path)
+                if artifact_def is None:
+                    continue
+                label = Crawler._merge(label, artifact_def)
+                if label in processed_labels or label in self.target_to_node:
+                    continue
+                processed_labels.add(label)
+                label_to_artifact_def[label] = artifact_def
+
+            target_pattern_to_dep_attributes = {}
+            for label, artifact_def in label_to_artifact_def.items():
+                dep_labels = self.crawl_cache.get(label)
+                if dep_labels is not None:
+                    self.target_to_discovered_labels[label] = dep_labels
+                elif artifact_def.include_deps and artifact_def.pom_generation_mode.query_dependency_attributes:
+                    dep_attributes = artifact_def.pom_generation_mode.dependency_attributes
+                    deps = self.query_cache.get(label, dep_attributes)
+                    if deps is None:
+                        target_pattern_to_dep_attributes[label.canonical_form] = dep_attributes
+                    else:
+                        self.target_to_queried_labels[label] = deps
+            if len(target_pattern_to_dep_attributes) > 0:
+                if self.verbose:
+                    logger.debug("Querying dependencies of %i targets" % len(target_pattern_to_dep_attributes))
+                target_pattern_to_deps = self.workspace.query_backend.query_deps_attributes(
+                    target_pattern_to_dep_attributes)
+                for target_pattern, deps in target_pattern_to_deps.items():
+                    label = labelm.Label(target_pattern)
+                    self.target_to_queried_labels[label] = deps
+                    self.query_cache.put(label, target_pattern_to_dep_attributes[target_pattern], deps)
+
+            if not follow_references:
+                break
+
+            frontier = []
+            for label, artifact_def in label_to_artifact_def.items():
+                dep_labels = self.target_to_discovered_labels.get(label)
+                if dep_labels is not None:
+                    frontier += [lbl for lbl in dep_labels if lbl.is_source_ref and not self._is_excluded(lbl)]
+                    continue
+                dep_labels = []
+                if artifact_def.deps is not None:
+                    dep_labels += [labelm.Label(lbl) for lbl in artifact_def.deps]
+                queried_labels = [labelm.Label(lbl) for lbl in self.target_to_queried_labels.get(label, ())]
+                dep_labels += Crawler._remove_package_private_labels(queried_labels, artifact_def)
+                for dep_label in dep_labels:
+                    if dep_label.is_source_ref and not self._is_excluded(dep_label):
+                        frontier.append(dep_label)
+
+    def _discover_dependencies_concurrently(self, labels, follow_references):
+        """
+        Parses the metadata files of, and discovers the dependencies of, all
+        targets reachable from the specified labels, using self.jobs threads.
+        This is where most of the crawling time is spent, waiting for bazel
+        and git.
+
+        The discovered dependencies are stored so that _crawl can pick them
+        up: _crawl still builds the DAG serially, so that it does not depend
+        on the order in which the concurrent work completes.
+
+        Targets that cannot be processed here are skipped, _crawl processes
+        them again (and fails with a meaningful error message if necessary).
+        """
+        lock = threading.Lock()
+        submitted_labels = set()
+        processed_labels = set()
+
+        def discover(label):
+            try:
+                artifact_def = self.workspace.parse_maven_artifact_def(label.package_path)
+                if artifact_def is None:
+                    return ()
+                label = Crawler._merge(label, artifact_def)
+                with lock:
+                    if label in processed_labels or label in self.target_to_node:
+                        return ()
+                    processed_labels.add(label)
+                dep_labels = self._discover_dependencies(artifact_def, label)
+            except Exception as e:
+                if self.verbose:
+                    logger.debug("Skipping concurrent processing of [%s]: %s" % (label, e))
+                return ()
+            with lock:
+                self.target_to_discovered_labels[label] = dep_labels
+            if not follow_references:
+                return ()
+            return [lbl for lbl in dep_labels if lbl.is_source_ref and not self._is_excluded(lbl)]
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            futures = set()
+            def submit(label):
+                if label not in submitted_labels:
+                    submitted_labels.add(label)
+                    futures.add(executor.submit(discover, label))
+            for label in labels:
+                submit(label)
+            while len(futures) > 0:
+                done, futures = concurrent.futures.wait(
+                    futures, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    for dep_label in future.result():
+                        submit(dep_label)
 
     def _discover_dependencies(self, artifact_def, label):
         """
         Discovers the dependencies of the given artifact (==bazel target).
 
         This method returns a list of common.label.Label instances.
+
+        The dependencies of targets whose package has not changed since the
+        previous crawl are read from the crawl cache.
         """
         assert artifact_def is not None
         assert label is not None, "label is None for artifact %s" % artifact_def
+        labels = self.crawl_cache.get(label)
+        if labels is not None:
+            return labels
         labels = ()
         if artifact_def.deps is not None:
             labels = [labelm.Label(lbl) for lbl in artifact_def.deps]
         if artifact_def.pom_generation_mode.query_dependency_attributes:
             labels += self._query_labels(artifact_def, label)
+        self.crawl_cache.put(label, labels)
         return labels
 
     def _query_labels(self, artifact_def, label):
@@ -600,11 +921,17 @@ class Crawler:
         else:
             assert artifact_def.bazel_package is not None
             try:
-                labels = bazel.query_java_library_deps_attributes(
-                    self.workspace.repo_root_path,
-                    label.canonical_form,
-                    artifact_def.pom_generation_mode.dependency_attributes,
-                    self.workspace.verbose)
+                dep_attributes = artifact_def.pom_generation_mode.dependency_attributes
+                labels = self.target_to_queried_labels.get(label)
+                if labels is None:
+                    labels = self.query_cache.get(label, dep_attributes)
+                if labels is None:
+                    target_pattern_to_deps = self.workspace.query_backend.query_deps_attributes(
+                        {label.canonical_form: dep_attributes})
+                    if label.canonical_form not in target_pattern_to_deps:
+                        raise Exception("Target [%s] not found" % label.canonical_form)
+                    labels = target_pattern_to_deps[label.canonical_form]
+                    self.query_cache.put(label, dep_attributes, labels)
                 labels = [labelm.Label(lbl) for lbl in labels]
                 return Crawler._remove_package_private_labels(labels, artifact_def)
             except Exception as e:
@@ -673,21 +1000,36 @@ class Crawler:
             deps.append(dep)
         return source_labels, deps
 
-    def _filter_label(self, label):
+    def _is_excluded(self, label):
         if label in self.workspace.excluded_dependency_labels:
-            return None
+            return True
         elif label.is_source_ref:
             for excluded_dependency_path in self.workspace.excluded_dependency_paths:
                 if label.package_path.startswith(excluded_dependency_path):
-                    return None
+                    return True
+        return False
+
+    def _filter_label(self, label):
+        if self._is_excluded(label):
+            return None
+        elif label.is_source_ref:
             artifact_def = self.workspace.parse_maven_artifact_def(label.package_path)
             if artifact_def is None:
-                if bazel.is_never_link_dep(self.workspace.repo_root_path, label.canonical_form):
-                    return None
-                else:
-                    raise Exception("no BUILD.pom file in package [%s]" % label.package_path)
+                # see _verify_artifactless_labels_are_never_link
+                self.artifactless_labels[label] = None
+                return None
         return label
 
+    def _verify_artifactless_labels_are_never_link(self):
+        """
+        Source labels that do not have a BUILD.pom file are only allowed
+        if they point to a neverlink target.
+        """
+        self.workspace.resolve_never_link_labels(self.artifactless_labels)
+        for label in self.artifactless_labels:
+            if not self.workspace.is_never_link_label(label):
+                raise Exception("no BUILD.pom file in package [%s]" % label.package_path)
+
     def _store_if_leafnode(self, node):
         if len(node.children) == 0:
             self.leafnodes.append(node)
@@ -712,32 +1054,36 @@ class Crawler:
             logger.raw("   %s\n" % node.artifact_def.bazel_package)
         logger.raw("\nCrawling children\n")
         leaf_nodes = []
-        for node in nodes:
-            self._debug_crawl_children(node, indent=0, leaf_nodes=leaf_nodes)
+        self._debug_crawl(nodes, lambda node: node.children, leaf_nodes)
         logger.raw("\nLeaf nodes (without children)\n")
         for node in leaf_nodes:
             logger.raw("  %s\n" % node.artifact_def.bazel_package)
         logger.raw("\nCrawling parents (starting at leaf nodes)\n")
-        for node in leaf_nodes:
-            self._debug_crawl_parents(node, indent=0)
+        self._debug_crawl(leaf_nodes, lambda node: node.parents)
         logger.raw("\n")
 
-    def _debug_crawl_children(self, node, indent, leaf_nodes):
-        logger.raw("%s%s\n" % ("  "*indent, node.artifact_def.bazel_package))
-        if len(node.children) == 0:
-            if node.artifact_def.bazel_package not in [n.artifact_def.bazel_package for n in leaf_nodes]:
-                leaf_nodes.append(node)
-        else:
-            for child in node.children:
-                self._debug_crawl_children(child, indent+1, leaf_nodes)
-
-    def _debug_crawl_parents(self, node, indent):
-        logger.raw("%s%s\n" % ("  "*indent, node.artifact_def.bazel_package))
-        for parent in node.parents:
-            self._debug_crawl_parents(parent, indent+1)
+    def _debug_crawl(self, nodes, get_next_nodes, leaf_nodes=None):
+        def pre_visit(node, previous_node, previous_indent):
+            indent = 0 if previous_node is None else previous_indent + 1
+            logger.raw("%s%s\n" % ("  "*indent, node.artifact_def.bazel_package))
+            if leaf_nodes is not None and len(node.children) == 0:
+                if node.artifact_def.bazel_package not in [n.artifact_def.bazel_package for n in leaf_nodes]:
+                    leaf_nodes.append(node)
+            return indent
+        traversal.walk(nodes, get_next_nodes, pre_visit, memoize=False)
 
     def _print_debug_banner(self, msg):
         sep = "========================================="
         logger.raw("%s\n" % sep)
         logger.raw("    %s\n" % msg)
         logger.raw("%s\n\n" % sep)
+
+
+def _get_manifest_digests(ctx, pom_digest_cache):
+    """
+    Returns the comparison digests of the current and of the previously
+    released manifest of the specified artifact generation context.
+    """
+    current_digest = pomparser.get_digest_for_comparison(ctx.gen_goldfile_manifest())
+    previous_digest = pom_digest_cache.get_digest(ctx.artifact_def.released_pom_content)
+    return current_digest, previous_digest
@@ -6,6 +6,7 @@ For full license text, see the LICENSE file in the repo root or https://opensour
 """
 
 
+from array import array
 import generate
 from functools import total_ordering
  
@@ -47,14 +48,77 @@ class AbstractDependency(generate.AbstractDependency):
     
     bazel_package: The bazel package this dependency lives in, None for 
         artifacts that are not built out of the repository (for example Guava).
+
+
+    Implementation notes:
+        - the crawler creates a lot of dependency instances, so they use
+          __slots__
+        - values derived from the attributes above (the hash, the sort key,
+          the Maven coordinates) are computed once, and reset when one of
+          these attributes is set
+        - the derived values are not pickled: string hashes are randomized
+          per process, so a hash computed by another process cannot be used
     """
+    __slots__ = ("_group_id", "_artifact_id", "_classifier", "_packaging",
+                 "_scope", "_key", "_hash", "_sort_key",
+                 "_maven_coordinates_name")
+
+    # the slots holding derived values, see _reset_cached_values
+    _CACHED_VALUE_SLOTS = ("_key", "_hash", "_sort_key", "_maven_coordinates_name")
+
     def __init__(self, group_id, artifact_id,
                  classifier=None, packaging=None, scope=None):
-        self.group_id = group_id
-        self.artifact_id = artifact_id
-        self.classifier = classifier
-        self.packaging = "jar" if packaging is None else packaging
-        self.scope = scope
+        self._group_id = group_id
+        self._artifact_id = artifact_id
+        self._classifier = classifier
+        self._packaging = "jar" if packaging is None else packaging
+        self._scope = scope
+        self._reset_cached_values()
+
+    @property
+    def group_id(self):
+        return self._group_id
+
+    @group_id.setter
+    def group_id(self, value):
+        self._group_id = value
+        self._reset_cached_values()
+
+    @property
+    def artifact_id(self):
+        return self._artifact_id
+
+    @artifact_id.setter
+    def artifact_id(self, value):
+        self._artifact_id = value
+        self._reset_cached_values()
+
+    @property
+    def classifier(self):
+        return self._classifier
+
+    @classifier.setter
+    def classifier(self, value):
+        self._classifier = value
+        self._reset_cached_values()
+
+    @property
+    def packaging(self):
+        return self._packaging
+
+    @packaging.setter
+    def packaging(self, value):
+        self._packaging = value
+        self._reset_cached_values()
+
+    @property
+    def scope(self):
+        return self._scope
+
+    @scope.setter
+    def scope(self, value):
+        self._scope = value
+        self._reset_cached_values()
 
     @property
     def maven_coordinates_name(self):
@@ -62,14 +126,16 @@ class AbstractDependency(generate.AbstractDependency):
         The Maven "coords" representation for this dependency, EXCLUDING the
         version.
         """
-        c = "%s:%s" % (self.group_id, self.artifact_id)
-        if self.classifier is None:
-            if self.packaging not in (None, "jar"):
-                c = "%s:%s" % (c, self.packaging)
-        else:
-            pack = "jar" if self.packaging is None else self.packaging
-            c = "%s:%s:%s" % (c, pack, self.classifier)
-        return c
+        if self._maven_coordinates_name is None:
+            c = "%s:%s" % (self._group_id, self._artifact_id)
+            if self._classifier is None:
+                if self._packaging not in (None, "jar"):
+                    c = "%s:%s" % (c, self._packaging)
+            else:
+                pack = "jar" if self._packaging is None else self._packaging
+                c = "%s:%s:%s" % (c, pack, self._classifier)
+            self._maven_coordinates_name = c
+        return self._maven_coordinates_name
 
     @property
     def bazel_label_name(self):
@@ -121,49 +187,34 @@ class AbstractDependency(generate.AbstractDependency):
         raise Exception("must be implemented in subclass")
 
     def __hash__(self):
-        return hash((self.group_id, self.artifact_id, self.classifier, self.packaging))
+        if self._hash is None:
+            self._hash = hash(self._get_key())
+        return self._hash
 
     def __eq__(self, other):
-        return (self.group_id == other.group_id and
-                self.artifact_id == other.artifact_id and
-                self.classifier == other.classifier and
-                self.packaging == other.packaging)
+        if self is other:
+            return True
+        return (hash(self) == hash(other) and
+                self._get_key() == other._get_key())
 
     def __ne__(self, other):
         return not self == other
 
+    def __getstate__(self):
+        state = {}
+        for clazz in type(self).__mro__:
+            for slot in clazz.__dict__.get("__slots__", ()):
+                if slot not in type(self)._CACHED_VALUE_SLOTS:
+                    state[slot] = getattr(self, slot)
+        return state
+
+    def __setstate__(self, state):
+        for slot, value in state.items():
+            setattr(self, slot, value)
+        self._reset_cached_values()
+
     def __lt__(self, other):
-        if self.bazel_package is None:
-            # self is a 3rd party dep
-            if other.bazel_package is None:
-                # other is also a 3rd party dep, compare attributes:
-                # group_id, artifact_id, classifier, packaging, scope
-                my_classifier = "" if self.classifier is None else self.classifier
-                other_classifier = "" if other.classifier is None else other.classifier
-                my_packaging = "" if self.packaging is None else self.packaging
-                other_packaging = "" if other.packaging is None else other.packaging
-                my_scope = "" if self.scope is None else self.scope
-                other_scope = "" if other.scope is None else other.scope
-                return (self.group_id,
-                        self.artifact_id,
-                        my_classifier,
-                        my_packaging,
-                        my_scope) < (other.group_id,
-                                     other.artifact_id,
-                                     other_classifier,
-                                     other_packaging,
-                                     other_scope)
-            else:
-                # other is a repository dep, 3rd party goes last
-                return False
-        else:
-            # self is a repository dep
-            if other.bazel_package is None:
-                # other is a 3rd party dep, repository goes first
-                return True
-            else:
-                # other is also a repository dep, compare based on name
-                return (self.group_id, self.artifact_id) < (other.group_id, other.artifact_id)
+        return self._get_sort_key() < other._get_sort_key()
 
     def __str__(self):
         if self.references_artifact:
@@ -174,8 +225,46 @@ class AbstractDependency(generate.AbstractDependency):
     def __repr__(self):
         return self.__str__()
 
+    def _get_key(self):
+        """
+        The attributes that identify this dependency, see __eq__.
+        """
+        if self._key is None:
+            self._key = (self._group_id, self._artifact_id, self._classifier,
+                         self._packaging)
+        return self._key
+
+    def _get_sort_key(self):
+        """
+        Repository deps go first, ordered by group_id and artifact_id. 3rd
+        party deps go last, ordered by group_id, artifact_id, classifier,
+        packaging and scope.
+        """
+        if self._sort_key is None:
+            if self.bazel_package is None:
+                # 3rd party dep
+                self._sort_key = (1,
+                                  self._group_id,
+                                  self._artifact_id,
+                                  "" if self._classifier is None else self._classifier,
+                                  "" if self._packaging is None else self._packaging,
+                                  "" if self._scope is None else self._scope)
+            else:
+                # repository dep
+                self._sort_key = (0, self._group_id, self._artifact_id)
+        return self._sort_key
+
+    def _reset_cached_values(self):
+        self._key = None
+        self._hash = None
+        self._sort_key = None
+        self._maven_coordinates_name = None
+
 
 class ThirdPartyDependency(AbstractDependency):
+    __slots__ = ("_version", "_maven_install_name", "_bazel_label_name")
+
+    _CACHED_VALUE_SLOTS = AbstractDependency._CACHED_VALUE_SLOTS + ("_bazel_label_name",)
 
     def __init__(self, maven_install_name, group_id, artifact_id, version,
                  classifier=None, packaging=None, scope=None):
@@ -204,10 +293,12 @@ class ThirdPartyDependency(AbstractDependency):
 
     @property
     def bazel_label_name(self):
-        name = self._bzl_artifact_name()
-        if self._maven_install_name is not None:
-            name = "@%s//:%s" % (self._maven_install_name, name)
-        return name
+        if self._bazel_label_name is None:
+            name = self._bzl_artifact_name()
+            if self._maven_install_name is not None:
+                name = "@%s//:%s" % (self._maven_install_name, name)
+            self._bazel_label_name = name
+        return self._bazel_label_name
 
     @property
     def bazel_buildable(self):
@@ -228,8 +319,13 @@ class ThirdPartyDependency(AbstractDependency):
         n = n.replace('.', '_')
         return n
 
+    def _reset_cached_values(self):
+        super(ThirdPartyDependency, self)._reset_cached_values()
+        self._bazel_label_name = None
+
 
 class MonorepoDependency(AbstractDependency):
+    __slots__ = ("_artifact_def",)
 
     def __init__(self, artifact_def):
         super(MonorepoDependency, self).__init__(artifact_def.group_id,
@@ -266,6 +362,73 @@ class MonorepoDependency(AbstractDependency):
         return False
 
 
+class DependencyTable:
+    """
+    Interns dependency instances, so that large collections of dependencies,
+    such as transitive closures, can be stored as compact arrays of integer
+    ids (array("I")) instead of lists of dependency instances.
+
+    Each dependency instance is assigned a dense integer id, starting at 0.
+    Each distinct dependency, as defined by AbstractDependency.__eq__ (same
+    group id, artifact id, classifier and packaging), is also assigned a
+    dense integer key id, so that deduplicating dependencies only compares
+    ints.
+
+    Dependency instances that are equal may still differ (for example their
+    version), so ids are assigned by instance, not by key: the dependency
+    instances are materialized unchanged by get_dependencies.
+    """
+    def __init__(self):
+        self._dependencies = [] # id -> dependency instance
+        self._key_ids = array("I") # id -> key id
+        self._instance_to_id = {} # id(dependency instance) -> id
+        self._dependency_to_key_id = {}
+
+    def get_id(self, dependency):
+        """
+        Returns the id of the specified dependency instance, assigning a new
+        id the first time the instance is seen.
+        """
+        dep_id = self._instance_to_id.get(id(dependency))
+        if dep_id is None:
+            dep_id = len(self._dependencies)
+            # the instance is referenced by self._dependencies, so its id()
+            # is not reused
+            self._dependencies.append(dependency)
+            self._instance_to_id[id(dependency)] = dep_id
+            key_id = self._dependency_to_key_id.setdefault(
+                dependency, len(self._dependency_to_key_id))
+            self._key_ids.append(key_id)
+        return dep_id
+
+    def get_ids(self, dependencies):
+        """
+        Returns the ids of the specified dependency instances, as an
+        array("I").
+        """
+        return array("I", [self.get_id(dep) for dep in dependencies])
+
+    def get_key_id(self, dep_id):
+        """
+        Returns the key id for the specified dependency id: dependency ids
+        have the same key id if their dependency instances are equal.
+        """
+        return self._key_ids[dep_id]
+
+    def get_dependency(self, dep_id):
+        return self._dependencies[dep_id]
+
+    def get_dependencies(self, dep_ids):
+        """
+        Returns the dependency instances for the specified dependency ids, as
+        a list.
+        """
+        return [self._dependencies[dep_id] for dep_id in dep_ids]
+
+    def __len__(self):
+        return len(self._dependencies)
+
+
 def new_dep_from_maven_art_str(maven_artifact_str, name):
     num_coordinates = maven_artifact_str.count(':') + 1
     classifier = None
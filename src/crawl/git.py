@@ -7,14 +7,21 @@ For full license text, see the LICENSE file in the repo root or https://opensour
 
 from common import mdfiles
 from common.os_util import run_cmd
+import bisect
+import hashlib
 import os
-import tempfile
+import re
+import subprocess
+import threading
 
 
 def get_dir_hash(repo_root_path, rel_paths, source_exclusions):
     """
     Returns a checksum for the content of the specified rel_paths (list of
     strings, relative to repo_root_path).
+
+    The checksum is the git object hash of the (filtered) "git ls-files -s"
+    output of all rel_paths.
     """
     if not isinstance(rel_paths, (list, tuple)):
         raise Exception("rel_paths must be a list or a tuple")
@@ -24,11 +31,16 @@ def get_dir_hash(repo_root_path, rel_paths, source_exclusions):
         if not os.path.exists(dir_path):
             raise Exception("Directory must exist for hash computation: [%s]" % dir_path)
         files_output += _ls_files(repo_root_path, rel_path, source_exclusions)
-    with tempfile.NamedTemporaryFile("w") as f:
-        f.write(files_output)
-        f.flush()
-        output = run_cmd("git hash-object %s" % f.name, cwd=repo_root_path).strip()
-        return output
+    return _hash_object(files_output.encode())
+
+
+def _hash_object(content):
+    """
+    Returns the same hash as "git hash-object" for a file with the specified
+    content (bytes).
+    """
+    header = ("blob %i\0" % len(content)).encode()
+    return hashlib.sha1(header + content).hexdigest()
 
 
 def has_uncommitted_changes(repo_root_path, rel_path, source_exclusions):
@@ -46,9 +58,101 @@ def has_uncommitted_changes(repo_root_path, rel_path, source_exclusions):
     return len(uncommitted_changes) > 0
 
 
+class GitStatus:
+    """
+    Answers has_uncommitted_changes for any number of packages, using a
+    single "git status" call for the whole repository. The status is read
+    the first time it is needed, and not refreshed afterwards.
+    """
+    def __init__(self, repo_root_path):
+        self.repo_root_path = repo_root_path
+        self._root = None # path trie: path component -> child dict, _FILE for files
+        self._lock = threading.Lock()
+
+    def has_uncommitted_changes(self, rel_path, source_exclusions):
+        """
+        Same as git.has_uncommitted_changes, except that untracked files are
+        always looked at individually (git does not collapse them into their
+        untracked parent directory).
+        """
+        with self._lock:
+            if self._root is None:
+                self._root = self._load()
+        node = self._root
+        for path_component in _split_path(rel_path):
+            if node is _FILE:
+                return False
+            node = node.get(path_component)
+            if node is None:
+                return False
+        file_path_filter = _get_file_path_filter(rel_path, source_exclusions)
+        if node is _FILE:
+            return file_path_filter(rel_path)
+        for file_rel_path in _walk_trie(node, rel_path):
+            if file_path_filter(file_rel_path):
+                return True
+        return False
+
+    def _load(self):
+        output = run_cmd("git status --porcelain -z --untracked-files=all",
+                         cwd=self.repo_root_path)
+        root = {}
+        for file_rel_path in _parse_status_paths(output):
+            node = root
+            path_components = _split_path(file_rel_path)
+            for path_component in path_components[:-1]:
+                child = node.get(path_component)
+                if child is None or child is _FILE:
+                    child = {}
+                    node[path_component] = child
+                node = child
+            if path_components[-1] not in node:
+                node[path_components[-1]] = _FILE
+        return root
+
+
+# marker for a file (leaf) node in the GitStatus trie
+_FILE = object()
+
+
+def _parse_status_paths(output):
+    """
+    Returns the paths in the "git status --porcelain -z" output.
+    For renames and copies, both the new and the original path are returned.
+    """
+    paths = []
+    records = output.split("\0")
+    i = 0
+    while i < len(records):
+        record = records[i]
+        i += 1
+        if len(record) < 4:
+            continue
+        # records look like this: "XY path"
+        paths.append(record[3:])
+        if record[0] in ("R", "C") or record[1] in ("R", "C"):
+            # the original path is in the next record
+            paths.append(records[i])
+            i += 1
+    return paths
+
+
+def _split_path(rel_path):
+    return [c for c in rel_path.split("/") if c not in ("", ".")]
+
+
+def _walk_trie(node, rel_path):
+    for path_component, child in node.items():
+        child_rel_path = path_component if rel_path in ("", ".") else rel_path + "/" + path_component
+        if child is _FILE:
+            yield child_rel_path
+        else:
+            yield from _walk_trie(child, child_rel_path)
+
+
 def _ls_files(repo_root_path, rel_path, source_exclusions):
     file_path_filter = _get_file_path_filter(rel_path, source_exclusions)
-    output = run_cmd("git ls-files -s %s" % rel_path, cwd=repo_root_path).splitlines()
+    output = _get_ls_files_lines(repo_root_path, rel_path)
     filtered_output = []
     for line in output:
         # each line looks like this:
@@ -63,6 +167,132 @@ def _ls_files(repo_root_path, rel_path, source_exclusions):
     return "\n".join(filtered_output)
 
 
+def _get_ls_files_lines(repo_root_path, rel_path):
+    """
+    Returns the "git ls-files -s <rel_path>" output lines.
+
+    The lines are read from a snapshot of the git index, so that git only runs
+    once for all rel_paths. Paths that git would quote or that are not a
+    plain pathspec are delegated to git.
+    """
+    snapshot = _get_ls_files_snapshot(repo_root_path)
+    if snapshot is None or not _is_plain_path(rel_path):
+        return run_cmd("git ls-files -s %s" % rel_path, cwd=repo_root_path).splitlines()
+    lines = snapshot.get_lines(rel_path)
+    if lines is None:
+        # some path requires quoting
+        return run_cmd("git ls-files -s %s" % rel_path, cwd=repo_root_path).splitlines()
+    return lines
+
+
+class _LsFilesSnapshot:
+    """
+    The parsed "git ls-files -s -z" output for the whole repository, sorted
+    by path.
+    """
+    def __init__(self, index_stat, ls_files_output):
+        self.index_stat = index_stat
+        self.paths = []
+        self.lines = []
+        records = [r for r in ls_files_output.split("\0") if len(r) > 0]
+        path_and_lines = []
+        for record in records:
+            # "<mode> <object> <stage>\t<path>", the path is not quoted
+            path = record[record.index("\t")+1:]
+            path_and_lines.append((path, record))
+        path_and_lines.sort()
+        for path, line in path_and_lines:
+            self.paths.append(path)
+            self.lines.append(line)
+
+    def get_lines(self, rel_path):
+        """
+        Returns the lines for the specified pathspec: the file with that path
+        or all files in the directory with that path. Returns None if any of
+        the lines would have to be quoted.
+        """
+        if rel_path == ".":
+            lines = list(self.lines)
+        else:
+            lines = []
+            i = bisect.bisect_left(self.paths, rel_path)
+            if i < len(self.paths) and self.paths[i] == rel_path:
+                lines.append(self.lines[i])
+            # "0" is the character after "/"
+            start = bisect.bisect_left(self.paths, rel_path + "/")
+            end = bisect.bisect_left(self.paths, rel_path + "0")
+            lines += self.lines[start:end]
+        for line in lines:
+            if _requires_quoting(line):
+                return None
+        return lines
+
+
+_REPO_ROOT_PATH_TO_LS_FILES_SNAPSHOT = {}
+
+
+_REPO_ROOT_PATH_TO_INDEX_PATH = {}
+
+
+# the snapshot may be requested concurrently, see crawler.Crawler.jobs
+_LS_FILES_SNAPSHOT_LOCK = threading.Lock()
+
+
+def _get_ls_files_snapshot(repo_root_path):
+    """
+    Returns the _LsFilesSnapshot for the specified repository root, None if
+    it cannot be created. The snapshot is re-created when the git index
+    changes.
+    """
+    with _LS_FILES_SNAPSHOT_LOCK:
+        if repo_root_path not in _REPO_ROOT_PATH_TO_INDEX_PATH:
+            try:
+                index_path = run_cmd("git rev-parse --git-path index", cwd=repo_root_path).strip()
+            except subprocess.CalledProcessError:
+                index_path = None
+            else:
+                index_path = os.path.join(repo_root_path, index_path)
+            _REPO_ROOT_PATH_TO_INDEX_PATH[repo_root_path] = index_path
+        index_path = _REPO_ROOT_PATH_TO_INDEX_PATH[repo_root_path]
+        if index_path is None:
+            return None
+        try:
+            st = os.stat(index_path)
+            index_stat = (st.st_mtime_ns, st.st_size, st.st_ino)
+        except FileNotFoundError:
+            # no files have been added yet
+            index_stat = None
+        snapshot = _REPO_ROOT_PATH_TO_LS_FILES_SNAPSHOT.get(repo_root_path)
+        if snapshot is None or snapshot.index_stat != index_stat:
+            output = run_cmd("git ls-files -s -z", cwd=repo_root_path)
+            snapshot = _LsFilesSnapshot(index_stat, output)
+            _REPO_ROOT_PATH_TO_LS_FILES_SNAPSHOT[repo_root_path] = snapshot
+        return snapshot
+
+
+# a pathspec without any characters git or the shell treat specially
+_PLAIN_PATH_REGEX = re.compile(r"[\w.@+,=/-]+", re.ASCII)
+
+
+def _is_plain_path(rel_path):
+    if rel_path == ".":
+        return True
+    return (_PLAIN_PATH_REGEX.fullmatch(rel_path) is not None and
+            os.path.normpath(rel_path) == rel_path and
+            not rel_path.startswith("../"))
+
+
+def _requires_quoting(line):
+    """
+    Whether git would quote the path in this line (see core.quotePath).
+    """
+    path = line[line.index("\t")+1:]
+    for c in path:
+        if c < " " or c in ('"', "\\") or c >= "\x7f":
+            return True
+    return False
+
+
 def _get_file_path_filter(rel_path, source_exclusions):
     """
     Returns a function that takes a relative path as a single argument.
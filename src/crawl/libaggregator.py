@@ -5,6 +5,7 @@ SPDX-License-Identifier: BSD-3-Clause
 For full license text, see the LICENSE file in the repo root or https://opensource.org/licenses/BSD-3-Clause
 """
 
+from crawl import traversal
 from crawl.releasereason import ReleaseReason
 
 
@@ -14,12 +15,28 @@ def get_libraries_to_release(artifact_nodes):
     """
     library_path_to_library_node = {}
     library_nodes = []
-    for artifact_node in artifact_nodes:
-        add = artifact_node.artifact_def.library_path not in list(library_path_to_library_node.keys())
-        n = _walk(artifact_node, library_path_to_library_node)
-        if add:
-            library_nodes.append(n)
 
+    def pre_visit(artifact_node, parent_artifact_node, parent_library_node):
+        add = artifact_node.artifact_def.library_path not in library_path_to_library_node
+        library_node = _get_library_node(artifact_node, library_path_to_library_node)
+        if add and parent_artifact_node is None:
+            library_nodes.append(library_node)
+        return library_node
+
+    def post_visit(artifact_node, parent_artifact_node, library_node):
+        if parent_artifact_node is not None:
+            library_path_to_library_node[parent_artifact_node.artifact_def.library_path].add_child(library_node)
+
+    def revisit(artifact_node, parent_artifact_node, parent_library_node):
+        # the artifact node and its children have been processed already
+        if parent_library_node is not None:
+            library_node = library_path_to_library_node[artifact_node.artifact_def.library_path]
+            parent_library_node.add_child(library_node)
+
+    # traverse the artifact children - they may or may not belong to the
+    # same library
+    traversal.walk(artifact_nodes, lambda artifact_node: artifact_node.children,
+                   pre_visit, post_visit, revisit, memoize=True)
     return library_nodes
 
 
@@ -56,27 +73,34 @@ class LibraryNode:
         """
         output_lines = []
         all_release_reasons = set()
-        node_path = []
-        self._pretty_print(0, output_lines, all_release_reasons, node_path)
+
+        def pre_visit(node, parent, parent_indent):
+            indent = 0 if parent is None else parent_indent + 2
+            node._pretty_print(indent, output_lines, all_release_reasons)
+            return indent
+
+        def on_cycle(node, parent, parent_indent, cycle):
+            # detected circular reference between library nodes, stop
+            # traversing
+            indent = parent_indent + 2
+            node._pretty_print(indent, output_lines, all_release_reasons)
+            output_lines.append("%s..." % (' '*indent))
+
+        traversal.walk([self], lambda node: node.children, pre_visit,
+                       on_cycle=on_cycle, memoize=False)
         pretty_tree = '\n'.join(output_lines)
         legend = ["%s %s" % (LibraryNode._get_rel_indicator(r).rjust(2),
                              r if r is not None else "no changes to release")
                   for r in all_release_reasons]
         return "%s\n\n%s" % (pretty_tree, '\n'.join(legend))
 
-    def _pretty_print(self, indent, output_lines, all_release_reasons, node_path):
+    def _pretty_print(self, indent, output_lines, all_release_reasons):
         release_reason = self.release_reason if self.requires_release else None
         all_release_reasons.add(release_reason)
         indicator = LibraryNode._get_rel_indicator(release_reason)
         output_lines.append("%s%s %s %s" % (' '*indent, self.library_path,
                                             indicator, 
                                             self._get_pretty_print_version()))
-        if self in node_path:
-            # detected circular reference between library nodes, stop recursing
-            output_lines.append("%s..." % (' '*indent))
-        else:
-            for child in self.children:
-                child._pretty_print(indent+2, output_lines, all_release_reasons, node_path + [self])
 
     def _get_pretty_print_version(self):
         # version can be none for libraries that have no artifact producing
@@ -108,10 +132,10 @@ class LibraryNode:
     __rep__ = __str__
 
     
-def _walk(artifact_node, library_path_to_library_node):
+def _get_library_node(artifact_node, library_path_to_library_node):
     artifact_def = artifact_node.artifact_def
     library_path = artifact_def.library_path
-    if library_path in list(library_path_to_library_node.keys()):
+    if library_path in library_path_to_library_node:
         library_node = library_path_to_library_node[library_path]
         # only the release_reason needs to be re-computed here -
         # the LibraryNode's "requires_release" attribute doesn't need to be set
@@ -130,12 +154,6 @@ def _walk(artifact_node, library_path_to_library_node):
                                    artifact_def.released_version,
                                    artifact_def.version_increment_strategy_name)
         library_path_to_library_node[library_path] = library_node
-        
-    for artifact_child_node in artifact_node.children:
-        # traverse the artifact children - they may or may not belong to the
-        # same library
-        library_child_node = _walk(artifact_child_node,library_path_to_library_node)
-        library_node.add_child(library_child_node)
     return library_node
 
 
@@ -0,0 +1,172 @@
+"""
+Copyright (c) 2025, salesforce.com, inc.
+All rights reserved.
+SPDX-License-Identifier: BSD-3-Clause
+For full license text, see the LICENSE file in the repo root or https://opensource.org/licenses/BSD-3-Clause
+
+
+This module persists the parsed content of the maven_install pinned json
+files across pomgen invocations, so that they only have to be parsed again
+after they have changed.
+
+There is one pickle file for each set of maven_install rules that are parsed
+together, keyed by the content of the pinned files, the dependency overrides
+and the pomgen source that parses the pinned files.
+"""
+
+from array import array
+from common import logger
+from crawl import bazel
+from crawl import dependency
+import generate
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+
+
+# bump this when the format of the cache file changes
+# 2: dependencies are pickled without their (per process) cached hash
+CACHE_FORMAT_VERSION = "2"
+
+
+# pomgen does not have a version number - the content of the modules that
+# parse the pinned files and define the cached classes is used instead
+_VERSIONED_MODULES = (bazel, dependency, generate, sys.modules[__name__])
+
+
+class MavenInstallCache:
+    """
+    On-disk cache of the result of bazel.parse_maven_install.
+
+    The cached dependencies are stored once, the transitive closures are
+    stored as offsets into a table of dependency indexes.
+    """
+    def __init__(self, cache_dir, verbose=False):
+        self.cache_dir = cache_dir
+        self.verbose = verbose
+
+    def get_cache_file_path(self, names_and_paths):
+        """
+        Returns the path of the cache file for the specified maven_install
+        rules.
+        """
+        names = "-".join([name for name, _ in names_and_paths])
+        return os.path.join(self.cache_dir, "%s.pickle" % names)
+
+    def get(self, names_and_paths, label_to_overridden_fq_label):
+        """
+        Returns the cached result of bazel.parse_maven_install for the
+        specified pinned files and overrides, None if the cache does not
+        have a (valid) result for them.
+        """
+        key = _get_key(names_and_paths, label_to_overridden_fq_label)
+        cache_file_path = self.get_cache_file_path(names_and_paths)
+        try:
+            with open(cache_file_path, "rb") as f:
+                snapshot = pickle.load(f)
+            dep_and_transitives = _from_snapshot(snapshot, key)
+        except Exception as e:
+            # missing, stale or unreadable cache file
+            if self.verbose:
+                logger.debug("Not using maven install cache [%s]: %s" % (cache_file_path, e))
+            return None
+        if self.verbose:
+            logger.debug("Loaded %i deps from maven install cache [%s]" % (len(dep_and_transitives), cache_file_path))
+        return dep_and_transitives
+
+    def put(self, names_and_paths, label_to_overridden_fq_label,
+            dep_and_transitives):
+        """
+        Stores the result of bazel.parse_maven_install for the specified
+        pinned files and overrides.
+        """
+        key = _get_key(names_and_paths, label_to_overridden_fq_label)
+        snapshot = _to_snapshot(dep_and_transitives, key)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.get_cache_file_path(names_and_paths))
+
+
+class _NoopMavenInstallCache:
+    def get(self, names_and_paths, label_to_overridden_fq_label):
+        return None
+
+    def put(self, names_and_paths, label_to_overridden_fq_label,
+            dep_and_transitives):
+        pass
+
+
+NOOP = _NoopMavenInstallCache()
+
+
+def get_maven_install_cache(repo_root_path, cache_dir, verbose=False):
+    """
+    Returns the MavenInstallCache instance to use, NOOP if no cache_dir is
+    configured.
+    """
+    if cache_dir is None:
+        return NOOP
+    cache_dir = os.path.join(repo_root_path, os.path.expanduser(cache_dir))
+    return MavenInstallCache(cache_dir, verbose)
+
+
+def _to_snapshot(dep_and_transitives, key):
+    deps = [dep for dep, _ in dep_and_transitives]
+    dep_id_to_index = {id(dep): i for i, dep in enumerate(deps)}
+    closure_offsets = array("I", [0])
+    closure_dep_indexes = array("I")
+    for _, transitives in dep_and_transitives:
+        closure_dep_indexes.extend([dep_id_to_index[id(t)] for t in transitives])
+        closure_offsets.append(len(closure_dep_indexes))
+    return {
+        "version": CACHE_FORMAT_VERSION,
+        "key": key,
+        "deps": deps,
+        "closure_offsets": closure_offsets,
+        "closure_dep_indexes": closure_dep_indexes,
+    }
+
+
+def _from_snapshot(snapshot, key):
+    if snapshot.get("version") != CACHE_FORMAT_VERSION:
+        raise Exception("unexpected cache format version [%s]" % snapshot.get("version"))
+    if snapshot.get("key") != key:
+        raise Exception("pinned files, overrides or pomgen have changed")
+    deps = snapshot["deps"]
+    closure_offsets = snapshot["closure_offsets"]
+    closure_dep_indexes = snapshot["closure_dep_indexes"]
+    if len(closure_offsets) != len(deps) + 1 or closure_offsets[-1] != len(closure_dep_indexes):
+        raise Exception("inconsistent closure table")
+    if len(closure_dep_indexes) > 0 and max(closure_dep_indexes) >= len(deps):
+        raise Exception("inconsistent closure table")
+    dep_and_transitives = []
+    for i, dep in enumerate(deps):
+        indexes = closure_dep_indexes[closure_offsets[i]:closure_offsets[i + 1]]
+        dep_and_transitives.append((dep, [deps[j] for j in indexes],))
+    return dep_and_transitives
+
+
+def _get_key(names_and_paths, label_to_overridden_fq_label):
+    key = hashlib.sha256()
+    key.update(CACHE_FORMAT_VERSION.encode())
+    key.update(b"\0")
+    for module in _VERSIONED_MODULES:
+        key.update(_get_file_digest(module.__file__).encode())
+    for name, path in names_and_paths:
+        key.update(b"\0")
+        key.update(name.encode())
+        key.update(b"\0")
+        key.update(_get_file_digest(path).encode())
+    for unqual_label, fq_label in sorted(label_to_overridden_fq_label.items()):
+        key.update(b"\0")
+        key.update(("%s=%s" % (unqual_label, fq_label)).encode())
+    return key.hexdigest()
+
+
+def _get_file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
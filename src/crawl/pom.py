@@ -7,11 +7,14 @@ For full license text, see the LICENSE file in the repo root or https://opensour
 This module contains pom.xml generation logic.
 """
 
+import collections.abc
 from common import pomgenmode
 import copy
 from crawl import pomparser
+from crawl import pomtemplate
 import os
-import re
+import types
+import weakref
 
 
 class PomContentType:
@@ -139,87 +142,53 @@ class AbstractPomGen(object):
         """
         return PomContentType.MASKED_VERSION if pomcontenttype is PomContentType.GOLDFILE and dep.bazel_package is not None else dep.version
 
-    def _xml(self, content, element, indent, value=None, close_element=False):
+    def _gen_dependency_element(self, pomcontenttype, dep, writer, close_element):
         """
-        Helper method used to generated xml.
+        Writes a <dependency> element, using the specified XmlWriter.
 
         This method is only intended to be called by subclasses.
         """
-        if value is None:
-            if close_element:
-                return "%s%s</%s>%s" % (content, ' '*(indent - _INDENT), element, os.linesep), indent - _INDENT
-            else:
-                return "%s%s<%s>%s" % (content, ' '*indent, element, os.linesep), indent + _INDENT
-        else:
-            return "%s%s<%s>%s</%s>%s" % (content, ' '*indent, element, value, element, os.linesep), indent
-
-    def _xml_comment(self, comment, indent):
-        """
-        Returns a single line <!-- xml comment -->.
-        """
-        return "\n%s<!-- %s -->\n" % (' '*indent, comment)
-
-    def _gen_dependency_element(self, pomcontenttype, dep, content, indent, close_element):
-        """
-        Generates a <dependency> element.
-
-        Returns the generated content and the current identation level as a 
-        tuple: (content, indent)
-
-        This method is only intended to be called by subclasses.
-        """
-        content, indent = self._xml(content, "dependency", indent)
-        content, indent = self._xml(content, "groupId", indent, dep.group_id)
-        content, indent = self._xml(content, "artifactId", indent, dep.artifact_id)
-        content, indent = self._xml(content, "version", indent, self._dep_version(pomcontenttype, dep))
+        writer.open_element("dependency")
+        writer.element("groupId", dep.group_id)
+        writer.element("artifactId", dep.artifact_id)
+        writer.element("version", self._dep_version(pomcontenttype, dep))
         classifier = self._workspace.dependency_metadata.get_classifier(dep)
         if classifier is not None:
-            content, indent = self._xml(content, "classifier", indent, classifier)
+            writer.element("classifier", classifier)
         if dep.scope is not None:
-            content, indent = self._xml(content, "scope", indent, dep.scope)
+            writer.element("scope", dep.scope)
         if close_element:
-            content, indent = self._xml(content, "dependency", indent, close_element=True)
-        return content, indent
+            writer.close_element("dependency")
 
-    def _gen_exclusions(self, content, indent, group_and_artifact_ids):
+    def _gen_exclusions(self, writer, group_and_artifact_ids):
         """
-        This method is only intended to be called by subclasses.
-        """
-        content, indent = self._xml(content, "exclusions", indent)
-        for ga in group_and_artifact_ids:
-            content, indent = self._xml(content, "exclusion", indent)
-            content, indent = self._xml(content, "groupId", indent, ga[0])
-            content, indent = self._xml(content, "artifactId", indent, ga[1])
-            content, indent = self._xml(content, "exclusion", indent, close_element=True)
-        content, indent = self._xml(content, "exclusions", indent, close_element=True)
-        return content, indent
+        Writes an <exclusions> element, using the specified XmlWriter.
 
-    def _remove_token(self, content, token_name):
-        """
         This method is only intended to be called by subclasses.
         """
-        # assumes token is on one line by itself
-        i = content.find(token_name)
-        if i == -1:
-            return content
-        else:
-            j = content.find(os.linesep, i)
-            if j == -1:
-                j = len(content) - 1
-            return content[:i] + content[j+len(os.linesep):]
+        writer.open_element("exclusions")
+        for ga in group_and_artifact_ids:
+            writer.open_element("exclusion")
+            writer.element("groupId", ga[0])
+            writer.element("artifactId", ga[1])
+            writer.close_element("exclusion")
+        writer.close_element("exclusions")
 
     def _gen_description(self, description):
-        content = ""
-        content, indent = self._xml(content, "description", indent=_INDENT)
-        content = "%s%s%s%s" % (content, ' '*indent, description, os.linesep)
-        content, indent = self._xml(content, "description", indent=indent, close_element=True)
-        return content
+        writer = XmlWriter(indent=_INDENT)
+        writer.open_element("description")
+        writer.line(description)
+        writer.close_element("description")
+        return writer.get_content()
 
-    def _handle_description(self, content, description):
+    def _get_description_property(self, description):
+        """
+        Returns the value of the #{description} placeholder.
+        """
         if description is None:
-            return self._remove_token(content, "#{description}")
+            return pomtemplate.REMOVE_LINE
         else:
-            return content.replace("#{description}", self._gen_description(description))
+            return self._gen_description(description)
 
 class NoopPomGen(AbstractPomGen):
     """
@@ -250,21 +219,29 @@ class TemplatePomGen(AbstractPomGen):
     def gen(self, pomcontenttype):
         pom_content = self.artifact_def.custom_pom_template_content
         pom_content, parsed_dependencies = self._process_pom_template_content(pom_content)
+        template = pomtemplate.get_template(pom_content)
 
         properties = self._get_properties(pomcontenttype, parsed_dependencies)
 
+        # the values of these properties are templates themselves
+        initial_properties = {}
         for k in TemplatePomGen.INITAL_PROPERTY_SUBSTITUTIONS:
             if k in properties:
-                pom_content = pom_content.replace("#{%s}" % k, properties[k])
+                initial_properties[k] = pomtemplate.PomTemplate(properties[k])
                 del properties[k]
 
-        for k in properties.keys():
-            pom_content = pom_content.replace("#{%s}" % k, properties[k])
-
-        bad_refs = [match.group(1) for match in re.finditer(r"""\#\{(.*?)\}""", pom_content) if len(match.groups()) == 1]
+        bad_refs = []
+        for k in template.placeholders:
+            if k in initial_properties:
+                bad_refs += initial_properties[k].get_unresolved_placeholders(properties)
+            elif k not in properties:
+                bad_refs.append(k)
         if len(bad_refs) > 0:
             raise Exception("pom template [%s] has unresolvable references: %s" % (self._artifact_def, bad_refs))
-        return pom_content
+
+        for k, initial_property_template in initial_properties.items():
+            properties[k] = initial_property_template.render(properties)
+        return template.render(properties)
 
     def _process_pom_template_content(self, pom_template_content):
         """
@@ -309,55 +286,25 @@ class TemplatePomGen(AbstractPomGen):
         # many maven_install rules, but they all reference the same maven 
         # artifact versions.
         #
-        # name -> version
-        key_to_version = {}
-
-        # internal bookeeping for this method
-        key_to_dep = {}
-
         # the version of these dependencies may be referenced in the pom
         # template:
         # all external deps + deps built out of the monorepo that are
         # transitives of this library
-        all_deps = \
-            list(self._workspace.external_dependencies) + \
-            [d for d in self.dependencies_library_transitive_closure if d.bazel_package is not None]
-
-        for dep in all_deps:
-            key = self._get_unqual_ga_key(dep)
-            version_ref_must_be_fq = False
-            if key in key_to_version:
-                conflicting_dep = key_to_dep[key]
-                # check whether this conflict requires version refs to be fully
-                # qualified or if it is fatal (method below raises)
-                version_ref_must_be_fq = self._check_for_dep_conflict(dep, conflicting_dep)
-                # remove unqualified names added for the conflicting dep
-                del key_to_version[self._get_unqual_label_key(conflicting_dep)]
-                del key_to_version[key]
-            version_from_dep = self._dep_version(pomcontenttype, dep)
-            if not version_ref_must_be_fq:
-                # the key (groupId:artifactId:version) is not fully qualified,
-                # only the name prefixed with the maven_install rule name is
-                key_to_version[key] = version_from_dep
-            key_to_dep[key] = dep
-            if dep.bazel_label_name is not None:
-                # this is fq name, leading with the maven_install name
-                key = "%s.version" % dep.bazel_label_name
-                if key in key_to_version and version_from_dep != key_to_version[key]:
-                    raise Exception("%s version: %s is already in versions, previous: %s" % (key, self._dep_version(pomcontenttype, dep), key_to_version[key]))
-                key_to_version[key] = dep.version
-                key_to_dep[key] = dep
-
-                if not version_ref_must_be_fq:
-                    # we'll also allow usage of the unqualified label as a key
-                    # so "com_google_guava_guava" instead of
-                    # "@maven//:com_google_guava_guava"
-                    # this works well if the repository is setup in such a way
-                    # that all Maven artifacts have the same version, regardless
-                    # of which maven install rule they are managed by
-                    # if the versions differ, then the fully qualified label
-                    # name has to be used
-                    key_to_version[self._get_unqual_label_key(dep)] = dep.version
+        #
+        # the properties of all external deps are the same for all
+        # artifacts, they are computed once per workspace, and layered under
+        # the properties of this artifact
+        external_key_to_version, external_key_to_dep = self._get_external_version_properties()
+
+        # name -> version
+        key_to_version = _OverlayDict(external_key_to_version)
+
+        # internal bookeeping for this method
+        key_to_dep = _OverlayDict(external_key_to_dep)
+
+        for dep in self.dependencies_library_transitive_closure:
+            if dep.bazel_package is not None:
+                self._add_version_properties(pomcontenttype, dep, key_to_version, key_to_dep)
 
         # the maven coordinates of this artifact can be referenced directly:
         key_to_version["artifact_id"] = self._artifact_def.artifact_id
@@ -366,6 +313,63 @@ class TemplatePomGen(AbstractPomGen):
 
         return key_to_version
 
+    def _get_external_version_properties(self):
+        """
+        Returns the version properties of all external dependencies of the
+        workspace, as read-only dictionaries: (key_to_version, key_to_dep).
+        """
+        # the cached properties are never invalidated: this relies on
+        # workspace.external_dependencies parsing all maven_install rules, so
+        # that no external dependency is registered after they are computed
+        properties = _WORKSPACE_TO_EXTERNAL_VERSION_PROPERTIES.get(self._workspace)
+        if properties is None:
+            key_to_version = {}
+            key_to_dep = {}
+            for dep in self._workspace.external_dependencies:
+                # the version of external deps does not depend on the
+                # pomcontenttype
+                self._add_version_properties(PomContentType.RELEASE, dep, key_to_version, key_to_dep)
+            properties = (types.MappingProxyType(key_to_version),
+                          types.MappingProxyType(key_to_dep))
+            _WORKSPACE_TO_EXTERNAL_VERSION_PROPERTIES[self._workspace] = properties
+        return properties
+
+    def _add_version_properties(self, pomcontenttype, dep, key_to_version, key_to_dep):
+        key = self._get_unqual_ga_key(dep)
+        version_ref_must_be_fq = False
+        if key in key_to_version:
+            conflicting_dep = key_to_dep[key]
+            # check whether this conflict requires version refs to be fully
+            # qualified or if it is fatal (method below raises)
+            version_ref_must_be_fq = self._check_for_dep_conflict(dep, conflicting_dep)
+            # remove unqualified names added for the conflicting dep
+            del key_to_version[self._get_unqual_label_key(conflicting_dep)]
+            del key_to_version[key]
+        version_from_dep = self._dep_version(pomcontenttype, dep)
+        if not version_ref_must_be_fq:
+            # the key (groupId:artifactId:version) is not fully qualified,
+            # only the name prefixed with the maven_install rule name is
+            key_to_version[key] = version_from_dep
+        key_to_dep[key] = dep
+        if dep.bazel_label_name is not None:
+            # this is fq name, leading with the maven_install name
+            key = "%s.version" % dep.bazel_label_name
+            if key in key_to_version and version_from_dep != key_to_version[key]:
+                raise Exception("%s version: %s is already in versions, previous: %s" % (key, self._dep_version(pomcontenttype, dep), key_to_version[key]))
+            key_to_version[key] = dep.version
+            key_to_dep[key] = dep
+
+            if not version_ref_must_be_fq:
+                # we'll also allow usage of the unqualified label as a key
+                # so "com_google_guava_guava" instead of
+                # "@maven//:com_google_guava_guava"
+                # this works well if the repository is setup in such a way
+                # that all Maven artifacts have the same version, regardless
+                # of which maven install rule they are managed by
+                # if the versions differ, then the fully qualified label
+                # name has to be used
+                key_to_version[self._get_unqual_label_key(dep)] = dep.version
+
     def _get_unqual_ga_key(self, dep):
         return "%s:version" % dep.maven_coordinates_name
 
@@ -416,32 +420,30 @@ class TemplatePomGen(AbstractPomGen):
     def _build_template_only_deps_property_content(self, deps,
                                                    pom_template_parsed_deps,
                                                    indent):
-        content = ""
+        content = []
         for dep in deps:
             raw_xml = pom_template_parsed_deps.get_parsed_xml_str_for(dep)
-            content += pomparser.indent_xml(raw_xml, indent)
-        content = content.rstrip()
-        return content
+            content.append(pomparser.indent_xml(raw_xml, indent))
+        return "".join(content).rstrip()
 
     def _build_deps_property_content(self, deps, pom_template_parsed_deps, 
                                      pomcontenttype, indent):
 
-        content = ""
+        writer = XmlWriter(indent)
         deps = _sort(deps)
         for dep in deps:
             dep = self._copy_attributes_from_parsed_dep(dep, pom_template_parsed_deps)
             pom_template_exclusions = pom_template_parsed_deps.get_parsed_exclusions_for(dep)
             dep_has_exclusions = len(pom_template_exclusions) > 0
-            content, indent = self._gen_dependency_element(pomcontenttype, dep, content, indent, close_element=not dep_has_exclusions)
+            self._gen_dependency_element(pomcontenttype, dep, writer, close_element=not dep_has_exclusions)
             if dep_has_exclusions:
                 exclusions = list(pom_template_exclusions)
                 exclusions.sort()
                 group_and_artifact_ids = [(d.group_id, d.artifact_id) for d in exclusions]
-                content, indent = self._gen_exclusions(content, indent, group_and_artifact_ids)
-                content, indent = self._xml(content, "dependency", indent, close_element=True)
+                self._gen_exclusions(writer, group_and_artifact_ids)
+                writer.close_element("dependency")
 
-        content = content.rstrip()
-        return content
+        return writer.get_content().rstrip()
 
     def _copy_attributes_from_parsed_dep(self, dep, pom_template_parsed_deps):
         # check attributes of parsed deps in the pom template
@@ -478,48 +480,46 @@ class DynamicPomGen(AbstractPomGen):
         self.excluded_deps = excluded_deps
 
     def gen(self, pomcontenttype):
-        content = self.pom_template.replace("#{group_id}", self._artifact_def.group_id)
-        content = content.replace("#{artifact_id}", self._artifact_def.artifact_id)
-        version = self._artifact_def_version(pomcontenttype)
-        content = content.replace("#{version}", version)
-        content = self._handle_description(content, self.pom_content.description)
+        properties = {
+            "group_id": self._artifact_def.group_id,
+            "artifact_id": self._artifact_def.artifact_id,
+            "version": self._artifact_def_version(pomcontenttype),
+            "description": self._get_description_property(self.pom_content.description),
+        }
         if len(self.dependencies) == 0:
-            content = self._remove_token(content, "#{dependencies}")
+            properties["dependencies"] = pomtemplate.REMOVE_LINE
         else:
-            content = content.replace(
-                "#{dependencies}", self._gen_dependencies(pomcontenttype))
-        return content
+            properties["dependencies"] = self._gen_dependencies(pomcontenttype)
+        return pomtemplate.get_template(self.pom_template).render(properties)
 
     def _gen_dependencies(self, pomcontenttype):
-        content = ""
-        content, indent = self._xml(content, "dependencies", indent=_INDENT)
-        content += self._gen_dependencies_xml(pomcontenttype, self.dependencies, indent)
+        writer = XmlWriter(indent=_INDENT)
+        writer.open_element("dependencies")
+        self._gen_dependencies_xml(pomcontenttype, self.dependencies, writer)
 
         # we also add the transitives of the deps to dependencies - this is to
         # account for any version overrides that need to carry over to the
         # Maven build.
         transitives = self._get_transitive_deps(self.dependencies)
         if len(transitives) > 0:
-            content += self._xml_comment("The transitives of the dependencies above", indent)
-            content += self._gen_dependencies_xml(pomcontenttype, transitives, indent)
+            writer.comment("The transitives of the dependencies above")
+            self._gen_dependencies_xml(pomcontenttype, transitives, writer)
 
-        content, indent = self._xml(content, "dependencies", indent, close_element=True)
-        return content
+        writer.close_element("dependencies")
+        return writer.get_content()
 
-    def _gen_dependencies_xml(self, pomcontenttype, dependencies, indent):
+    def _gen_dependencies_xml(self, pomcontenttype, dependencies, writer):
         if pomcontenttype == PomContentType.GOLDFILE:
             dependencies = sorted(dependencies)
-        content = ""
         for dep in dependencies:
-            content, indent = self._gen_dependency_element(pomcontenttype, dep, content, indent, close_element=False)
+            self._gen_dependency_element(pomcontenttype, dep, writer, close_element=False)
             # handle <exclusions>
             # if a dep is built in the shared-repo, do not add any exclusions, they will do that themselves.
             if not dep.bazel_buildable:
                 # exclude all transitives from <dependencies> as all transitives are already root level anyway
                 excluded_group_and_artifact_ids = [("*", "*")]
-                content, indent = self._gen_exclusions(content, indent, excluded_group_and_artifact_ids)
-            content, indent = self._xml(content, "dependency", indent, close_element=True)
-        return content
+                self._gen_exclusions(writer, excluded_group_and_artifact_ids)
+            writer.close_element("dependency")
 
     def _get_transitive_deps(self, dependencies):
         """
@@ -530,7 +530,7 @@ class DynamicPomGen(AbstractPomGen):
         transitives_set = set()
         dependencies_set = set(dependencies)
         for dep in dependencies:
-            for transitive in self._workspace.dependency_metadata.get_transitive_closure(dep):
+            for transitive in self._workspace.get_transitive_closure(dep):
                 if transitive in transitives_set:
                     # avoid duplication
                     pass
@@ -574,19 +574,21 @@ class DependencyManagementPomGen(AbstractPomGen):
 
     def gen(self, pomcontenttype):
         assert pomcontenttype == PomContentType.RELEASE
-        content = self.pom_template.replace("#{group_id}", self._artifact_def.group_id)
-        # by convention, we add the suffix ".depmanagement" to the artifactId
-        # so com.blah is the real jar artifact and com.blah.depmanagement
-        # is the dependency management pom for that artifact
-        content = content.replace("#{artifact_id}", "%s.depmanagement" % self._artifact_def.artifact_id)
-        version = self._artifact_def_version(pomcontenttype)
-        content = content.replace("#{version}", version)
-        content = self._handle_description(content, self.pom_content.description)
+        properties = {
+            "group_id": self._artifact_def.group_id,
+            # by convention, we add the suffix ".depmanagement" to the
+            # artifactId so com.blah is the real jar artifact and
+            # com.blah.depmanagement is the dependency management pom for
+            # that artifact
+            "artifact_id": "%s.depmanagement" % self._artifact_def.artifact_id,
+            "version": self._artifact_def_version(pomcontenttype),
+            "description": self._get_description_property(self.pom_content.description),
+        }
         if len(self.dependencies_artifact_transitive_closure) == 0:
-            content = self._remove_token(content, "#{dependencies}")
+            properties["dependencies"] = pomtemplate.REMOVE_LINE
         else:
-            dep_man_content = self._gen_dependency_management(self.dependencies_artifact_transitive_closure)
-            content = content.replace("#{dependencies}", dep_man_content)
+            properties["dependencies"] = self._gen_dependency_management(self.dependencies_artifact_transitive_closure)
+        content = pomtemplate.get_template(self.pom_template).render(properties)
 
         # we assume the template specified <packaging>jar</packaging>
         # there's room for improvement here for sure
@@ -598,14 +600,14 @@ class DependencyManagementPomGen(AbstractPomGen):
         return content
 
     def _gen_dependency_management(self, deps):
-        content = ""
-        content, indent = self._xml(content, "dependencyManagement", indent=_INDENT)
-        content, indent = self._xml(content, "dependencies", indent)
+        writer = XmlWriter(indent=_INDENT)
+        writer.open_element("dependencyManagement")
+        writer.open_element("dependencies")
         for dep in deps:
-            content, indent = self._gen_dependency_element(PomContentType.RELEASE, dep, content, indent, close_element=True)
-        content, indent = self._xml(content, "dependencies", indent, close_element=True)
-        content, indent = self._xml(content, "dependencyManagement", indent, close_element=True)
-        return content
+            self._gen_dependency_element(PomContentType.RELEASE, dep, writer, close_element=True)
+        writer.close_element("dependencies")
+        writer.close_element("dependencyManagement")
+        return writer.get_content()
 
 
 class PomWithCompanionDependencyManagementPomGen(AbstractPomGen):
@@ -637,6 +639,100 @@ class PomWithCompanionDependencyManagementPomGen(AbstractPomGen):
         return (self.depmanpomgen,)
 
 
+class XmlWriter:
+    """
+    Writes xml content, one line at a time, keeping track of the current
+    indentation.
+
+    The lines are collected and only joined by get_content, so the time it
+    takes to write the content grows linearly with its size.
+    """
+    def __init__(self, indent=0):
+        self.indent = indent
+        self._lines = []
+
+    def open_element(self, element):
+        """
+        Writes <element>, the following lines are indented one more level.
+        """
+        self._lines.append("%s<%s>%s" % (' '*self.indent, element, os.linesep))
+        self.indent += _INDENT
+
+    def close_element(self, element):
+        """
+        Writes </element>, at the indentation level of the matching
+        open_element.
+        """
+        self.indent -= _INDENT
+        self._lines.append("%s</%s>%s" % (' '*self.indent, element, os.linesep))
+
+    def element(self, element, value):
+        """
+        Writes <element>value</element>.
+        """
+        self._lines.append("%s<%s>%s</%s>%s" % (' '*self.indent, element, value, element, os.linesep))
+
+    def line(self, value):
+        self._lines.append("%s%s%s" % (' '*self.indent, value, os.linesep))
+
+    def comment(self, comment):
+        """
+        Writes a single line <!-- xml comment -->, surrounded by empty lines.
+        """
+        self._lines.append("\n%s<!-- %s -->\n" % (' '*self.indent, comment))
+
+    def get_content(self):
+        return "".join(self._lines)
+
+
+class _OverlayDict(collections.abc.MutableMapping):
+    """
+    A dictionary layered over a read-only base mapping: updates, including
+    deletions of keys of the base mapping, are only applied to this
+    dictionary.
+    """
+    def __init__(self, base):
+        self._base = base
+        self._overlay = {}
+        self._deleted_keys = set()
+
+    def __getitem__(self, key):
+        if key in self._overlay:
+            return self._overlay[key]
+        if key in self._deleted_keys:
+            raise KeyError(key)
+        return self._base[key]
+
+    def __contains__(self, key):
+        return key in self._overlay or (key in self._base and key not in self._deleted_keys)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def __setitem__(self, key, value):
+        self._overlay[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._overlay.pop(key, None)
+        if key in self._base:
+            self._deleted_keys.add(key)
+
+    def __iter__(self):
+        for key in self._base:
+            if key not in self._overlay and key not in self._deleted_keys:
+                yield key
+        yield from self._overlay
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+# workspace -> the version properties of its external dependencies
+_WORKSPACE_TO_EXTERNAL_VERSION_PROPERTIES = weakref.WeakKeyDictionary()
+
+
 _INDENT = pomparser.INDENT
 
 
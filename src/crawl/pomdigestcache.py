@@ -0,0 +1,172 @@
+"""
+Copyright (c) 2025, salesforce.com, inc.
+All rights reserved.
+SPDX-License-Identifier: BSD-3-Clause
+For full license text, see the LICENSE file in the repo root or https://opensource.org/licenses/BSD-3-Clause
+
+
+This module persists the comparison digests (see
+pomparser.get_digest_for_comparison) of released poms across pomgen
+invocations: released poms rarely change, so their digest only needs to be
+computed once.
+
+Digests are keyed by the sha256 of the pom content. They are stored in a
+single pickle file, in the crawl cache directory.
+"""
+
+from common import logger
+from crawl import pomparser
+import hashlib
+import os
+import pickle
+import tempfile
+
+
+# bump this when the format of the cache file changes
+CACHE_FORMAT_VERSION = "1"
+
+
+CACHE_FILE_NAME = "pom_digests.pickle"
+
+
+DEFAULT_MAX_ENTRIES = 20000
+
+
+class PomDigestCache:
+    """
+    On-disk cache of pom comparison digests.
+
+    The cache is read by load, or the first time it is needed, and written
+    by save. Once the cache holds more than max_entries digests, the least
+    recently used digests are dropped.
+    """
+    def __init__(self, cache_dir, max_entries=DEFAULT_MAX_ENTRIES,
+                 verbose=False):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.verbose = verbose
+        self._key_to_digest = None # content sha256 -> digest, least recently used first
+        self._updated = False
+
+    @property
+    def cache_file_path(self):
+        return os.path.join(self.cache_dir, CACHE_FILE_NAME)
+
+    def load(self):
+        """
+        Reads the cache file, if it has not been read yet.
+        """
+        self._get_key_to_digest()
+
+    def get_digest(self, pom_content):
+        """
+        Returns the comparison digest of the specified pom content, from the
+        cache if possible.
+        """
+        digest = self._get_key_to_digest().get(_get_content_key(pom_content))
+        if digest is None:
+            digest = pomparser.get_digest_for_comparison(pom_content)
+        self.put(pom_content, digest)
+        return digest
+
+    def put(self, pom_content, digest):
+        """
+        Stores the comparison digest of the specified pom content, computed
+        by pomparser.get_digest_for_comparison.
+        """
+        key = _get_content_key(pom_content)
+        key_to_digest = self._get_key_to_digest()
+        # (re-)inserting the digest makes it the most recently used one
+        if key_to_digest.pop(key, None) != digest:
+            self._updated = True
+        key_to_digest[key] = digest
+
+    def save(self):
+        """
+        Writes the cache file, if digests have been added.
+        """
+        if not self._updated:
+            return
+        key_to_digest = self._get_key_to_digest()
+        evicted_keys = list(key_to_digest)[:max(0, len(key_to_digest) - self.max_entries)]
+        for key in evicted_keys:
+            del key_to_digest[key]
+        snapshot = {
+            "version": CACHE_FORMAT_VERSION,
+            "key": _get_key(),
+            "digests": key_to_digest,
+        }
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.cache_file_path)
+        self._updated = False
+        if self.verbose:
+            logger.debug("Wrote %i pom digests [%s]" % (len(key_to_digest), self.cache_file_path))
+
+    def _get_key_to_digest(self):
+        if self._key_to_digest is None:
+            self._key_to_digest = self._load()
+        return self._key_to_digest
+
+    def _load(self):
+        try:
+            with open(self.cache_file_path, "rb") as f:
+                snapshot = pickle.load(f)
+            if snapshot.get("version") != CACHE_FORMAT_VERSION:
+                raise Exception("unexpected cache format version [%s]" % snapshot.get("version"))
+            if snapshot.get("key") != _get_key():
+                raise Exception("pomgen has changed")
+            key_to_digest = snapshot["digests"]
+        except Exception as e:
+            # missing, stale or unreadable cache file
+            if self.verbose:
+                logger.debug("Not using pom digests [%s]: %s" % (self.cache_file_path, e))
+            return {}
+        return key_to_digest
+
+
+class _NoopPomDigestCache:
+    def load(self):
+        pass
+
+    def get_digest(self, pom_content):
+        return pomparser.get_digest_for_comparison(pom_content)
+
+    def put(self, pom_content, digest):
+        pass
+
+    def save(self):
+        pass
+
+
+NOOP = _NoopPomDigestCache()
+
+
+def get_pom_digest_cache(repo_root_path, cache_dir, enabled=True, verbose=False):
+    """
+    Returns the PomDigestCache instance to use, NOOP if the cache is disabled
+    or if no cache_dir is configured.
+    """
+    if not enabled or cache_dir is None:
+        return NOOP
+    cache_dir = os.path.join(repo_root_path, os.path.expanduser(cache_dir))
+    return PomDigestCache(cache_dir, verbose=verbose)
+
+
+def _get_content_key(pom_content):
+    return hashlib.sha256(pom_content.encode()).hexdigest()
+
+
+def _get_key():
+    """
+    The digest logic is part of the cache key, so that digests computed by
+    another version of pomgen are not used.
+    """
+    key = hashlib.sha256()
+    key.update(CACHE_FORMAT_VERSION.encode())
+    key.update(b"\0")
+    with open(pomparser.__file__, "rb") as f:
+        key.update(f.read())
+    return key.hexdigest()
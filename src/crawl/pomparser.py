@@ -10,6 +10,7 @@ pom.xml parsing.
 """
 from collections import defaultdict
 from crawl import dependency
+import hashlib
 import os
 
 
@@ -25,8 +26,13 @@ def format_for_comparison(pom_content):
     """
     Returns the pom as a string without:
         - comments
+        - processing instructions
         - superfluous whitespace
         - the root <description> element
+
+    The pom is formatted from its canonical form, see
+    get_digest_for_comparison: two poms are formatted to the same string if
+    and only if they have the same digest.
     """
     etree = _import_lxml()
     if etree is None:
@@ -34,7 +40,40 @@ def format_for_comparison(pom_content):
         # as we'd like
         return pom_content.strip()
 
+    canonical_content = _get_canonical_content_for_comparison(etree, pom_content)
     parser = etree.XMLParser(remove_blank_text=True)
+    return _pretty_str(etree.XML(canonical_content, parser=parser))
+
+
+def get_digest_for_comparison(pom_content):
+    """
+    Returns a digest of the pom that ignores the same differences as
+    format_for_comparison: comments, processing instructions, superfluous
+    whitespace and the root <description> element. Since the digest is
+    computed from the canonical (C14N) form of the pom, the order of
+    attributes is ignored too.
+
+    This is cheaper than formatting the pom for comparison: the pom is not
+    pretty printed.
+    """
+    etree = _import_lxml()
+    if etree is None:
+        # see format_for_comparison
+        return hashlib.sha256(pom_content.strip().encode()).hexdigest()
+
+    canonical_content = _get_canonical_content_for_comparison(etree, pom_content)
+    return hashlib.sha256(canonical_content).hexdigest()
+
+
+def _get_canonical_content_for_comparison(etree, pom_content):
+    """
+    Returns the canonical (C14N) form of the pom, as bytes, without the
+    content that is ignored when comparing poms.
+    """
+    # the parser drops comments and processing instructions, the text
+    # around them is kept
+    parser = etree.XMLParser(remove_blank_text=True, remove_comments=True,
+                             remove_pis=True)
     tree = etree.XML(pom_content.encode().strip(), parser=parser)
 
     # remove <description>, if it exists
@@ -42,18 +81,11 @@ def format_for_comparison(pom_content):
     if description_el is not None:
         tree.remove(description_el)
 
-    # remove comments
-    comments = tree.xpath("//comment()")
-    for c in comments:
-        p = c.getparent()
-        if p is not None:
-            p.remove(c)
-
-    return _pretty_str(tree)
+    return etree.tostring(tree, method="c14n")
 
 
 def indent_xml(xml_content, indent):
-    indented_xml = ""
+    indented_lines = []
     current_indent = indent
     for line in xml_content.splitlines():
         line = line.strip()
@@ -61,11 +93,11 @@ def indent_xml(xml_content, indent):
         if line.startswith("</"):
             current_indent -= INDENT
             handled_indent = True
-        indented_xml += (' '*current_indent) + line + os.linesep
+        indented_lines.append((' '*current_indent) + line + os.linesep)
         if not handled_indent and line.startswith("<") and "</" not in line:
             current_indent += INDENT
             handled_indent = True
-    return indented_xml
+    return "".join(indented_lines)
 
 
 class ParsedDependencies:
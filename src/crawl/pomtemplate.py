@@ -0,0 +1,103 @@
+"""
+Copyright (c) 2025, salesforce.com, inc.
+All rights reserved.
+SPDX-License-Identifier: BSD-3-Clause
+For full license text, see the LICENSE file in the repo root or https://opensource.org/licenses/BSD-3-Clause
+
+
+Pom templates reference values using placeholders: #{name}. This module
+parses ("compiles") a template once, into literal and placeholder segments,
+so that rendering the template is a single pass over its segments, instead
+of one pass over the whole content for each value.
+"""
+
+import os
+import re
+
+
+# placeholder value: removes the first occurrence of the placeholder, together
+# with the rest of the line it is on
+REMOVE_LINE = object()
+
+
+class PomTemplate:
+    """
+    A parsed template. Instances are immutable.
+    """
+    def __init__(self, content):
+        self.content = content
+        self._literals = [] # one more literal than there are placeholders
+        self._placeholders = [] # placeholder names, in template order
+        start = 0
+        for match in _PLACEHOLDER_RE.finditer(content):
+            self._literals.append(content[start:match.start()])
+            self._placeholders.append(match.group(1))
+            start = match.end()
+        self._literals.append(content[start:])
+
+    @property
+    def placeholders(self):
+        """
+        The names of the placeholders in this template, in the order they
+        appear in, including duplicates.
+        """
+        return tuple(self._placeholders)
+
+    def get_unresolved_placeholders(self, properties):
+        """
+        Returns the names of the placeholders that do not have a value in the
+        specified dictionary, in the order they appear in.
+        """
+        return [name for name in self._placeholders if name not in properties]
+
+    def render(self, properties):
+        """
+        Returns the content of this template, with the placeholders replaced
+        by their value in the specified dictionary: name -> value.
+
+        Placeholders that do not have a value are kept as they are. If the
+        value of a placeholder is REMOVE_LINE, the first occurrence of the
+        placeholder is removed with the rest of its line, including the line
+        separator.
+        """
+        chunks = []
+        removed_placeholders = set()
+        skip_line = False
+        for i, literal in enumerate(self._literals):
+            if skip_line:
+                j = literal.find(os.linesep)
+                if j == -1:
+                    # the next placeholder is on the removed line too
+                    continue
+                literal = literal[j+len(os.linesep):]
+                skip_line = False
+            chunks.append(literal)
+            if i == len(self._placeholders):
+                break
+            name = self._placeholders[i]
+            value = properties.get(name)
+            if value is REMOVE_LINE and name not in removed_placeholders:
+                removed_placeholders.add(name)
+                skip_line = True
+            elif value is None or value is REMOVE_LINE:
+                chunks.append("#{%s}" % name)
+            else:
+                chunks.append(value)
+        return "".join(chunks)
+
+
+def get_template(content):
+    """
+    Returns the PomTemplate instance for the specified template content.
+    Templates are compiled once, and cached by content.
+    """
+    template = _CONTENT_TO_TEMPLATE.get(content)
+    if template is None:
+        template = _CONTENT_TO_TEMPLATE.setdefault(content, PomTemplate(content))
+    return template
+
+
+_PLACEHOLDER_RE = re.compile(r"""\#\{(.*?)\}""")
+
+
+_CONTENT_TO_TEMPLATE = {}
@@ -0,0 +1,344 @@
+"""
+Copyright (c) 2025, salesforce.com, inc.
+All rights reserved.
+SPDX-License-Identifier: BSD-3-Clause
+For full license text, see the LICENSE file in the repo root or https://opensource.org/licenses/BSD-3-Clause
+
+
+This module has the backends used to discover the dependencies of Bazel
+targets. Use get_query_backend to get the backend for a
+dependency_discovery_mode, see config.py.
+"""
+
+from common import label as labelm
+from common import logger
+from crawl import bazel
+import ast
+import os
+
+
+class AbstractQueryBackend(object):
+    """
+    Discovers the dependencies of Bazel targets.
+    """
+    def __init__(self, repo_root_path, verbose=False):
+        self.repo_root_path = repo_root_path
+        self.verbose = verbose
+
+    @property
+    def batched(self):
+        """
+        Whether this backend benefits from being passed many targets at once.
+        """
+        return True
+
+    def query_deps_attributes(self, target_pattern_to_dep_attributes):
+        """
+        target_pattern_to_dep_attributes is a dictionary of target_pattern ->
+        dep_attributes, for example:
+
+            {"//projects/libs/foo": ("deps", "runtime_deps")}
+
+        Returns a dictionary of target_pattern -> list of label strings, the
+        combined values of the dep_attributes of that target. Target patterns
+        that do not resolve to a rule are missing from the returned dictionary.
+        """
+        raise Exception("must be implemented in subclass")
+
+    def query_never_link_labels(self, labels):
+        """
+        Returns the subset of the specified labels (strings) that point to a
+        target that has neverlink set, as a set of label strings in their
+        canonical form.
+        """
+        raise Exception("must be implemented in subclass")
+
+
+class SubprocessQueryBackend(AbstractQueryBackend):
+    """
+    Runs one bazel query for each target.
+    """
+    @property
+    def batched(self):
+        return False
+
+    def query_deps_attributes(self, target_pattern_to_dep_attributes):
+        target_pattern_to_deps = {}
+        for target_pattern, dep_attributes in target_pattern_to_dep_attributes.items():
+            deps = bazel.query_java_library_deps_attributes(
+                self.repo_root_path, target_pattern, dep_attributes,
+                self.verbose)
+            target_pattern_to_deps[target_pattern] = list(deps)
+        return target_pattern_to_deps
+
+    def query_never_link_labels(self, labels):
+        return bazel.query_never_link_labels(self.repo_root_path, labels,
+                                             self.verbose)
+
+
+class BatchQueryBackend(AbstractQueryBackend):
+    """
+    Runs a single bazel query for all targets.
+    """
+    def query_deps_attributes(self, target_pattern_to_dep_attributes):
+        return bazel.query_java_library_deps_attributes_batch(
+            self.repo_root_path, target_pattern_to_dep_attributes,
+            self.verbose)
+
+    def query_never_link_labels(self, labels):
+        return bazel.query_never_link_labels(self.repo_root_path, labels,
+                                             self.verbose)
+
+
+# rules that are known to not add any dependencies to the ones listed in the
+# BUILD file, unlike macros
+OFFLINE_RULE_NAMES = ("java_library", "java_import", "java_binary", "java_plugin")
+
+
+# the OFFLINE_RULE_NAMES may be loaded from these repositories - a rule with
+# the same name loaded from anywhere else, for ex a repo-local .bzl file, is
+# assumed to be a macro
+OFFLINE_RULE_REPOSITORIES = ("@rules_java", "@@rules_java")
+
+
+class OfflineQueryBackend(AbstractQueryBackend):
+    """
+    Reads dependencies directly from BUILD files, without running bazel.
+
+    Targets that are not defined using one of the OFFLINE_RULE_NAMES (native,
+    or loaded from one of the OFFLINE_RULE_REPOSITORIES), or whose attribute
+    values cannot be evaluated statically, are delegated to the fallback
+    backend.
+    """
+    def __init__(self, repo_root_path, fallback_backend, verbose=False):
+        super(OfflineQueryBackend, self).__init__(repo_root_path, verbose)
+        self.fallback_backend = fallback_backend
+        self._package_to_build_file = {} # cache for parsed BUILD files
+
+    def query_deps_attributes(self, target_pattern_to_dep_attributes):
+        target_pattern_to_deps = {}
+        fallback_target_pattern_to_dep_attributes = {}
+        for target_pattern, dep_attributes in target_pattern_to_dep_attributes.items():
+            deps = self._get_deps(labelm.Label(target_pattern), dep_attributes)
+            if deps is None:
+                fallback_target_pattern_to_dep_attributes[target_pattern] = dep_attributes
+            else:
+                target_pattern_to_deps[target_pattern] = deps
+        if len(fallback_target_pattern_to_dep_attributes) > 0:
+            if self.verbose:
+                logger.debug("Falling back to bazel query for %s" % sorted(fallback_target_pattern_to_dep_attributes.keys()))
+            target_pattern_to_deps.update(self.fallback_backend.query_deps_attributes(fallback_target_pattern_to_dep_attributes))
+        return target_pattern_to_deps
+
+    def query_never_link_labels(self, labels):
+        never_link_labels = set()
+        fallback_labels = []
+        for label in labels:
+            label = labelm.Label(label)
+            never_link = self._get_never_link(label)
+            if never_link is None:
+                fallback_labels.append(label.canonical_form)
+            elif never_link:
+                never_link_labels.add(label.canonical_form)
+        if len(fallback_labels) > 0:
+            never_link_labels.update(self.fallback_backend.query_never_link_labels(fallback_labels))
+        return never_link_labels
+
+    def _get_deps(self, label, dep_attributes):
+        """
+        Returns the deps of the specified target, None if they cannot be
+        determined by parsing the BUILD file.
+        """
+        build_file = self._get_build_file(label.package_path)
+        if build_file is None:
+            return None
+        rule = build_file.get_rule(label.target)
+        if rule is None:
+            return None
+        deps = []
+        for attr in dep_attributes:
+            value = build_file.evaluate(rule.get(attr, []))
+            if not _is_list_of_strings(value):
+                return None
+            deps += [_to_fully_qualified_label(lbl, label.package_path) for lbl in value]
+        deps = bazel._sanitize_deps(deps)
+        return bazel._ensure_unique_deps(deps)
+
+    def _get_never_link(self, label):
+        """
+        Returns whether the specified target has neverlink set, None if this
+        cannot be determined by parsing the BUILD file.
+        """
+        build_file = self._get_build_file(label.package_path)
+        if build_file is None:
+            return None
+        rule = build_file.get_rule(label.target)
+        if rule is None:
+            return None
+        value = build_file.evaluate(rule.get("neverlink", False))
+        if not isinstance(value, (bool, int)):
+            return None
+        return bool(value)
+
+    def _get_build_file(self, package_path):
+        if package_path not in self._package_to_build_file:
+            self._package_to_build_file[package_path] = _parse_build_file(
+                self.repo_root_path, package_path)
+        return self._package_to_build_file[package_path]
+
+
+class _BuildFile:
+    """
+    The statically evaluated content of a BUILD file: its rules (only
+    OFFLINE_RULE_NAMES) and its top-level variables.
+    """
+    def __init__(self, name_to_rule, name_to_variable):
+        self.name_to_rule = name_to_rule
+        self.name_to_variable = name_to_variable
+
+    def get_rule(self, target):
+        """
+        Returns the rule with the specified name, as a dictionary of attribute
+        name -> ast node, None if there is no such rule.
+        """
+        return self.name_to_rule.get(target)
+
+    def evaluate(self, node):
+        """
+        Evaluates the specified ast node, returns _UNKNOWN if it cannot be
+        evaluated.
+        """
+        if not isinstance(node, ast.AST):
+            # default value
+            return node
+        if isinstance(node, ast.Constant):
+            return node.value
+        if isinstance(node, ast.List):
+            return [self.evaluate(e) for e in node.elts]
+        if isinstance(node, ast.Name):
+            if node.id in ("True", "False"):
+                return node.id == "True"
+            if node.id in self.name_to_variable:
+                return self.evaluate(self.name_to_variable[node.id])
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+            left = self.evaluate(node.left)
+            right = self.evaluate(node.right)
+            if isinstance(left, list) and isinstance(right, list):
+                return left + right
+        if isinstance(node, ast.Call) and _get_function_name(node) == "select":
+            # like bazel query's labels() function, return the values of
+            # all branches
+            if len(node.args) > 0 and isinstance(node.args[0], ast.Dict):
+                values = []
+                for value_node in node.args[0].values:
+                    value = self.evaluate(value_node)
+                    if not isinstance(value, list):
+                        return _UNKNOWN
+                    values += value
+                return values
+        return _UNKNOWN
+
+
+# marker for values that cannot be evaluated statically
+_UNKNOWN = object()
+
+
+def _parse_build_file(repo_root_path, package_path):
+    """
+    Returns a _BuildFile instance for the BUILD file of the specified package,
+    None if there is no BUILD file or if it cannot be parsed.
+    """
+    for build_file_name in ("BUILD.bazel", "BUILD"):
+        path = os.path.join(repo_root_path, package_path, build_file_name)
+        if os.path.exists(path):
+            break
+    else:
+        return None
+    with open(path, "r") as f:
+        content = f.read()
+    try:
+        module = ast.parse(content, filename=path)
+    except SyntaxError:
+        return None
+    name_to_rule = {}
+    name_to_variable = {}
+    loaded_name_to_rule_name = {} # local name -> OFFLINE_RULE_NAMES entry, None for other loaded symbols
+    for statement in module.body:
+        if isinstance(statement, ast.Assign):
+            if len(statement.targets) == 1 and isinstance(statement.targets[0], ast.Name):
+                name_to_variable[statement.targets[0].id] = statement.value
+        elif isinstance(statement, ast.Expr) and isinstance(statement.value, ast.Call):
+            call = statement.value
+            function_name = _get_function_name(call)
+            if function_name == "load":
+                loaded_name_to_rule_name.update(_get_loaded_rule_names(call))
+                continue
+            if isinstance(call.func, ast.Name) and function_name in loaded_name_to_rule_name:
+                function_name = loaded_name_to_rule_name[function_name]
+            if function_name in OFFLINE_RULE_NAMES:
+                attrs = {kw.arg: kw.value for kw in call.keywords if kw.arg is not None}
+                if "name" in attrs and isinstance(attrs["name"], ast.Constant):
+                    name_to_rule[attrs["name"].value] = attrs
+    return _BuildFile(name_to_rule, name_to_variable)
+
+
+def _get_loaded_rule_names(load_call):
+    """
+    Returns a dictionary of the names bound by the specified load statement:
+    local name -> loaded symbol, if it is one of the OFFLINE_RULE_NAMES loaded
+    from one of the OFFLINE_RULE_REPOSITORIES, None otherwise.
+    """
+    if len(load_call.args) == 0 or not isinstance(load_call.args[0], ast.Constant):
+        return {}
+    bzl_label = load_call.args[0].value
+    trusted = isinstance(bzl_label, str) and bzl_label.split("//")[0] in OFFLINE_RULE_REPOSITORIES
+    local_name_to_symbol = {}
+    for arg in load_call.args[1:]:
+        if isinstance(arg, ast.Constant):
+            local_name_to_symbol[arg.value] = arg.value
+    for kw in load_call.keywords:
+        if kw.arg is not None and isinstance(kw.value, ast.Constant):
+            local_name_to_symbol[kw.arg] = kw.value.value
+    return {local_name: symbol if trusted and symbol in OFFLINE_RULE_NAMES else None
+            for local_name, symbol in local_name_to_symbol.items()}
+
+
+def _get_function_name(call):
+    if isinstance(call.func, ast.Name):
+        return call.func.id
+    if isinstance(call.func, ast.Attribute):
+        # native.java_library
+        return call.func.attr
+    return None
+
+
+def _is_list_of_strings(value):
+    return isinstance(value, list) and all(isinstance(v, str) for v in value)
+
+
+def _to_fully_qualified_label(label, package_path):
+    """
+    Returns the specified label in the same form bazel query uses, for ex:
+    ":foo" -> "//<package_path>:foo", "//a/b" -> "//a/b:b".
+    """
+    if label.startswith(":"):
+        return "//%s%s" % (package_path, label)
+    if "//" not in label:
+        return "//%s:%s" % (package_path, label)
+    lbl = labelm.Label(label)
+    return "%s//%s:%s" % (lbl.repository_prefix, lbl.package_path, lbl.target)
+
+
+def get_query_backend(dependency_discovery_mode, repo_root_path, verbose=False):
+    """
+    Returns the AbstractQueryBackend implementation to use for the specified
+    dependency_discovery_mode.
+    """
+    if dependency_discovery_mode == "query":
+        return SubprocessQueryBackend(repo_root_path, verbose)
+    elif dependency_discovery_mode == "batch_query":
+        return BatchQueryBackend(repo_root_path, verbose)
+    elif dependency_discovery_mode == "offline":
+        return OfflineQueryBackend(
+            repo_root_path, BatchQueryBackend(repo_root_path, verbose), verbose)
+    raise Exception("Unknown dependency_discovery_mode [%s]" % dependency_discovery_mode)
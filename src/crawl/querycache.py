@@ -0,0 +1,222 @@
+"""
+Copyright (c) 2025, salesforce.com, inc.
+All rights reserved.
+SPDX-License-Identifier: BSD-3-Clause
+For full license text, see the LICENSE file in the repo root or https://opensource.org/licenses/BSD-3-Clause
+
+
+This module persists the results of bazel queries across pomgen invocations.
+
+Cache entries are keyed by the queried target, the queried attributes and the
+content of the target's BUILD file (and of all .bzl files it loads), so an
+entry is never returned after the BUILD file has changed. The
+dependency_discovery_mode is also part of the key: the query backends do not
+return labels in the same order, so an entry written in one mode would change
+the order of dependencies in another mode.
+"""
+
+from common import logger
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+
+
+# bump this when the format of cache entries changes
+CACHE_FORMAT_VERSION = "1"
+
+
+DEFAULT_MAX_ENTRIES = 10000
+
+
+BUILD_FILE_NAMES = ("BUILD.bazel", "BUILD")
+
+
+_LOAD_REGEX = re.compile(r"""load\(\s*["']([^"']+)["']""")
+
+
+class QueryCache:
+    """
+    On-disk cache of bazel query results, one file per entry. Once the cache
+    holds more than max_entries entries, the least recently used entries are
+    evicted.
+    """
+    def __init__(self, repo_root_path, cache_dir, max_entries=DEFAULT_MAX_ENTRIES,
+                 dependency_discovery_mode="query", verbose=False):
+        self.repo_root_path = repo_root_path
+        self.cache_dir = cache_dir
+        self.dependency_discovery_mode = dependency_discovery_mode
+        self.max_entries = max_entries
+        self.verbose = verbose
+        self._build_file_digests = BuildFileDigests(repo_root_path)
+        self._entry_count = None
+        self._lock = threading.Lock() # entries may be added concurrently
+
+    def get(self, label, dep_attributes):
+        """
+        Returns the cached query result, a list of label strings, for the
+        specified label (common.label.Label instance) and dependency
+        attributes. Returns None if there is no cache entry.
+        """
+        entry_path = self._get_entry_path(label, dep_attributes)
+        try:
+            with open(entry_path, "r") as f:
+                labels = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # the entry's mtime is its "last used" timestamp
+        os.utime(entry_path)
+        if self.verbose:
+            logger.debug("Query cache hit for [%s]" % label)
+        return labels
+
+    def put(self, label, dep_attributes, labels):
+        """
+        Stores the query result, a list of label strings, for the specified
+        label (common.label.Label instance) and dependency attributes.
+        """
+        entry_path = self._get_entry_path(label, dep_attributes)
+        with self._lock:
+            if self._entry_count is None:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                self._entry_count = len(self._get_entry_file_names())
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(list(labels), f)
+            exists = os.path.exists(entry_path)
+            os.replace(tmp_path, entry_path)
+            if not exists:
+                self._entry_count += 1
+                if self._entry_count > self.max_entries:
+                    self._evict()
+
+    def _evict(self):
+        """
+        Removes the least recently used entries, so that 10% of max_entries
+        are available again.
+        """
+        entry_paths = [os.path.join(self.cache_dir, n) for n in self._get_entry_file_names()]
+        entry_paths.sort(key=lambda p: os.stat(p).st_mtime_ns)
+        retained_count = int(self.max_entries * 0.9)
+        evicted_paths = entry_paths[:max(0, len(entry_paths) - retained_count)]
+        for path in evicted_paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # another pomgen process may have removed it already
+                pass
+        self._entry_count = len(entry_paths) - len(evicted_paths)
+        if self.verbose:
+            logger.debug("Evicted %i query cache entries" % len(evicted_paths))
+
+    def _get_entry_file_names(self):
+        return [n for n in os.listdir(self.cache_dir) if n.endswith(".json")]
+
+    def _get_entry_path(self, label, dep_attributes):
+        key = hashlib.sha256()
+        key.update(CACHE_FORMAT_VERSION.encode())
+        key.update(b"\0")
+        key.update(self.dependency_discovery_mode.encode())
+        key.update(b"\0")
+        key.update(label.canonical_form.encode())
+        key.update(b"\0")
+        key.update(",".join(dep_attributes).encode())
+        key.update(b"\0")
+        key.update(self._build_file_digests.get_digest(label.package_path).encode())
+        return os.path.join(self.cache_dir, "%s.json" % key.hexdigest())
+
+
+class BuildFileDigests:
+    """
+    Computes the digests of BUILD files, including the .bzl files they load.
+    The content of each file is only read once.
+    """
+    def __init__(self, repo_root_path):
+        self.repo_root_path = repo_root_path
+        self._path_to_digest = {} # content digests of BUILD and .bzl files
+
+    def get_digest(self, package_path):
+        """
+        Returns a digest of the content of the BUILD file of the specified
+        package, and of all .bzl files it loads, directly or indirectly.
+        """
+        for build_file_name in BUILD_FILE_NAMES:
+            build_file_path = os.path.join(self.repo_root_path, package_path, build_file_name)
+            if os.path.exists(build_file_path):
+                break
+        digest = hashlib.sha256()
+        self._add_file_digest(build_file_path, package_path, digest, set())
+        return digest.hexdigest()
+
+    def _add_file_digest(self, path, package_path, digest, processed_paths):
+        if path in processed_paths:
+            return
+        processed_paths.add(path)
+        file_digest, loads = self._get_file_digest_and_loads(path)
+        digest.update(file_digest.encode())
+        for load in loads:
+            digest.update(load.encode())
+            bzl_path_and_package = self._get_bzl_path_and_package(load, package_path)
+            if bzl_path_and_package is not None:
+                bzl_path, bzl_package_path = bzl_path_and_package
+                self._add_file_digest(bzl_path, bzl_package_path, digest, processed_paths)
+
+    def _get_file_digest_and_loads(self, path):
+        if path not in self._path_to_digest:
+            try:
+                with open(path, "rb") as f:
+                    content = f.read()
+                digest = hashlib.sha256(content).hexdigest()
+                loads = _LOAD_REGEX.findall(content.decode("utf-8", errors="replace"))
+            except FileNotFoundError:
+                digest = "missing"
+                loads = []
+            self._path_to_digest[path] = (digest, loads)
+        return self._path_to_digest[path]
+
+    def _get_bzl_path_and_package(self, load, package_path):
+        """
+        Returns the path and the package of the specified .bzl file label.
+
+        Returns None for .bzl files in external repositories - these are only
+        tracked through the label string itself.
+        """
+        if load.startswith("@//") or load.startswith("@@//"):
+            load = load[load.index("//"):]
+        if load.startswith("//"):
+            package_and_target = load[2:].split(":", 1)
+            if len(package_and_target) == 1:
+                return None
+            package_path, target = package_and_target
+        elif load.startswith(":"):
+            target = load[1:]
+        else:
+            return None
+        return (os.path.join(self.repo_root_path, package_path, target), package_path)
+
+
+class _NoopQueryCache:
+    def get(self, label, dep_attributes):
+        return None
+
+    def put(self, label, dep_attributes, labels):
+        pass
+
+
+NOOP = _NoopQueryCache()
+
+
+def get_query_cache(repo_root_path, cache_dir, dependency_discovery_mode="query",
+                    enabled=True, verbose=False):
+    """
+    Returns the QueryCache instance to use, NOOP if the cache is disabled
+    or if no cache_dir is configured.
+    """
+    if not enabled or cache_dir is None:
+        return NOOP
+    cache_dir = os.path.join(repo_root_path, os.path.expanduser(cache_dir))
+    return QueryCache(repo_root_path, cache_dir,
+                      dependency_discovery_mode=dependency_discovery_mode,
+                      verbose=verbose)
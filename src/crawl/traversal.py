@@ -0,0 +1,144 @@
+"""
+Copyright (c) 2025, salesforce.com, inc.
+All rights reserved.
+SPDX-License-Identifier: BSD-3-Clause
+For full license text, see the LICENSE file in the repo root or https://opensource.org/licenses/BSD-3-Clause
+
+
+Graph traversals that use an explicit stack instead of recursion, so that
+deep dependency graphs do not hit Python's recursion limit.
+"""
+
+
+# returned by a pre_visit callback to not visit the children of a node
+SKIP = object()
+
+
+def walk(roots, get_children, pre_visit=None, post_visit=None, revisit=None,
+         on_cycle=None, memoize=True):
+    """
+    Depth-first traversal of the graph reachable from the specified root
+    nodes. Nodes must be hashable.
+
+    get_children(node):
+        Returns the children of the specified node, in visiting order. It is
+        called after pre_visit.
+
+    pre_visit(node, parent, parent_context):
+        Called before the children of the node are visited. parent is None
+        for root nodes. Returns the context passed to the callbacks of the
+        children of the node, or SKIP to not visit the children (post_visit
+        is then not called for the node either).
+
+    post_visit(node, parent, context):
+        Called after all children of the node have been visited. context is
+        the value returned by pre_visit for the node.
+
+    revisit(node, parent, parent_context):
+        Only used if memoize is True: called instead of pre_visit when the
+        node is reached again, after it has been visited already.
+
+    on_cycle(node, parent, parent_context, cycle):
+        Called when the node is reached while its children are being
+        visited. cycle is the list of nodes from node to parent, followed by
+        node again. Defaults to raising an Exception.
+
+    memoize:
+        If True, each node is visited once. If False, each node is visited
+        once for each path it is reachable through.
+    """
+    if on_cycle is None:
+        on_cycle = _raise_cycle_exception
+    visited = set()
+    for root in roots:
+        path = [] # the nodes being visited, from the root
+        nodes_on_path = set()
+        stack = [(_ENTER, root, None, None)]
+        while len(stack) > 0:
+            action, node, parent, context = stack.pop()
+            if action is _LEAVE:
+                path.pop()
+                nodes_on_path.remove(node)
+                if memoize:
+                    visited.add(node)
+                if post_visit is not None:
+                    post_visit(node, parent, context)
+            elif node in nodes_on_path:
+                on_cycle(node, parent, context, path[path.index(node):] + [node])
+            elif memoize and node in visited:
+                if revisit is not None:
+                    revisit(node, parent, context)
+            else:
+                node_context = None if pre_visit is None else pre_visit(node, parent, context)
+                if node_context is SKIP:
+                    continue
+                path.append(node)
+                nodes_on_path.add(node)
+                stack.append((_LEAVE, node, parent, node_context))
+                for child in reversed(list(get_children(node))):
+                    stack.append((_ENTER, child, node, node_context))
+
+
+def get_strongly_connected_components(nodes, get_children):
+    """
+    Iterative implementation of Tarjan's algorithm, for the graph reachable
+    from the specified nodes. Nodes must be hashable.
+
+    Returns the strongly connected components, as lists of nodes, in reverse
+    topological order: each component comes after all components it
+    references.
+    """
+    index_counter = 0
+    node_to_index = {}
+    node_to_low_link = {}
+    nodes_on_stack = set()
+    stack = []
+    components = []
+    for root in nodes:
+        if root in node_to_index:
+            continue
+        work = [(root, list(get_children(root)), 0)]
+        node_to_index[root] = node_to_low_link[root] = index_counter
+        index_counter += 1
+        stack.append(root)
+        nodes_on_stack.add(root)
+        while len(work) > 0:
+            node, children, i = work.pop()
+            recurse = False
+            while i < len(children):
+                child = children[i]
+                i += 1
+                if child not in node_to_index:
+                    work.append((node, children, i))
+                    work.append((child, list(get_children(child)), 0))
+                    node_to_index[child] = node_to_low_link[child] = index_counter
+                    index_counter += 1
+                    stack.append(child)
+                    nodes_on_stack.add(child)
+                    recurse = True
+                    break
+                elif child in nodes_on_stack:
+                    node_to_low_link[node] = min(node_to_low_link[node], node_to_index[child])
+            if recurse:
+                continue
+            if node_to_low_link[node] == node_to_index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    nodes_on_stack.remove(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+            if len(work) > 0:
+                parent = work[-1][0]
+                node_to_low_link[parent] = min(node_to_low_link[parent], node_to_low_link[node])
+    return components
+
+
+def _raise_cycle_exception(node, parent, parent_context, cycle):
+    raise Exception("Found a dependency cycle: %s" % " -> ".join([str(n) for n in cycle]))
+
+
+_ENTER = "enter"
+_LEAVE = "leave"
@@ -8,11 +8,16 @@ For full license text, see the LICENSE file in the repo root or https://opensour
 This module manages Bazel workspace-level entities.
 """
 
+from common import label as labelm
 from common import logger
 from crawl import artifactprocessor
 from crawl import bazel
 from crawl import buildpom
 from crawl import dependency
+from crawl import git
+from crawl import maveninstallcache
+from crawl import querybackend
+import threading
 
 
 class Workspace:
@@ -25,24 +30,70 @@ class Workspace:
                  verbose=False):
         self.repo_root_path = repo_root_path
         self.excluded_dependency_paths = config.excluded_dependency_paths
-        self.excluded_dependency_labels = config.excluded_dependency_labels
+        # a set, because each crawled label is checked against it
+        self.excluded_dependency_labels = frozenset(config.excluded_dependency_labels)
         self.source_exclusions = config.all_src_exclusions
         self.change_detection_enabled = config.change_detection_enabled
         self.pom_content = pom_content
         self.dependency_metadata = dependency_metadata
         self.label_to_overridden_fq_label = label_to_overridden_fq_label
         self.verbose = verbose
-        self._label_to_ext_dep = self._parse_maven_install(
-            maven_install_info, repo_root_path, label_to_overridden_fq_label)
+        self.query_backend = querybackend.get_query_backend(
+            config.dependency_discovery_mode, repo_root_path, verbose)
+        self.maven_install_cache = maveninstallcache.get_maven_install_cache(
+            repo_root_path, config.maven_install_cache_dir, verbose)
+        self.maven_install_info = maven_install_info
+        self._label_to_ext_dep = {} # populated lazily, see _get_ext_dep
+        self._maven_install_names_and_paths = None # all maven install rules
+        self._parsed_maven_install_names = set()
         self._package_to_artifact_def = {} # cache for artifact_def instances
+        self._package_to_lock = {} # the package is parsed by one thread only
+        self._lock = threading.Lock()
+        self._label_to_never_link = {} # label.Label -> whether neverlink is set
+        self._git_status = git.GitStatus(repo_root_path) # local edits, for all artifacts
 
     @property
     def external_dependencies(self):
         """
         Returns an iterable of all external dependencies (dependency.Dependency
         instances), declared in this workspace.
+
+        All maven_install rules are parsed, so no external dependency is
+        registered after this has been called: pom.py caches the version
+        properties of the returned dependencies.
+        """
+        self._parse_all_maven_installs()
+        # same order as the maven_install rules, independent of the order
+        # they have been parsed in
+        names = [n for n, _ in self._get_maven_install_names_and_paths()]
+        def name_index(dep):
+            name = labelm.Label(dep.bazel_label_name).repository_prefix[1:]
+            return names.index(name) if name in names else len(names)
+        return tuple(sorted(self._label_to_ext_dep.values(), key=name_index))
+
+    def get_external_dependency(self, label):
+        """
+        Returns the external dependency (dependency.Dependency instance) for
+        the specified label string, for ex "@maven//:com_google_guava_guava".
+
+        Raises an Exception if no maven_install rule has this dependency.
+        """
+        dep = self._get_ext_dep(label)
+        if dep is None:
+            print(self._label_to_ext_dep.values())
+            raise Exception("Unknown external dependency - please make sure all maven install json files have been registered with pomgen (by setting maven_install_paths in the pomgen config file): [%s]" % label)
+        return dep
+
+    def get_transitive_closure(self, dependency):
         """
-        return tuple(self._label_to_ext_dep.values())
+        Returns the transitive closure of the specified dependency, see
+        DependencyMetadata.get_transitive_closure.
+        """
+        label = dependency.bazel_label_name
+        if label is not None and label.startswith("@"):
+            # make sure the dependency's maven_install rule has been parsed
+            self._get_ext_dep(label)
+        return self.dependency_metadata.get_transitive_closure(dependency)
 
     def parse_maven_artifact_def(self, package):
         """
@@ -51,18 +102,52 @@ class Workspace:
 
         Returns a MavenArtifactDef instance, None if there is no BUILD.pom
         file at the specified path.
+
+        This method may be called concurrently: each package is parsed once,
+        and the same instance is returned to all callers.
         """
         if package in self._package_to_artifact_def:
             return self._package_to_artifact_def[package]
-        art_def = buildpom.parse_maven_artifact_def(self.repo_root_path, package)
-        if art_def is not None:
-            art_def = artifactprocessor.augment_artifact_def(
-                self.repo_root_path, art_def, self.source_exclusions,
-                self.change_detection_enabled)
-        # cache result, next time it is returned from cache
-        self._package_to_artifact_def[package] = art_def
+        with self._lock:
+            package_lock = self._package_to_lock.setdefault(package, threading.Lock())
+        with package_lock:
+            if package in self._package_to_artifact_def:
+                return self._package_to_artifact_def[package]
+            art_def = buildpom.parse_maven_artifact_def(self.repo_root_path, package)
+            if art_def is not None:
+                art_def = artifactprocessor.augment_artifact_def(
+                    self.repo_root_path, art_def, self.source_exclusions,
+                    self.change_detection_enabled, self._git_status)
+            # cache result, next time it is returned from cache
+            self._package_to_artifact_def[package] = art_def
         return art_def
 
+    def resolve_never_link_labels(self, labels):
+        """
+        Determines, using a single bazel query, which of the specified labels
+        (common.label.Label instances) point to a target with neverlink set.
+        The result is cached, see is_never_link_label.
+        """
+        unresolved_labels = {} # insertion-ordered, values are None
+        for label in labels:
+            if label not in self._label_to_never_link:
+                unresolved_labels[label] = None
+        if len(unresolved_labels) == 0:
+            return
+        never_link_labels = self.query_backend.query_never_link_labels(
+            [lbl.canonical_form for lbl in unresolved_labels])
+        for label in unresolved_labels:
+            self._label_to_never_link[label] = label.canonical_form in never_link_labels
+
+    def is_never_link_label(self, label):
+        """
+        Returns True if the specified label (common.label.Label instance)
+        points to a target with neverlink set.
+        """
+        if label not in self._label_to_never_link:
+            self.resolve_never_link_labels((label,))
+        return self._label_to_never_link[label]
+
     def parse_dep_labels(self, dep_labels):
         """
         Given a list of Bazel labels, returns a list of Dependency instances.
@@ -74,6 +159,10 @@ class Workspace:
 
         See dependency.Dependency
         """
+        # all neverlink labels are resolved upfront, using a single query
+        self.resolve_never_link_labels(
+            [lbl for lbl in [labelm.Label(dl) for dl in dep_labels]
+             if self._is_artifactless_source_label(lbl)])
         deps = []
         for label in dep_labels:
             dep = self._parse_dep_label(label)
@@ -92,19 +181,23 @@ class Workspace:
         art_defs = [self.parse_maven_artifact_def(p) for p in packages]
         return [art_def.bazel_package for art_def in art_defs if art_def.pom_generation_mode.produces_artifact]
 
+    def _is_artifactless_source_label(self, label):
+        if not label.is_source_ref or label in self.excluded_dependency_labels:
+            return False
+        for excluded_dependency_path in self.excluded_dependency_paths:
+            if label.package_path.startswith(excluded_dependency_path):
+                return False
+        return self.parse_maven_artifact_def(label.package_path) is None
+
     def _parse_dep_label(self, dep_label):
         """
         TODO: this has been moved to the crawler class and can be removed.
         """
-        import common.label
-        if common.label.Label(dep_label) in self.excluded_dependency_labels:
+        if labelm.Label(dep_label) in self.excluded_dependency_labels:
             return None
 
         if dep_label.startswith("@"):
-            if dep_label not in self._label_to_ext_dep:
-                print(self._label_to_ext_dep.values())
-                raise Exception("Unknown external dependency - please make sure all maven install json files have been registered with pomgen (by setting maven_install_paths in the pomgen config file): [%s]" % dep_label)
-            return self._label_to_ext_dep[dep_label]
+            return self.get_external_dependency(dep_label)
         elif dep_label.startswith("//"):
             # src ref:
             package_path = dep_label[2:] # remove leading "//"
@@ -118,7 +211,7 @@ class Workspace:
 
             maven_artifact_def = self.parse_maven_artifact_def(package_path)
             if maven_artifact_def is None:
-                if bazel.is_never_link_dep(self.repo_root_path, dep_label):
+                if self.is_never_link_label(labelm.Label(dep_label)):
                     return None
 
                 raise Exception("no BUILD.pom file in package [%s]" % package_path)
@@ -127,23 +220,86 @@ class Workspace:
         else:
             raise Exception("bad label [%s]" % dep_label)
 
-    def _parse_maven_install(self, maven_install_info, repo_root_path, 
-                             label_to_overridden_fq_label):
+    def _get_ext_dep(self, label):
+        """
+        Returns the external dependency for the specified label string, None
+        if there is no such dependency.
+
+        Only the pinned files of the maven_install rule referenced by the
+        label, and of the rules overridden dependencies live in, are parsed.
+        """
+        if label not in self._label_to_ext_dep:
+            name = labelm.Label(label).repository_prefix[1:]
+            self._parse_maven_install(
+                self._get_maven_install_names_and_paths_to_parse(name))
+        if label not in self._label_to_ext_dep:
+            # parse everything before giving up
+            self._parse_all_maven_installs()
+        return self._label_to_ext_dep.get(label)
+
+    def _parse_all_maven_installs(self):
+        for name, _ in self._get_maven_install_names_and_paths():
+            self._parse_maven_install(
+                self._get_maven_install_names_and_paths_to_parse(name))
+
+    def _get_maven_install_names_and_paths(self):
+        if self._maven_install_names_and_paths is None:
+            self._maven_install_names_and_paths = self.maven_install_info.get_maven_install_names_and_paths(self.repo_root_path)
+        return self._maven_install_names_and_paths
+
+    def _get_maven_install_names_and_paths_to_parse(self, name):
         """
-        Parses all pinned json files for the specified maven_install rules.
+        Returns the maven_install rules (names and paths) to parse for the
+        rule with the specified name. Overridden dependencies are replaced
+        with dependencies that may live in another maven_install rule, so
+        these rules always have to be parsed together.
+
+        Returns an empty list if the rule has already been parsed or if
+        there is no rule with the specified name.
         """
-        names_and_paths = maven_install_info.get_maven_install_names_and_paths(
-            repo_root_path)
+        names_and_paths = self._get_maven_install_names_and_paths()
+        if name in self._parsed_maven_install_names:
+            return []
+        if name not in [n for n, _ in names_and_paths]:
+            return []
+        names = set([name])
+        for fq_label in self.label_to_overridden_fq_label.values():
+            names.add(labelm.Label(fq_label).repository_prefix[1:])
+        return [(n, p) for n, p in names_and_paths if n in names]
 
-        dep_to_transitives = bazel.parse_maven_install(
-            names_and_paths, label_to_overridden_fq_label, self.verbose)
+    def _parse_maven_install(self, names_and_paths):
+        """
+        Parses the pinned json files for the specified maven_install rules.
 
-        label_to_dep = {}
+        Dependencies that have already been registered by a previous call
+        are kept, so that dependency instances remain singletons.
+        """
+        if len(names_and_paths) == 0:
+            return
+        self._parsed_maven_install_names.update([n for n, _ in names_and_paths])
+        label_to_overridden_fq_label = self.label_to_overridden_fq_label
+
+        dep_to_transitives = self.maven_install_cache.get(
+            names_and_paths, label_to_overridden_fq_label)
+        if dep_to_transitives is None:
+            dep_to_transitives = bazel.parse_maven_install(
+                names_and_paths, label_to_overridden_fq_label, self.verbose)
+            self.maven_install_cache.put(
+                names_and_paths, label_to_overridden_fq_label,
+                dep_to_transitives)
+
+        registered_labels = set(self._label_to_ext_dep.keys())
+        new_dep_to_transitives = []
         for dep, transitives in dep_to_transitives:
             label = dep.bazel_label_name
-            label_to_dep[label] = dep
+            if label in registered_labels:
+                continue
+            self._label_to_ext_dep[label] = dep
+            new_dep_to_transitives.append((dep, transitives))
+        for dep, transitives in new_dep_to_transitives:
+            if len(registered_labels) > 0:
+                # use the previously registered dep instances
+                transitives = [self._label_to_ext_dep.get(t.bazel_label_name, t) for t in transitives]
             if self.verbose:
-                logger.debug("Registered dep %s" % label)
+                logger.debug("Registered dep %s" % dep.bazel_label_name)
             self.dependency_metadata.register_transitives(dep, transitives)
-
-        return label_to_dep
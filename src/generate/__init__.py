@@ -5,7 +5,8 @@ class AbstractDependency(ABC):
     """
     TODO add label here
     """
-    pass
+    # subclasses may use __slots__
+    __slots__ = ()
 
 
 class AbstractGenerationStrategy(ABC):
@@ -14,13 +14,18 @@ from common import logger
 from common import maveninstallinfo
 from common import overridefileinfo
 from common import mdfiles
+from common import outputfile
+from common import processpool
 from config import config
 from crawl import bazel
+from crawl import crawlcache
 from crawl import crawler as crawlerm
 from crawl import dependencymd as dependencym
 from crawl import libaggregator
 from crawl import pom
 from crawl import pomcontent as pomcontentm
+from crawl import pomdigestcache
+from crawl import querycache
 from crawl import workspace
 from generate.impl import pomgenerationstrategy
 import argparse
@@ -53,7 +58,22 @@ def main(args):
     if len(packages) == 0:
         raise Exception("Did not find any artifact producing BUILD.pom packages at [%s]" % args.package)
     gen_strategy = pomgenerationstrategy.PomGenerationStrategy(ws, cfg.pom_template)
-    crawler = crawlerm.Crawler(ws, gen_strategy, cfg.pom_template, args.verbose)
+    query_cache = querycache.get_query_cache(repo_root, cfg.query_cache_dir,
+                                             cfg.dependency_discovery_mode,
+                                             enabled=not args.no_query_cache,
+                                             verbose=args.verbose)
+    crawl_cache = crawlcache.get_crawl_cache(repo_root, cfg.crawl_cache_dir,
+                                             cfg.all_src_exclusions,
+                                             enabled=not args.no_crawl_cache,
+                                             verbose=args.verbose,
+                                             dependency_discovery_mode=cfg.dependency_discovery_mode)
+    pom_digest_cache = pomdigestcache.get_pom_digest_cache(repo_root, cfg.crawl_cache_dir,
+                                                           enabled=not args.no_crawl_cache,
+                                                           verbose=args.verbose)
+    crawler = crawlerm.Crawler(ws, gen_strategy, cfg.pom_template, args.verbose,
+                               query_cache, jobs=args.jobs,
+                               crawl_cache=crawl_cache,
+                               pom_digest_cache=pom_digest_cache)
     result = crawler.crawl(packages, follow_references=not args.ignore_references, force_release=args.force)
 
     if len(result.artifact_generation_contexts) == 0:
@@ -76,40 +96,67 @@ def main(args):
         # hardcoded to pom.xml files right here, but in the future pluggable?
         pomgens = [ctx.generator for ctx in result.artifact_generation_contexts]
 
-        for pomgen in pomgens:
-            pom_dest_dir = os.path.join(output_dir, pomgen.bazel_package)
-            if not os.path.exists(pom_dest_dir):
-                os.makedirs(pom_dest_dir)
-
-            # the goldfile pom is actually a pomgen metadata file, so we 
-            # write it using the mdfiles module, which ensures it goes 
-            # into the proper location within the specified bazel package
-            if args.pom_goldfile:
-                pom_content = pomgen.gen(pom.PomContentType.GOLDFILE)
-                pom_goldfile_path = mdfiles.write_file(pom_content, output_dir, pomgen.bazel_package, mdfiles.POM_XML_RELEASED_FILE_NAME)
-                logger.info("Wrote pom goldfile to [%s]" % pom_goldfile_path)
-            else:
-                pom_content = pomgen.gen(pom.PomContentType.RELEASE)
-                pom_path = os.path.join(
-                    pom_dest_dir, "%s.xml" % cfg.pom_base_filename)
-                _write_file(pom_path, pom_content)
-                logger.info("Wrote pom file to [%s]" % pom_path)
-                for i, companion_pomgen in enumerate(pomgen.get_companion_generators()):
-                    pom_content = companion_pomgen.gen(pom.PomContentType.RELEASE)
-                    pom_path = os.path.join(pom_dest_dir, 
-                        "%s_companion%s.xml" % (cfg.pom_base_filename, i))
-                    _write_file(pom_path, pom_content)
-                    logger.info("Wrote companion pom file to [%s]" % pom_path)
-
-                # if jar_path has been set in the BUILD.pom file, we write a
-                # hint file with the path out so we can find it more easily
-                # later when jars are processed
-                jar_path = pomgen.artifact_def.jar_path
-                if jar_path is not None:
-                    hint_file_path = os.path.join(pom_dest_dir, mdfiles.JAR_LOCATION_HINT_FILE)
-                    _write_file(hint_file_path, jar_path)
-                    logger.info("Wrote jar location hint file [%s] with content [%s]" % (hint_file_path, jar_path))
-
+        # poms are generated concurrently, the log messages are collected
+        # and logged in order
+        def write_pom_files(pomgen):
+            return _write_pom_files(pomgen, output_dir, cfg.pom_base_filename, args.pom_goldfile)
+        written_count = 0
+        skipped_count = 0
+        for log_messages, written_flags in processpool.parallel_map(write_pom_files, pomgens, args.jobs):
+            for log_message in log_messages:
+                logger.info(log_message)
+            written_count += written_flags.count(True)
+            skipped_count += written_flags.count(False)
+        logger.info("Wrote %i files, skipped %i unchanged files" % (written_count, skipped_count))
+
+
+def _write_pom_files(pomgen, output_dir, pom_base_filename, pom_goldfile):
+    """
+    Generates and writes the pom files of the specified pom generator.
+
+    Returns the log messages and, for each file, whether it was written (it
+    is not written if its content did not change), as a tuple of lists:
+    (log_messages, written_flags)
+    """
+    log_messages = []
+    written_flags = []
+    def add_result(description, path, written):
+        written_flags.append(written)
+        if written:
+            log_messages.append("Wrote %s to [%s]" % (description, path))
+        else:
+            log_messages.append("Skipped unchanged %s [%s]" % (description, path))
+
+    pom_dest_dir = os.path.join(output_dir, pomgen.bazel_package)
+    os.makedirs(pom_dest_dir, exist_ok=True)
+
+    # the goldfile pom is actually a pomgen metadata file, so we 
+    # write it using the mdfiles module, which ensures it goes 
+    # into the proper location within the specified bazel package
+    if pom_goldfile:
+        pom_content = pomgen.gen(pom.PomContentType.GOLDFILE)
+        pom_goldfile_path, written = mdfiles.write_file(pom_content, output_dir, pomgen.bazel_package, mdfiles.POM_XML_RELEASED_FILE_NAME)
+        add_result("pom goldfile", pom_goldfile_path, written)
+    else:
+        pom_content = pomgen.gen(pom.PomContentType.RELEASE)
+        pom_path = os.path.join(
+            pom_dest_dir, "%s.xml" % pom_base_filename)
+        add_result("pom file", pom_path, outputfile.write_file(pom_path, pom_content))
+        for i, companion_pomgen in enumerate(pomgen.get_companion_generators()):
+            pom_content = companion_pomgen.gen(pom.PomContentType.RELEASE)
+            pom_path = os.path.join(pom_dest_dir, 
+                "%s_companion%s.xml" % (pom_base_filename, i))
+            add_result("companion pom file", pom_path, outputfile.write_file(pom_path, pom_content))
+
+        # if jar_path has been set in the BUILD.pom file, we write a
+        # hint file with the path out so we can find it more easily
+        # later when jars are processed
+        jar_path = pomgen.artifact_def.jar_path
+        if jar_path is not None:
+            hint_file_path = os.path.join(pom_dest_dir, mdfiles.JAR_LOCATION_HINT_FILE)
+            add_result("jar location hint file with content [%s]" % jar_path, hint_file_path,
+                       outputfile.write_file(hint_file_path, jar_path))
+    return log_messages, written_flags
 
 
 def _parse_arguments(args):
@@ -130,17 +177,18 @@ def _parse_arguments(args):
         help="Verbose output")
     parser.add_argument("--pom.description", type=str, required=False,
         dest="pom_description", help="Written as the pom's <description/>")
+    parser.add_argument("--no_query_cache", required=False, action="store_true",
+        help="If set, bazel query results are not read from, or written to, the query cache")
+    parser.add_argument("--no_crawl_cache", required=False, action="store_true",
+        help="If set, the crawl snapshot and the released pom digests are not read from, or written to, the crawl cache")
+    parser.add_argument("--jobs", type=int, required=False, default=1,
+        help="The number of packages processed concurrently while crawling BUILD files, and the number of processes used to generate poms")
     parser.add_argument("--write_libraries_hint_file", required=False, action="store_true",
         help="The libraries hint file is used by the wrapper script in //maven, it is not needed when running pomgen directly")
 
     return parser.parse_args(args)
 
 
-def _write_file(path, content):                    
-    with open(path, "w") as f:
-        f.write(content)
-
-
 def _get_output_dir(args):
     if not args.destdir:
         return None
@@ -168,9 +216,12 @@ def _write_all_libraries_hint_files(crawler_result, output_dir, start_lib_path):
         if not os.path.exists(hint_file_dir):
             os.makedirs(hint_file_dir)
         hint_file_path = os.path.join(hint_file_dir, "libraries.txt")
-        _write_file(hint_file_path, "\n".join(
+        written = outputfile.write_file(hint_file_path, "\n".join(
             ["# the root lib path, followed by the paths to its upstream dependencies"] + lib_paths))
-        logger.info("Wrote libraries hint file to [%s]" % hint_file_path)
+        if written:
+            logger.info("Wrote libraries hint file to [%s]" % hint_file_path)
+        else:
+            logger.info("Skipped unchanged libraries hint file [%s]" % hint_file_path)
 
 
 if __name__ == "__main__":
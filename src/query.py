@@ -19,10 +19,13 @@ from common import version_increment_strategy as vis
 from config import config
 from crawl import bazel
 from crawl import buildpom
+from crawl import crawlcache
 from crawl import crawler
 from crawl import dependencymd as dependencymdm
 from crawl import libaggregator
 from crawl import pomcontent
+from crawl import pomdigestcache
+from crawl import querycache
 from crawl import workspace
 from generate.impl import pomgenerationstrategy
 import argparse
@@ -69,6 +72,15 @@ def _parse_arguments(args):
     parser.add_argument("--force", required=False, action="store_true",
         help="Simulates release information when --force option is used")
 
+    parser.add_argument("--no_query_cache", required=False, action="store_true",
+        help="If set, bazel query results are not read from, or written to, the query cache")
+
+    parser.add_argument("--no_crawl_cache", required=False, action="store_true",
+        help="If set, the crawl snapshot and the released pom digests are not read from, or written to, the crawl cache")
+
+    parser.add_argument("--jobs", type=int, required=False, default=1,
+        help="The number of packages processed concurrently while crawling BUILD files, and the number of processes used to generate poms")
+
     return parser.parse_args(args)
 
 
@@ -165,7 +177,22 @@ if __name__ == "__main__":
 
     if crawl_artifact_dependencies:
         gen_strategy = pomgenerationstrategy.PomGenerationStrategy(ws, cfg.pom_template)
-        crawler = crawler.Crawler(ws, gen_strategy, cfg.pom_template, args.verbose)
+        query_cache = querycache.get_query_cache(repo_root, cfg.query_cache_dir,
+                                                 cfg.dependency_discovery_mode,
+                                                 enabled=not args.no_query_cache,
+                                                 verbose=args.verbose)
+        crawl_cache = crawlcache.get_crawl_cache(repo_root, cfg.crawl_cache_dir,
+                                                 cfg.all_src_exclusions,
+                                                 enabled=not args.no_crawl_cache,
+                                                 verbose=args.verbose,
+                                                 dependency_discovery_mode=cfg.dependency_discovery_mode)
+        pom_digest_cache = pomdigestcache.get_pom_digest_cache(repo_root, cfg.crawl_cache_dir,
+                                                               enabled=not args.no_crawl_cache,
+                                                               verbose=args.verbose)
+        crawler = crawler.Crawler(ws, gen_strategy, cfg.pom_template, args.verbose,
+                                  query_cache, jobs=args.jobs,
+                                  crawl_cache=crawl_cache,
+                                  pom_digest_cache=pom_digest_cache)
         crawler_result = crawler.crawl(packages, force_release=args.force)
         root_library_nodes = libaggregator.get_libraries_to_release(crawler_result.nodes)
 
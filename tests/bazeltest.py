@@ -8,6 +8,7 @@ For full license text, see the LICENSE file in the repo root or https://opensour
 from crawl import bazel
 from crawl import dependency
 import os
+import random
 import unittest
 import tempfile
 
@@ -197,6 +198,89 @@ class BazelTest(unittest.TestCase):
         self.assertEqual(["//a", "//b", "//c"],
                           bazel._ensure_unique_deps(["//a", "//b", "//c", "//a"]))
 
+    def test_parse_streamed_jsonproto_deps(self):
+        """
+        Tests for bazel._parse_streamed_jsonproto_deps
+        """
+        output = """
+Loading: 0 packages loaded
+{"type":"RULE","rule":{"name":"//a/b:b","ruleClass":"java_library","attribute":[{"name":"deps","type":"LABEL_LIST","stringListValue":["//c/d:d","@maven//:com_google_guava_guava"]},{"name":"runtime_deps","type":"LABEL_LIST","stringListValue":["//e:e","//c/d:d"]}]}}
+{"type":"RULE","rule":{"name":"//x:foo","ruleClass":"java_library","attribute":[{"name":"deps","type":"LABEL_LIST","selectorList":{"type":"LABEL_LIST","elements":[{"entries":[{"label":"//conditions:default","stringListValue":["//y:y"]}]}]}}]}}
+{"type":"RULE","rule":{"name":"//z:z","ruleClass":"java_library","attribute":[]}}
+"""
+        target_pattern_to_dep_attributes = {
+            "//a/b": ("deps", "runtime_deps"),
+            "//x:foo": ("deps", "runtime_deps"),
+            "//z": ("deps",),
+        }
+
+        deps = bazel._parse_streamed_jsonproto_deps(output, target_pattern_to_dep_attributes)
+
+        self.assertEqual(3, len(deps))
+        self.assertEqual(["//c/d:d", "@maven//:com_google_guava_guava", "//e:e"],
+                         deps["//a/b"])
+        self.assertEqual(["//y:y"], deps["//x:foo"])
+        self.assertEqual([], deps["//z"])
+
+    def test_get_transitive_closures(self):
+        """
+        a -> b -> d
+          -> c -> d -> e
+        """
+        a, b, c, d, e = self._get_deps_with_directs("a", "b", "c", "d", "e")
+        a.directs = [b, c]
+        b.directs = [d]
+        c.directs = [d]
+        d.directs = [e]
+
+        closures = bazel._get_transitive_closures([a, b, c, d, e])
+
+        self.assertEqual([[b, d, e, c], [d, e], [d, e], [e], []], closures)
+
+    def test_get_transitive_closures__cycle(self):
+        """
+        a -> b -> c -> b
+                  c -> d
+        """
+        a, b, c, d = self._get_deps_with_directs("a", "b", "c", "d")
+        a.directs = [b]
+        b.directs = [c]
+        c.directs = [b, d]
+
+        closures = bazel._get_transitive_closures([a, b, c, d])
+
+        self.assertEqual([[b, c, d], [c, b, d], [b, c, d], []], closures)
+
+    def test_get_transitive_closures__same_order_as_depth_first_traversal(self):
+        rnd = random.Random(17)
+        for _ in range(50):
+            deps = self._get_deps_with_directs(*[str(i) for i in range(30)])
+            for i, dep in enumerate(deps):
+                # mostly references to "later" deps, with some cycles
+                for _ in range(rnd.randint(0, 4)):
+                    if rnd.random() < 0.9:
+                        if i + 1 < len(deps):
+                            dep.directs.append(deps[rnd.randint(i + 1, len(deps) - 1)])
+                    else:
+                        dep.directs.append(deps[rnd.randint(0, len(deps) - 1)])
+
+            closures = bazel._get_transitive_closures(deps)
+
+            for dep, closure in zip(deps, closures):
+                self.assertEqual(self._get_depth_first_closure(dep), closure)
+
+    def _get_deps_with_directs(self, *names):
+        return [bazel._DepWithDirects(dependency.new_dep_from_maven_art_str("g:%s:1.0.0" % n, "maven")) for n in names]
+
+    def _get_depth_first_closure(self, dep, closure=None):
+        if closure is None:
+            closure = []
+        for d in dep.directs:
+            if d not in closure:
+                closure.append(d)
+                self._get_depth_first_closure(d, closure)
+        return closure
+
     def test_use_alt_lookup_coords(self):
         d1 = dependency.new_dep_from_maven_art_str("com.salesforce.servicelibs:pki-security-impl:jar:tests:1.0.0", "maven")
         top_level_deps = [d1]
@@ -265,6 +265,54 @@ pom_base_filename=glue-test
 
         self.assertEqual("glue-test", cfg.pom_base_filename)
 
+    def test_dependency_discovery_mode__default(self):
+        repo_root = tempfile.mkdtemp("root")
+        os.makedirs(os.path.join(repo_root, "src/config"))
+        self._write_file(repo_root, "src/config/pom_template.xml", "foo")
+
+        cfg = config.load(repo_root)
+
+        self.assertEqual("query", cfg.dependency_discovery_mode)
+
+    def test_dependency_discovery_mode__batch_query(self):
+        repo_root = tempfile.mkdtemp("root")
+        os.makedirs(os.path.join(repo_root, "src/config"))
+        self._write_file(repo_root, "src/config/pom_template.xml", "foo")
+        self._write_file(repo_root, ".pomgenrc", """
+[crawler]
+dependency_discovery_mode=batch_query
+""")
+
+        cfg = config.load(repo_root)
+
+        self.assertEqual("batch_query", cfg.dependency_discovery_mode)
+
+    def test_maven_install_cache_dir(self):
+        repo_root = tempfile.mkdtemp("root")
+        os.makedirs(os.path.join(repo_root, "src/config"))
+        self._write_file(repo_root, "src/config/pom_template.xml", "foo")
+        self._write_file(repo_root, ".pomgenrc", """
+[general]
+maven_install_cache_dir=.pomgen/cache
+""")
+
+        cfg = config.load(repo_root)
+
+        self.assertEqual(".pomgen/cache", cfg.maven_install_cache_dir)
+
+    def test_crawl_cache_dir(self):
+        repo_root = tempfile.mkdtemp("root")
+        os.makedirs(os.path.join(repo_root, "src/config"))
+        self._write_file(repo_root, "src/config/pom_template.xml", "foo")
+        self._write_file(repo_root, ".pomgenrc", """
+[crawler]
+crawl_cache_dir=.pomgen/crawl
+""")
+
+        cfg = config.load(repo_root)
+
+        self.assertEqual(".pomgen/crawl", cfg.crawl_cache_dir)
+
     def _write_pomgenrc(self, repo_root, pom_template_path, maven_install_paths):
         content = """[general]
 pom_template_path=%s
@@ -0,0 +1,159 @@
+"""
+Copyright (c) 2025, salesforce.com, inc.
+All rights reserved.
+SPDX-License-Identifier: BSD-3-Clause
+For full license text, see the LICENSE file in the repo root or https://opensource.org/licenses/BSD-3-Clause
+"""
+
+from common import label
+from common.os_util import run_cmd
+from config import exclusions
+from crawl import crawlcache
+import os
+import tempfile
+import unittest
+
+
+class CrawlCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.repo_root_path = tempfile.mkdtemp("monorepo")
+        self.cache_dir = os.path.join(self.repo_root_path, ".pomgen", "crawl")
+        run_cmd("git init .", cwd=self.repo_root_path)
+        run_cmd("git config user.email 'test@example.com'", cwd=self.repo_root_path)
+        run_cmd("git config user.name 'test example'", cwd=self.repo_root_path)
+        run_cmd("git config commit.gpgsign false", cwd=self.repo_root_path)
+        self._write_file("libs/a/BUILD", "java_library(name = 'a')")
+        self._write_file("libs/a/MVN-INF/BUILD.pom", "maven_artifact(artifact_id = 'a')")
+        self._write_file("libs/a/src/main/java/A.java", "class A {}")
+        self._commit()
+        self.source_exclusions = exclusions.src_exclusions(
+            relative_paths=("src/test",), file_names=(".gitignore",),
+            file_extensions=(".md",))
+        self.label = label.Label("//libs/a")
+        self.dep_labels = [label.Label("//libs/b"), label.Label("@maven//:guava")]
+
+    def test_get__miss(self):
+        cache = self._create_cache()
+
+        self.assertIsNone(cache.get(self.label))
+
+    def test_put_and_get(self):
+        cache = self._create_cache()
+        cache.put(self.label, self.dep_labels)
+        cache.save()
+
+        # a new instance to make sure the snapshot is read from disk
+        cache = self._create_cache()
+
+        self.assertEqual(self.dep_labels, cache.get(self.label))
+        self.assertIsNone(cache.get(label.Label("//libs/b")))
+
+    def test_save__entries_are_retained(self):
+        cache = self._create_cache()
+        cache.put(self.label, self.dep_labels)
+        cache.save()
+        self._write_file("libs/b/BUILD", "java_library(name = 'b')")
+        self._commit()
+        cache = self._create_cache()
+        cache.put(label.Label("//libs/b"), [])
+        cache.save()
+
+        cache = self._create_cache()
+
+        self.assertEqual(self.dep_labels, cache.get(self.label))
+        self.assertEqual([], cache.get(label.Label("//libs/b")))
+
+    def test_build_file_change_invalidates_entry(self):
+        self._put_and_save()
+
+        self._write_file("libs/a/BUILD", "java_library(name = 'a', deps = [])")
+
+        self.assertIsNone(self._create_cache().get(self.label))
+
+    def test_loaded_bzl_file_change_invalidates_entry(self):
+        self._write_file("libs/a/BUILD", "load('//tools:defs.bzl', 'lib')\nlib(name = 'a')")
+        self._write_file("tools/defs.bzl", "def lib(name): pass")
+        self._put_and_save()
+
+        self._write_file("tools/defs.bzl", "def lib(name, deps = []): pass")
+
+        self.assertIsNone(self._create_cache().get(self.label))
+
+    def test_build_pom_change_invalidates_entry(self):
+        self._put_and_save()
+
+        self._write_file("libs/a/MVN-INF/BUILD.pom", "maven_artifact(artifact_id = 'a2')")
+
+        self.assertIsNone(self._create_cache().get(self.label))
+
+    def test_source_change_invalidates_entry(self):
+        self._put_and_save()
+
+        self._write_file("libs/a/src/main/java/A2.java", "class A2 {}")
+        self._commit()
+
+        self.assertIsNone(self._create_cache().get(self.label))
+
+    def test_format_version_change_invalidates_snapshot(self):
+        self._put_and_save()
+        orig_version = crawlcache.CACHE_FORMAT_VERSION
+        try:
+            crawlcache.CACHE_FORMAT_VERSION = "0"
+
+            self.assertIsNone(self._create_cache().get(self.label))
+        finally:
+            crawlcache.CACHE_FORMAT_VERSION = orig_version
+
+    def test_dependency_discovery_mode_change_invalidates_snapshot(self):
+        self._put_and_save()
+
+        cache = crawlcache.CrawlCache(self.repo_root_path, self.cache_dir,
+                                      self.source_exclusions,
+                                      dependency_discovery_mode="offline")
+
+        self.assertIsNone(cache.get(self.label))
+
+    def test_corrupt_snapshot_is_ignored(self):
+        cache = self._create_cache()
+        os.makedirs(self.cache_dir)
+        with open(cache.cache_file_path, "wb") as f:
+            f.write(b"not a pickle")
+
+        self.assertIsNone(cache.get(self.label))
+
+    def test_get_crawl_cache__disabled(self):
+        cache = crawlcache.get_crawl_cache(self.repo_root_path, ".pomgen/crawl",
+                                           self.source_exclusions,
+                                           enabled=False)
+
+        self.assertIs(crawlcache.NOOP, cache)
+
+    def test_get_crawl_cache__relative_cache_dir(self):
+        cache = crawlcache.get_crawl_cache("/repo", ".pomgen/crawl",
+                                           self.source_exclusions)
+
+        self.assertEqual("/repo/.pomgen/crawl", cache.cache_dir)
+
+    def _create_cache(self):
+        return crawlcache.CrawlCache(self.repo_root_path, self.cache_dir,
+                                     self.source_exclusions)
+
+    def _put_and_save(self):
+        cache = self._create_cache()
+        cache.put(self.label, self.dep_labels)
+        cache.save()
+
+    def _write_file(self, rel_path, content):
+        path = os.path.join(self.repo_root_path, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+
+    def _commit(self):
+        run_cmd("git add .", cwd=self.repo_root_path)
+        run_cmd("git commit -m 'test commit'", cwd=self.repo_root_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,6 +9,7 @@ from common.os_util import run_cmd
 from common import maveninstallinfo
 from config import config
 from config import exclusions
+from crawl import crawlcache
 from crawl import crawler
 from crawl import dependencymd as dependencymdm
 from crawl import git
@@ -60,16 +61,7 @@ class CrawlerTest(unittest.TestCase):
         self._write_all_build_pom_released(self.repo_root_path)
         self.cwd = os.getcwd()
         os.chdir(self.repo_root_path)
-        depmd = dependencymdm.DependencyMetadata(None)
-        ws = workspace.Workspace(self.repo_root_path,
-                                 config=config.Config(),
-                                 maven_install_info=maveninstallinfo.NOOP,
-                                 pom_content=pomcontent.NOOP,
-                                 dependency_metadata=depmd,
-                                 label_to_overridden_fq_label={})
-        pom_template = ""
-        strategy = pomgenerationstrategy.PomGenerationStrategy(ws, pom_template)
-        self.crawler = crawler.Crawler(ws, strategy, pom_template)
+        self.crawler = self._create_crawler()
 
     def tearDown(self):
         os.chdir(self.cwd)
@@ -143,6 +135,64 @@ class CrawlerTest(unittest.TestCase):
         # reachable through node_b_a1_
         self.assertIs(node_c_a1_from_a_a1, node_c_a1)
 
+    def test_concurrent_crawl(self):
+        """
+        Crawling with more than one job produces the same DAG, in the same
+        order.
+        """
+        self._update_files(self.repo_root_path, ["libs/a/a2", "libs/c/a1"])
+        self._commit(self.repo_root_path)
+        result = self.crawler.crawl(["libs/a/a1"])
+        concurrent_crawler = self._create_crawler(jobs=4)
+
+        concurrent_result = concurrent_crawler.crawl(["libs/a/a1"])
+
+        self.assertEqual(self._get_dag_description(result.nodes),
+                         self._get_dag_description(concurrent_result.nodes))
+        self.assertEqual([ctx.artifact_def.bazel_package for ctx in result.artifact_generation_contexts],
+                         [ctx.artifact_def.bazel_package for ctx in concurrent_result.artifact_generation_contexts])
+        self.assertEqual([n.artifact_def.bazel_package for n in self.crawler.leafnodes],
+                         [n.artifact_def.bazel_package for n in concurrent_crawler.leafnodes])
+        self.assertEqual(len(self.crawler.target_to_node),
+                         len(concurrent_crawler.target_to_discovered_labels))
+
+    def test_crawl_cache(self):
+        """
+        The second crawl only discovers the dependencies of changed packages,
+        the other ones are read from the crawl snapshot.
+        """
+        cache_dir = tempfile.mkdtemp("crawlcache")
+        result = self._create_crawler(crawl_cache=self._create_crawl_cache(cache_dir)).crawl(["libs/a/a1"])
+        self._update_files(self.repo_root_path, ["libs/b/a1"])
+        self._commit(self.repo_root_path)
+        crawl_cache = self._create_crawl_cache(cache_dir)
+        discovered_packages = []
+        orig_put = crawl_cache.put
+        def put(label, labels):
+            discovered_packages.append(label.package_path)
+            orig_put(label, labels)
+        crawl_cache.put = put
+
+        cached_result = self._create_crawler(crawl_cache=crawl_cache).crawl(["libs/a/a1"])
+
+        self.assertEqual(["libs/b/a1"], discovered_packages)
+        self.assertEqual(self._get_dag_description(result.nodes),
+                         self._get_dag_description(cached_result.nodes))
+
+    def test_crawl_cache__changed_dependencies(self):
+        cache_dir = tempfile.mkdtemp("crawlcache")
+        self._create_crawler(crawl_cache=self._create_crawl_cache(cache_dir)).crawl(["libs/a/a1"])
+        # remove the reference to library C from library A
+        path = os.path.join(self.repo_root_path, "libs/a/a1/MVN-INF/BUILD.pom")
+        with open(path, "r") as f:
+            content = f.read()
+        with open(path, "w") as f:
+            f.write(content.replace('"//libs/c/a1"', ""))
+
+        result = self._create_crawler(crawl_cache=self._create_crawl_cache(cache_dir)).crawl(["libs/a/a1"])
+
+        self.assertEqual(["libs/b/a1"], [n.artifact_def.bazel_package for n in result.nodes[0].children])
+
     def test_no_lib_changed(self):
         """
         If no library changed, we do not get any pom generator instances.
@@ -800,6 +850,34 @@ released_maven_artifact(
         with open(os.path.join(path, "LIBRARY.root"), "w") as f:
            f.write("foo")
 
+    def _create_crawl_cache(self, cache_dir):
+        return crawlcache.CrawlCache(self.repo_root_path, cache_dir,
+                                     config.Config().all_src_exclusions)
+
+    def _create_crawler(self, jobs=1, crawl_cache=crawlcache.NOOP):
+        depmd = dependencymdm.DependencyMetadata(None)
+        ws = workspace.Workspace(self.repo_root_path,
+                                 config=config.Config(),
+                                 maven_install_info=maveninstallinfo.NOOP,
+                                 pom_content=pomcontent.NOOP,
+                                 dependency_metadata=depmd,
+                                 label_to_overridden_fq_label={})
+        pom_template = ""
+        strategy = pomgenerationstrategy.PomGenerationStrategy(ws, pom_template)
+        return crawler.Crawler(ws, strategy, pom_template, jobs=jobs,
+                               crawl_cache=crawl_cache)
+
+    def _get_dag_description(self, nodes):
+        lines = []
+        def describe(node, indent):
+            lines.append("%s%s <- %s" % (" " * indent, node.artifact_def.bazel_package,
+                                         [p.artifact_def.bazel_package for p in node.parents]))
+            for child in node.children:
+                describe(child, indent + 2)
+        for node in nodes:
+            describe(node, 0)
+        return lines
+
     def _get_node_by_bazel_package(self, nodes, bazel_package):
         for n in nodes:
             if n.artifact_def.bazel_package == bazel_package:
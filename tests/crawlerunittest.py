@@ -11,12 +11,19 @@ from common import maveninstallinfo
 from common import pomgenmode
 from config import config
 from crawl import artifactgenctx as artifactgenctx
+from crawl import bazel
 from crawl import buildpom
 from crawl import crawler as crawlerm
 from crawl import dependency
 from crawl import dependencymd as dependencymdm
+from crawl import pomdigestcache
+from crawl import pomparser
+from crawl.releasereason import ReleaseReason
 from crawl import workspace
 import generate.impl.pomgenerationstrategy as pomgenerationstrategy
+import os
+import subprocess
+import tempfile
 import unittest
 
 
@@ -103,17 +110,17 @@ class CrawlerUnitTest(unittest.TestCase):
 
         target_to_all_deps = crawler._compute_transitive_closures_of_deps()
 
-        a3_deps = self._get_deps_for_node(a3_node, target_to_all_deps)
+        a3_deps = self._get_closure_for_node(crawler, a3_node, target_to_all_deps)
         self.assertEqual(2, len(a3_deps))
         self.assertEqual(d1, a3_deps[0])
         self.assertEqual(d2, a3_deps[1])
-        a2_deps = self._get_deps_for_node(a2_node, target_to_all_deps)
+        a2_deps = self._get_closure_for_node(crawler, a2_node, target_to_all_deps)
         self.assertEqual(4, len(a2_deps))
         self.assertEqual(d3, a2_deps[0])
         self.assertEqual(d4, a2_deps[1])
         self.assertEqual(d1, a2_deps[2])
         self.assertEqual(d2, a2_deps[3])
-        a1_deps = self._get_deps_for_node(a1_node, target_to_all_deps)
+        a1_deps = self._get_closure_for_node(crawler, a1_node, target_to_all_deps)
         self.assertEqual(5, len(a1_deps))
         self.assertEqual(d5, a1_deps[0])
         self.assertEqual(d3, a1_deps[1])
@@ -157,16 +164,16 @@ class CrawlerUnitTest(unittest.TestCase):
         target_to_all_deps = crawler._compute_transitive_closures_of_deps()
         print(target_to_all_deps)
 
-        a3_deps = self._get_deps_for_node(a3_node, target_to_all_deps)
+        a3_deps = self._get_closure_for_node(crawler, a3_node, target_to_all_deps)
         self.assertEqual(2, len(a3_deps))
         self.assertEqual(d1, a3_deps[0])
         self.assertEqual(d2, a3_deps[1])
-        a2_deps = self._get_deps_for_node(a2_node, target_to_all_deps)
+        a2_deps = self._get_closure_for_node(crawler, a2_node, target_to_all_deps)
         self.assertEqual(3, len(a2_deps))
         self.assertEqual(d1, a2_deps[0])
         self.assertEqual(d2, a2_deps[1])
         self.assertEqual(d3, a2_deps[2])
-        a1_deps = self._get_deps_for_node(a1_node, target_to_all_deps)
+        a1_deps = self._get_closure_for_node(crawler, a1_node, target_to_all_deps)
         self.assertEqual(4, len(a1_deps))
         self.assertEqual(d1, a1_deps[0])
         self.assertEqual(d4, a1_deps[1])
@@ -207,15 +214,15 @@ class CrawlerUnitTest(unittest.TestCase):
 
         target_to_all_deps = crawler._compute_transitive_closures_of_deps()
 
-        a3_deps = self._get_deps_for_node(a3_node, target_to_all_deps)
+        a3_deps = self._get_closure_for_node(crawler, a3_node, target_to_all_deps)
         self.assertEqual(2, len(a3_deps))
         self.assertEqual(d1, a3_deps[0])
         self.assertEqual(d2, a3_deps[1])
-        a2_deps = self._get_deps_for_node(a2_node, target_to_all_deps)
+        a2_deps = self._get_closure_for_node(crawler, a2_node, target_to_all_deps)
         self.assertEqual(2, len(a2_deps))
         self.assertEqual(d1, a2_deps[0])
         self.assertEqual(d3, a2_deps[1])
-        a1_deps = self._get_deps_for_node(a1_node, target_to_all_deps)
+        a1_deps = self._get_closure_for_node(crawler, a1_node, target_to_all_deps)
         self.assertEqual(4, len(a1_deps))
         self.assertEqual(d4, a1_deps[0])
         self.assertEqual(d1, a1_deps[1])
@@ -259,14 +266,14 @@ class CrawlerUnitTest(unittest.TestCase):
 
         target_to_all_deps = crawler._compute_transitive_closures_of_deps()
 
-        a10_deps = self._get_deps_for_node(a10_node, target_to_all_deps)        
+        a10_deps = self._get_closure_for_node(crawler, a10_node, target_to_all_deps)        
         self.assertEqual(1, len(a10_deps))
         self.assertEqual(d10, a10_deps[0])
-        a2_deps = self._get_deps_for_node(a2_node, target_to_all_deps)        
+        a2_deps = self._get_closure_for_node(crawler, a2_node, target_to_all_deps)        
         self.assertEqual(2, len(a2_deps))
         self.assertEqual(d2, a2_deps[0])
         self.assertEqual(d10, a2_deps[1])
-        a1_deps = self._get_deps_for_node(a1_node, target_to_all_deps)        
+        a1_deps = self._get_closure_for_node(crawler, a1_node, target_to_all_deps)        
         self.assertEqual(2, len(a1_deps))
         self.assertEqual(d1, a1_deps[0])
         self.assertEqual(d10, a1_deps[1])
@@ -320,20 +327,20 @@ class CrawlerUnitTest(unittest.TestCase):
 
         target_to_all_deps = crawler._compute_transitive_closures_of_deps()
 
-        a3_deps = self._get_deps_for_node(a3_node, target_to_all_deps)
+        a3_deps = self._get_closure_for_node(crawler, a3_node, target_to_all_deps)
         self.assertEqual(5, len(a3_deps))
         self.assertEqual(d1, a3_deps[0])
         self.assertEqual(t1, a3_deps[1])
         self.assertEqual(t2, a3_deps[2])
         self.assertEqual(d2, a3_deps[3])
         self.assertEqual(t3, a3_deps[4])
-        a2_deps = self._get_deps_for_node(a2_node, target_to_all_deps)
+        a2_deps = self._get_closure_for_node(crawler, a2_node, target_to_all_deps)
         self.assertEqual(4, len(a2_deps))
         self.assertEqual(d1, a2_deps[0])
         self.assertEqual(t1, a2_deps[1])
         self.assertEqual(t2, a2_deps[2])
         self.assertEqual(d3, a2_deps[3])
-        a1_deps = self._get_deps_for_node(a1_node, target_to_all_deps)
+        a1_deps = self._get_closure_for_node(crawler, a1_node, target_to_all_deps)
         self.assertEqual(9, len(a1_deps))
         self.assertEqual(d4, a1_deps[0])
         self.assertEqual(t4, a1_deps[1])
@@ -345,6 +352,114 @@ class CrawlerUnitTest(unittest.TestCase):
         self.assertEqual(d2, a1_deps[7])
         self.assertEqual(t3, a1_deps[8])
 
+    def test_compute_transitive_closure__deps_ordered_by_leafnodes(self):
+        """
+        a1 references a2 and a3, a2 references a3
+        a1 has ext deps d1, a2 has ext deps d2, a3 has ext deps d3
+        a4 references a3
+        a4 has ext deps d4
+
+        a3 is the first leafnode, a2 is found through the a1 -> a2 reference,
+        so the deps of a1 are ordered based on walking up from a3:
+        a3 -> a2 -> a1, then a3 -> a1
+
+        the expected transitive closure of deps are:
+        a3: d3
+        a2: d2, d3
+        a1: d1, d2, d3
+        a4: d4, d3
+        """
+        a1_node = self._build_node("a1", "a/b/c")
+        a4_node = self._build_node("a4", "x/y/z")
+        a2_node = self._build_node("a2", "d/e/f", parent_node=a1_node)
+        a3_node = self._build_node("a3", "g/h/i")
+        a3_node.parents = [a2_node, a1_node, a4_node]
+        a1_node.children = (a3_node, a2_node,)
+        a2_node.children = (a3_node,)
+        a4_node.children = (a3_node,)
+        pom_template = ""
+        ws = self._get_workspace()
+        strategy = pomgenerationstrategy.PomGenerationStrategy(ws, pom_template)
+        crawler = crawlerm.Crawler(ws, strategy, pom_template)
+        d1 = self._get_3rdparty_dep("com:d1:1.0.0", "d1")
+        d2 = self._get_3rdparty_dep("com:d2:1.0.0", "d2")
+        d3 = self._get_3rdparty_dep("com:d3:1.0.0", "d3")
+        d4 = self._get_3rdparty_dep("com:d4:1.0.0", "d4")
+        self._associate_dep(crawler, a1_node, (d1,))
+        self._associate_dep(crawler, a2_node, (d2,))
+        self._associate_dep(crawler, a3_node, (d3,))
+        self._associate_dep(crawler, a4_node, (d4,))
+        crawler.leafnodes = (a3_node,)
+
+        target_to_all_deps = crawler._compute_transitive_closures_of_deps()
+
+        self.assertEqual([d3], self._get_closure_for_node(crawler, a3_node, target_to_all_deps))
+        self.assertEqual([d2, d3], self._get_closure_for_node(crawler, a2_node, target_to_all_deps))
+        self.assertEqual([d1, d2, d3], self._get_closure_for_node(crawler, a1_node, target_to_all_deps))
+        self.assertEqual([d4, d3], self._get_closure_for_node(crawler, a4_node, target_to_all_deps))
+
+    def test_compute_transitive_closure__many_paths(self):
+        """
+        A chain of diamonds: the number of paths from the leafnode to the
+        root doubles with each diamond.
+        """
+        pom_template = ""
+        ws = self._get_workspace()
+        strategy = pomgenerationstrategy.PomGenerationStrategy(ws, pom_template)
+        crawler = crawlerm.Crawler(ws, strategy, pom_template)
+        node = self._build_node("a0", "a0")
+        self._associate_dep(crawler, node, (self._get_3rdparty_dep("com:d0:1.0.0", "d0"),))
+        crawler.leafnodes = (node,)
+        for i in range(1, 60):
+            left = self._build_node("l%i" % i, "l%i" % i)
+            right = self._build_node("r%i" % i, "r%i" % i)
+            top = self._build_node("a%i" % i, "a%i" % i)
+            node.parents = [left, right]
+            left.parents = [top]
+            right.parents = [top]
+            self._associate_dep(crawler, left, (self._get_3rdparty_dep("com:l%i:1.0.0" % i, "l%i" % i),))
+            self._associate_dep(crawler, right, (self._get_3rdparty_dep("com:r%i:1.0.0" % i, "r%i" % i),))
+            self._associate_dep(crawler, top, (self._get_3rdparty_dep("com:a%i:1.0.0" % i, "a%i" % i),))
+            node = top
+
+        target_to_all_deps = crawler._compute_transitive_closures_of_deps()
+
+        root_deps = self._get_closure_for_node(crawler, node, target_to_all_deps)
+        self.assertEqual(1 + 59 * 3, len(root_deps))
+        self.assertEqual(["a59", "l59", "a58", "l58"], [d.artifact_id for d in root_deps[:4]])
+
+    def test_compute_transitive_closure__interned_deps(self):
+        """
+        a1 -> a2 -> a3
+        the closures are stored as arrays of dependency ids, each dependency
+        instance is interned once
+        """
+        pom_template = ""
+        ws = self._get_workspace()
+        strategy = pomgenerationstrategy.PomGenerationStrategy(ws, pom_template)
+        crawler = crawlerm.Crawler(ws, strategy, pom_template)
+        a1_node = self._build_node("a1", "a/b/c")
+        a2_node = self._build_node("a2", "d/e/f", parent_node=a1_node)
+        a3_node = self._build_node("a3", "g/h/i", parent_node=a2_node)
+        guava = self._get_3rdparty_dep("com.google.guava:guava:20.0", "guava")
+        # equal to guava, but a different instance
+        guava_other_version = self._get_3rdparty_dep("com.google.guava:guava:23.0", "guava")
+        d1 = self._get_3rdparty_dep("com:d1:1.0.0", "d1")
+        self._associate_dep(crawler, a3_node, guava)
+        self._associate_dep(crawler, a2_node, d1)
+        self._associate_dep(crawler, a1_node, guava_other_version)
+        crawler.leafnodes = (a3_node,)
+
+        target_to_all_deps = crawler._compute_transitive_closures_of_deps()
+
+        self.assertEqual("I", target_to_all_deps[a1_node.label].typecode)
+        self.assertEqual(3, len(crawler.dependency_table))
+        self.assertEqual([guava], self._get_closure_for_node(crawler, a3_node, target_to_all_deps))
+        self.assertEqual([d1, guava], self._get_closure_for_node(crawler, a2_node, target_to_all_deps))
+        a1_deps = self._get_closure_for_node(crawler, a1_node, target_to_all_deps)
+        self.assertEqual([guava_other_version, d1], a1_deps)
+        self.assertIs(guava_other_version, a1_deps[0])
+
     def test_compute_transitive_closure__ext_deps_with_same_transitives(self):
         """
         a1 references both a2 and a3
@@ -393,18 +508,18 @@ class CrawlerUnitTest(unittest.TestCase):
 
         target_to_all_deps = crawler._compute_transitive_closures_of_deps()
 
-        a3_deps = self._get_deps_for_node(a3_node, target_to_all_deps)
+        a3_deps = self._get_closure_for_node(crawler, a3_node, target_to_all_deps)
         self.assertEqual(4, len(a3_deps))
         self.assertEqual(d1, a3_deps[0])
         self.assertEqual(t1, a3_deps[1])
         self.assertEqual(d2, a3_deps[2])
         self.assertEqual(t2, a3_deps[3])
-        a2_deps = self._get_deps_for_node(a2_node, target_to_all_deps)
+        a2_deps = self._get_closure_for_node(crawler, a2_node, target_to_all_deps)
         self.assertEqual(3, len(a2_deps))
         self.assertEqual(d1, a2_deps[0])
         self.assertEqual(t1, a2_deps[1])
         self.assertEqual(d3, a2_deps[2])
-        a1_deps = self._get_deps_for_node(a1_node, target_to_all_deps)
+        a1_deps = self._get_closure_for_node(crawler, a1_node, target_to_all_deps)
         self.assertEqual(6, len(a1_deps))
         self.assertEqual(d4, a1_deps[0])
         self.assertEqual(t2, a1_deps[1])
@@ -458,7 +573,7 @@ class CrawlerUnitTest(unittest.TestCase):
 
         target_to_all_deps = crawler._compute_transitive_closures_of_deps()
 
-        a3_deps = self._get_deps_for_node(a3_node, target_to_all_deps)
+        a3_deps = self._get_closure_for_node(crawler, a3_node, target_to_all_deps)
         self.assertEqual(6, len(a3_deps))
         self.assertEqual(d1, a3_deps[0])
         self.assertEqual(t2, a3_deps[1])
@@ -466,13 +581,13 @@ class CrawlerUnitTest(unittest.TestCase):
         self.assertEqual(t3, a3_deps[3])
         self.assertEqual(t1, a3_deps[4])
         self.assertEqual(d3, a3_deps[5])
-        a2_deps = self._get_deps_for_node(a2_node, target_to_all_deps)
+        a2_deps = self._get_closure_for_node(crawler, a2_node, target_to_all_deps)
         self.assertEqual(4, len(a2_deps))
         self.assertEqual(t1, a2_deps[0])
         self.assertEqual(t3, a2_deps[1])
         self.assertEqual(d1, a2_deps[2])
         self.assertEqual(t2, a2_deps[3])
-        a1_deps = self._get_deps_for_node(a1_node, target_to_all_deps)
+        a1_deps = self._get_closure_for_node(crawler, a1_node, target_to_all_deps)
         self.assertEqual(7, len(a1_deps))
         self.assertEqual(t3, a1_deps[0])
         self.assertEqual(t2, a1_deps[1])
@@ -537,6 +652,122 @@ class CrawlerUnitTest(unittest.TestCase):
         self.assertTrue(a1_node.artifact_def.requires_release)
         self.assertIn("transitive", a1_node.artifact_def.release_reason)
 
+    def test_propagate_requires_release_up__diamond(self):
+        """
+        l1 -> (l2, l3) -> l4, l3 requires release
+
+        l1 is first reached through l2, which does not require release.
+        """
+        a1_node = self._build_node("a1", "a/b/c", library_path="l1")
+        a2_node = self._build_node("a2", "d/e/f", parent_node=a1_node, library_path="l2")
+        a3_node = self._build_node("a3", "g/h/i", parent_node=a1_node, library_path="l3")
+        a4_node = self._build_node("a4", "j/k/l", parent_node=a2_node, library_path="l4")
+        a4_node.parents.append(a3_node)
+        a1_node.children = (a2_node, a3_node,)
+        a2_node.children = (a4_node,)
+        a3_node.children = (a4_node,)
+        crawler = self._get_crawler_with_nodes(a1_node, a2_node, a3_node, a4_node)
+        crawler.leafnodes = (a4_node,)
+
+        a3_node.artifact_def.requires_release = True
+        a3_node.artifact_def.release_reason = ReleaseReason.ARTIFACT
+        crawler._calculate_artifact_release_flag(force_release=False)
+
+        self.assertTrue(a1_node.artifact_def.requires_release)
+        self.assertEqual(ReleaseReason.TRANSITIVE, a1_node.artifact_def.release_reason)
+        self.assertFalse(a2_node.artifact_def.requires_release)
+        self.assertEqual(ReleaseReason.ARTIFACT, a3_node.artifact_def.release_reason)
+        self.assertFalse(a4_node.artifact_def.requires_release)
+
+    def test_propagate_requires_release_up__sibling_reason_has_precedence(self):
+        """
+        l1 -> l2, both require release, l1 because of a pom change
+        """
+        a1_node = self._build_node("a1", "a/b/c", library_path="l1")
+        a1b_node = self._build_node("a1b", "a/b/d", library_path="l1")
+        a2_node = self._build_node("a2", "d/e/f", parent_node=a1_node, library_path="l2")
+        a1_node.children = (a2_node,)
+        crawler = self._get_crawler_with_nodes(a1_node, a1b_node, a2_node)
+        crawler.leafnodes = (a1b_node, a2_node,)
+
+        a1_node.artifact_def.requires_release = True
+        a1_node.artifact_def.release_reason = ReleaseReason.POM
+        a2_node.artifact_def.requires_release = True
+        a2_node.artifact_def.release_reason = ReleaseReason.ARTIFACT
+        crawler._calculate_artifact_release_flag(force_release=False)
+
+        self.assertEqual(ReleaseReason.POM, a1_node.artifact_def.release_reason)
+        self.assertTrue(a1b_node.artifact_def.requires_release)
+        self.assertEqual(ReleaseReason.POM, a1b_node.artifact_def.release_reason)
+        self.assertEqual(ReleaseReason.ARTIFACT, a2_node.artifact_def.release_reason)
+
+    def test_propagate_requires_release_up__library_reference_cycle(self):
+        """
+        l1 -> l2 -> l1 -> l3 (through different artifacts), l3 requires
+        release
+        """
+        l1a1_node = self._build_node("l1a1", "a/b/c", library_path="l1")
+        l2a1_node = self._build_node("l2a1", "d/e/f", parent_node=l1a1_node, library_path="l2")
+        l1a2_node = self._build_node("l1a2", "a/b/d", parent_node=l2a1_node, library_path="l1")
+        l3a1_node = self._build_node("l3a1", "g/h/i", parent_node=l1a2_node, library_path="l3")
+        l1a1_node.children = (l2a1_node,)
+        l2a1_node.children = (l1a2_node,)
+        l1a2_node.children = (l3a1_node,)
+        crawler = self._get_crawler_with_nodes(l1a1_node, l2a1_node, l1a2_node, l3a1_node)
+        crawler.leafnodes = (l3a1_node,)
+
+        l3a1_node.artifact_def.requires_release = True
+        l3a1_node.artifact_def.release_reason = ReleaseReason.ARTIFACT
+        crawler._calculate_artifact_release_flag(force_release=False)
+
+        for node in (l1a1_node, l2a1_node, l1a2_node):
+            self.assertTrue(node.artifact_def.requires_release)
+            self.assertEqual(ReleaseReason.TRANSITIVE, node.artifact_def.release_reason)
+
+    def test_propagate_requires_release_up__force(self):
+        a1_node = self._build_node("a1", "a/b/c", library_path="l1")
+        a2_node = self._build_node("a2", "d/e/f", parent_node=a1_node, library_path="l2")
+        a1_node.children = (a2_node,)
+        crawler = self._get_crawler_with_nodes(a1_node, a2_node)
+        crawler.leafnodes = (a2_node,)
+
+        a2_node.artifact_def.requires_release = True
+        a2_node.artifact_def.release_reason = ReleaseReason.ARTIFACT
+        crawler._calculate_artifact_release_flag(force_release=True)
+
+        for node in (a1_node, a2_node):
+            self.assertTrue(node.artifact_def.requires_release)
+            self.assertEqual(ReleaseReason.ALWAYS, node.artifact_def.release_reason)
+
+    def test_propagate_requires_release_up__deep_chain(self):
+        """
+        l0 -> l1 -> ... -> l2000, l2000 requires release
+        """
+        nodes = [self._build_node("a0", "p0", library_path="l0")]
+        for i in range(1, 2001):
+            node = self._build_node("a%i" % i, "p%i" % i,
+                                    parent_node=nodes[-1],
+                                    library_path="l%i" % i)
+            nodes[-1].children = (node,)
+            nodes.append(node)
+        ws = self._get_workspace()
+        pom_template = ""
+        strategy = pomgenerationstrategy.PomGenerationStrategy(ws, pom_template)
+        crawler = crawlerm.Crawler(ws, strategy, pom_template)
+        for node in nodes:
+            crawler.library_to_nodes[node.artifact_def.library_path].append(node)
+            crawler.library_to_artifact[node.artifact_def.library_path].append(node.artifact_def)
+            crawler.target_to_dependencies[node.label] = []
+        crawler.leafnodes = (nodes[-1],)
+
+        nodes[-1].artifact_def.requires_release = True
+        nodes[-1].artifact_def.release_reason = "some reason"
+        crawler._push_transitives_to_parent()
+        crawler._calculate_artifact_release_flag(force_release=False)
+
+        self.assertTrue(all(n.artifact_def.requires_release for n in nodes))
+        self.assertIn("transitive", nodes[0].artifact_def.release_reason)
+
     def test_remove_package_private_labels(self):
         package = "a/b/c"
         art = buildpom.MavenArtifactDef("g1", "a1", "1", bazel_package=package,
@@ -583,12 +814,12 @@ class CrawlerUnitTest(unittest.TestCase):
         crawler.library_to_nodes[library_path].append(node2)
         crawler.genctxs = [ctx]
         crawler.target_to_dependencies = {node1.label: [d1,d2]}
-        target_to_transitive_closure_deps = {
-            node1.label: [d1, d2, d3],
-            node2.label: [d4],
+        target_to_transitive_closure = {
+            node1.label: crawler.dependency_table.get_ids([d1, d2, d3]),
+            node2.label: crawler.dependency_table.get_ids([d4]),
         }
 
-        crawler._register_dependencies(target_to_transitive_closure_deps)
+        crawler._register_dependencies(target_to_transitive_closure)
 
         self.assertEqual(set([d1, d2]), set(ctx.direct_dependencies))
         self.assertEqual(set([d1, d2, d3]), set(ctx.artifact_transitive_closure))
@@ -615,19 +846,278 @@ class CrawlerUnitTest(unittest.TestCase):
         crawler.library_to_nodes[library_path].append(node2)
         crawler.genctxs = [ctx]
         crawler.target_to_dependencies = {node1.label: [d1,d2]}
-        target_to_transitive_closure_deps = {
-            node1.label: [d1, d2, d3],
-            node2.label: [d4],
+        target_to_transitive_closure = {
+            node1.label: crawler.dependency_table.get_ids([d1, d2, d3]),
+            node2.label: crawler.dependency_table.get_ids([d4]),
         }
         # add one additional dependency and exclude d2
         node1.artifact_def._emitted_dependencies = ["com:d5:1.0.0", "-com:d2",]
 
-        crawler._register_dependencies(target_to_transitive_closure_deps)
+        crawler._register_dependencies(target_to_transitive_closure)
 
         self.assertEqual(set([d1, d5]), set(ctx.direct_dependencies))
         self.assertEqual(set([d1, d3]), set(ctx.artifact_transitive_closure))
         self.assertEqual(set([d1, d3, d4]), set(ctx.library_transitive_closure))
 
+    def test_register_dependencies__library_closure_computed_once(self):
+        pom_template = ""
+        library_path = "projects/libs/lib"
+        d1 = self._get_3rdparty_dep("com:d1:1.0.0", "d1")
+        d2 = self._get_3rdparty_dep("com:d2:1.0.0", "d2")
+        nodes = [self._build_node("art%i" % i, "projects/libs/lib/p%i" % i,
+                                  library_path=library_path)
+                 for i in range(3)]
+        ws = self._get_workspace()
+        strategy = pomgenerationstrategy.PomGenerationStrategy(ws, pom_template)
+        crawler = crawlerm.Crawler(ws, strategy, pom_template)
+        for node in nodes:
+            crawler.library_to_nodes[library_path].append(node)
+            crawler.genctxs.append(artifactgenctx.ArtifactGenerationContext(
+                ws, pom_template, node.artifact_def, node.label, excluded_deps=set()))
+            crawler.target_to_dependencies[node.label] = []
+        # exclude d1 from the last artifact
+        nodes[2].artifact_def._emitted_dependencies = ["-com:d1",]
+        target_to_transitive_closure = {
+            nodes[0].label: crawler.dependency_table.get_ids([d1]),
+            nodes[1].label: crawler.dependency_table.get_ids([d2]),
+            nodes[2].label: crawler.dependency_table.get_ids([]),
+        }
+        libraries = []
+        orig_get_closure = crawler._get_deps_transitive_closure_for_library
+        def get_closure(library_path, target_to_transitive_closure):
+            libraries.append(library_path)
+            return orig_get_closure(library_path, target_to_transitive_closure)
+        crawler._get_deps_transitive_closure_for_library = get_closure
+
+        crawler._register_dependencies(target_to_transitive_closure)
+
+        self.assertEqual([library_path], libraries)
+        self.assertEqual(set([d1, d2]), set(crawler.genctxs[0].library_transitive_closure))
+        self.assertEqual(set([d1, d2]), set(crawler.genctxs[1].library_transitive_closure))
+        self.assertEqual(set([d2]), set(crawler.genctxs[2].library_transitive_closure))
+
+    def test_check_for_artifact_manifest_changes__concurrent(self):
+        """
+        The manifests are compared using more than one process, the release
+        flags are set on the artifact defs of this process.
+        """
+        pom_template = ""
+        ws = self._get_workspace()
+        strategy = pomgenerationstrategy.PomGenerationStrategy(ws, pom_template)
+        crawler = crawlerm.Crawler(ws, strategy, pom_template, jobs=2)
+        manifest = "<project><artifactId>%s</artifactId></project>"
+        for i in range(4):
+            node = self._build_node("art%i" % i, "projects/libs/p%i" % i)
+            ctx = artifactgenctx.ArtifactGenerationContext(
+                ws, pom_template, node.artifact_def, node.label, excluded_deps=set())
+            ctx.gen_goldfile_manifest = lambda i=i: manifest % ("art%i" % i)
+            crawler.genctxs.append(ctx)
+        # art1 and art3 have changed, art3 is already flagged
+        released_artifact_ids = ["art0", "art1-old", "art2", "art3-old"]
+        for i, ctx in enumerate(crawler.genctxs):
+            ctx.artifact_def._released_pom_content = manifest % released_artifact_ids[i]
+            ctx.artifact_def._requires_release = i == 3
+
+        crawler._check_for_artifact_manifest_changes()
+
+        art_defs = [ctx.artifact_def for ctx in crawler.genctxs]
+        self.assertEqual([False, True, False, True],
+                         [art_def.requires_release for art_def in art_defs])
+        self.assertEqual([None, ReleaseReason.POM, None, None],
+                         [art_def.release_reason for art_def in art_defs])
+
+    def test_check_for_artifact_manifest_changes__released_digests_are_cached(self):
+        """
+        The digests of the released manifests computed by other processes are
+        stored in the pom digest cache.
+        """
+        pom_template = ""
+        ws = self._get_workspace()
+        strategy = pomgenerationstrategy.PomGenerationStrategy(ws, pom_template)
+        cache_dir = tempfile.mkdtemp("pomdigests")
+        load_log_path = os.path.join(cache_dir, "loads.log")
+        class PomDigestCache(pomdigestcache.PomDigestCache):
+            def _load(self):
+                # the file is shared by all processes
+                with open(load_log_path, "a") as f:
+                    f.write("%i\n" % os.getpid())
+                return super()._load()
+        crawler = crawlerm.Crawler(ws, strategy, pom_template, jobs=2,
+                                   pom_digest_cache=PomDigestCache(cache_dir))
+        manifest = "<project><artifactId>%s</artifactId></project>"
+        for i in range(3):
+            node = self._build_node("art%i" % i, "projects/libs/p%i" % i)
+            ctx = artifactgenctx.ArtifactGenerationContext(
+                ws, pom_template, node.artifact_def, node.label, excluded_deps=set())
+            ctx.gen_goldfile_manifest = lambda i=i: manifest % ("art%i" % i)
+            ctx.artifact_def._released_pom_content = manifest % ("art%i" % i)
+            ctx.artifact_def._requires_release = False
+            crawler.genctxs.append(ctx)
+
+        crawler._check_for_artifact_manifest_changes()
+
+        self.assertEqual([False, False, False],
+                         [ctx.artifact_def.requires_release for ctx in crawler.genctxs])
+        # the cache file has been read once, before the processes were forked
+        with open(load_log_path) as f:
+            self.assertEqual(["%i" % os.getpid()], f.read().splitlines())
+        cache = pomdigestcache.PomDigestCache(cache_dir)
+        for i in range(3):
+            cache.put(manifest % ("art%i" % i), pomparser.get_digest_for_comparison(manifest % ("art%i" % i)))
+        # the cache file already had all digests
+        self.assertFalse(cache._updated)
+
+    def test_prefetch_dependencies(self):
+        """
+        a1 -> b1, c1
+        b1 -> c1
+        the deps of each crawl depth are queried using a single bazel query
+        """
+        ws = self._get_workspace(dependency_discovery_mode="batch_query")
+        for artifact_id in ("a1", "b1", "c1"):
+            ws._package_to_artifact_def[artifact_id] = buildpom.MavenArtifactDef(
+                "g1", artifact_id, "1.0.0", bazel_package=artifact_id,
+                pom_generation_mode=pomgenmode.DYNAMIC,
+                bazel_target=artifact_id)
+        all_deps = {
+            "//a1": ["//b1", "//c1", "@maven//:guava"],
+            "//b1": ["//c1"],
+            "//c1": [],
+        }
+        queried_target_patterns = []
+        def query(repo_root, target_pattern_to_dep_attributes, verbose):
+            queried_target_patterns.append(sorted(target_pattern_to_dep_attributes.keys()))
+            return {t: all_deps[t] for t in target_pattern_to_dep_attributes.keys()}
+        pom_template = ""
+        strategy = pomgenerationstrategy.PomGenerationStrategy(ws, pom_template)
+        crawler = crawlerm.Crawler(ws, strategy, pom_template)
+        orig_query = bazel.query_java_library_deps_attributes_batch
+        bazel.query_java_library_deps_attributes_batch = query
+        try:
+            crawler._prefetch_dependencies([label.Label("a1")], follow_references=True)
+        finally:
+            bazel.query_java_library_deps_attributes_batch = orig_query
+
+        self.assertEqual([["//a1"], ["//b1", "//c1"]], queried_target_patterns)
+        self.assertEqual(["//b1", "//c1", "@maven//:guava"],
+                         crawler.target_to_queried_labels[label.Label("a1")])
+        self.assertEqual(["//c1"],
+                         crawler.target_to_queried_labels[label.Label("b1")])
+        self.assertEqual([], crawler.target_to_queried_labels[label.Label("c1")])
+
+    def test_prefetch_dependencies__bad_target(self):
+        """
+        a1 -> b1, c1
+        b1 is not the default target of its package: the batched query
+        still returns the deps of the other targets, and b1 fails with the
+        same error as when it is queried by itself
+        """
+        ws = self._get_workspace(dependency_discovery_mode="batch_query")
+        for artifact_id in ("a1", "b1", "c1"):
+            ws._package_to_artifact_def[artifact_id] = buildpom.MavenArtifactDef(
+                "g1", artifact_id, "1.0.0", bazel_package=artifact_id,
+                pom_generation_mode=pomgenmode.DYNAMIC,
+                bazel_target=artifact_id)
+        rules = {
+            "//a1": '{"type":"RULE","rule":{"name":"//a1:a1","attribute":[{"name":"deps","stringListValue":["//b1","//c1"]}]}}',
+            "//c1": '{"type":"RULE","rule":{"name":"//c1:c1","attribute":[]}}',
+        }
+        queried_target_patterns = []
+        def run_cmd(cmd, cwd):
+            # behaves like "bazel query --keep_going"
+            self.assertIn("--keep_going", cmd)
+            with open(cmd.split("--query_file=")[1]) as f:
+                target_patterns = f.read()[len("set("):-1].split(" ")
+            queried_target_patterns.append(sorted(target_patterns))
+            output = "\n".join([rules[t] for t in target_patterns if t in rules])
+            if len(output.splitlines()) < len(target_patterns):
+                raise subprocess.CalledProcessError(3, cmd, output)
+            return output
+        pom_template = ""
+        strategy = pomgenerationstrategy.PomGenerationStrategy(ws, pom_template)
+        crawler = crawlerm.Crawler(ws, strategy, pom_template)
+        orig_run_cmd = bazel.run_cmd
+        bazel.run_cmd = run_cmd
+        try:
+            crawler._prefetch_dependencies([label.Label("a1")], follow_references=True)
+
+            self.assertEqual([["//a1"], ["//b1", "//c1"]], queried_target_patterns)
+            self.assertEqual([], crawler.target_to_queried_labels[label.Label("c1")])
+            self.assertNotIn(label.Label("b1"), crawler.target_to_queried_labels)
+            with self.assertRaises(Exception) as ctx:
+                crawler._query_labels(ws._package_to_artifact_def["b1"], label.Label("b1"))
+        finally:
+            bazel.run_cmd = orig_run_cmd
+
+        self.assertIn("Error while processing dependencies", str(ctx.exception))
+        self.assertIn("not the default bazel package target", str(ctx.exception))
+
+    def test_prefetch_dependencies__query_cache(self):
+        """
+        a1 -> b1
+        the deps of a1 are cached, only b1 is queried
+        """
+        ws = self._get_workspace(dependency_discovery_mode="batch_query")
+        for artifact_id in ("a1", "b1"):
+            ws._package_to_artifact_def[artifact_id] = buildpom.MavenArtifactDef(
+                "g1", artifact_id, "1.0.0", bazel_package=artifact_id,
+                pom_generation_mode=pomgenmode.DYNAMIC,
+                bazel_target=artifact_id)
+        class Cache:
+            def __init__(self):
+                self.entries = {label.Label("a1"): ["//b1"]}
+            def get(self, lbl, dep_attributes):
+                return self.entries.get(lbl)
+            def put(self, lbl, dep_attributes, labels):
+                self.entries[lbl] = labels
+        cache = Cache()
+        queried_target_patterns = []
+        def query(repo_root, target_pattern_to_dep_attributes, verbose):
+            queried_target_patterns.append(sorted(target_pattern_to_dep_attributes.keys()))
+            return {t: [] for t in target_pattern_to_dep_attributes.keys()}
+        pom_template = ""
+        strategy = pomgenerationstrategy.PomGenerationStrategy(ws, pom_template)
+        crawler = crawlerm.Crawler(ws, strategy, pom_template, query_cache=cache)
+        orig_query = bazel.query_java_library_deps_attributes_batch
+        bazel.query_java_library_deps_attributes_batch = query
+        try:
+            crawler._prefetch_dependencies([label.Label("a1")], follow_references=True)
+        finally:
+            bazel.query_java_library_deps_attributes_batch = orig_query
+
+        self.assertEqual([["//b1"]], queried_target_patterns)
+        self.assertEqual(["//b1"], crawler.target_to_queried_labels[label.Label("a1")])
+        self.assertEqual([], cache.entries[label.Label("b1")])
+
+    def test_artifactless_labels_are_verified_using_single_query(self):
+        ws = self._get_workspace()
+        ws._package_to_artifact_def["lombok"] = None
+        ws._package_to_artifact_def["autovalue"] = None
+        ws._package_to_artifact_def["x"] = None
+        pom_template = ""
+        strategy = pomgenerationstrategy.PomGenerationStrategy(ws, pom_template)
+        crawler = crawlerm.Crawler(ws, strategy, pom_template)
+        queried_labels = []
+        def query(repo_root_path, labels, verbose):
+            queried_labels.append(labels)
+            return set(["//lombok", "//autovalue"])
+        orig_query = bazel.query_never_link_labels
+        bazel.query_never_link_labels = query
+        try:
+            self.assertIsNone(crawler._filter_label(label.Label("//lombok")))
+            self.assertIsNone(crawler._filter_label(label.Label("//autovalue")))
+            self.assertIsNone(crawler._filter_label(label.Label("//lombok")))
+            crawler._verify_artifactless_labels_are_never_link()
+            self.assertEqual([["//lombok", "//autovalue"]], queried_labels)
+
+            self.assertIsNone(crawler._filter_label(label.Label("//x")))
+            with self.assertRaises(Exception) as ctx:
+                crawler._verify_artifactless_labels_are_never_link()
+        finally:
+            bazel.query_never_link_labels = orig_query
+
+        self.assertIn("no BUILD.pom file in package [x]", str(ctx.exception))
+        self.assertEqual([["//lombok", "//autovalue"], ["//x"]], queried_labels)
 
     def _build_node(self, artifact_id, bazel_package,
                     pom_generation_mode=pomgenmode.DYNAMIC,
@@ -640,9 +1130,22 @@ class CrawlerUnitTest(unittest.TestCase):
             bazel_target="t1")
         return crawlerm.Node(parent_node, art_def, label.Label(bazel_package))
 
+    def _get_crawler_with_nodes(self, *nodes):
+        ws = self._get_workspace()
+        pom_template = ""
+        strategy = pomgenerationstrategy.PomGenerationStrategy(ws, pom_template)
+        crawler = crawlerm.Crawler(ws, strategy, pom_template)
+        for node in nodes:
+            crawler.library_to_nodes[node.artifact_def.library_path].append(node)
+            crawler.library_to_artifact[node.artifact_def.library_path].append(node.artifact_def)
+        return crawler
+
     def _get_associated_deps(self, crawler, node):
         return self._get_deps_for_node(node, crawler.target_to_dependencies)
 
+    def _get_closure_for_node(self, crawler, node, target_to_closure):
+        return crawler.dependency_table.get_dependencies(target_to_closure[node.label])
+
     def _get_deps_for_node(self, node, target_to_deps):
         return target_to_deps[node.label]
 
@@ -656,10 +1159,11 @@ class CrawlerUnitTest(unittest.TestCase):
     def _get_3rdparty_dep(self, artifact_str, name):
         return dependency.new_dep_from_maven_art_str(artifact_str, name)
 
-    def _get_workspace(self):
+    def _get_workspace(self, dependency_discovery_mode="query"):
         depmd = dependencymdm.DependencyMetadata(None)
+        cfg = config.Config(dependency_discovery_mode=dependency_discovery_mode)
         return workspace.Workspace(repo_root_path="a/b/c",
-                                   config=config.Config(),
+                                   config=cfg,
                                    maven_install_info=maveninstallinfo.NOOP,
                                    pom_content="",
                                    dependency_metadata=depmd,
@@ -8,6 +8,10 @@ For full license text, see the LICENSE file in the repo root or https://opensour
 from common import pomgenmode
 from crawl import buildpom
 from crawl import dependency
+import os
+import pickle
+import subprocess
+import sys
 import unittest
 
 
@@ -485,6 +489,70 @@ class DependencyTest(unittest.TestCase):
         self.assertEqual("packaging", dep_copy.packaging)
         self.assertEqual("scope", dep_copy.scope)
 
+    def test_copy__set_attributes(self):
+        import copy
+        dep = dependency.new_dep_from_maven_art_str("g1:a1:1.0", "name")
+        dep_with_classifier = dependency.new_dep_from_maven_art_str("g1:a1:jar:c1:1.0", "name")
+        dep_with_scope = dependency.new_dep_from_maven_art_str("g1:a1:1.0", "name")
+        dep_with_scope.scope = "test"
+        # the hash, sort key and coordinates are cached
+        self.assertNotEqual(dep, dep_with_classifier)
+        self.assertTrue(dep < dep_with_scope)
+        self.assertEqual("g1:a1", dep.maven_coordinates_name)
+        self.assertEqual("@name//:g1_a1", dep.bazel_label_name)
+
+        dep_copy = copy.copy(dep)
+        dep_copy.classifier = "c1"
+        dep_copy.scope = "test"
+
+        self.assertEqual(dep_with_classifier, dep_copy)
+        self.assertEqual(hash(dep_with_classifier), hash(dep_copy))
+        self.assertFalse(dep_copy < dep_with_classifier)
+        self.assertEqual("g1:a1:jar:c1", dep_copy.maven_coordinates_name)
+        self.assertEqual("@name//:g1_a1_c1", dep_copy.bazel_label_name)
+        # the original instance is unchanged
+        self.assertEqual("g1:a1", dep.maven_coordinates_name)
+        self.assertNotEqual(dep, dep_copy)
+
+    def test_slots(self):
+        art_def = buildpom.MavenArtifactDef("g1", "a1", "1.0")
+        third_party_dep = dependency.new_dep_from_maven_art_str("g1:a1:1.0", "name")
+        monorepo_dep = dependency.new_dep_from_maven_artifact_def(art_def)
+
+        for instance in (art_def, third_party_dep, monorepo_dep):
+            self.assertFalse(hasattr(instance, "__dict__"))
+
+    def test_pickle__other_process(self):
+        """
+        Dependencies pickled by another process equal the ones created by this
+        process: string hashes are different in each process, so the cached
+        hash must not be pickled.
+        """
+        script = """
+import pickle, sys
+from crawl import dependency
+deps = [dependency.new_dep_from_maven_art_str("g1:a1:1.0", "name"),
+        dependency.new_dep_from_maven_art_str("g1:a1:jar:c1:1.0", "name")]
+# compute all cached values before pickling
+set(deps), sorted(deps), [(d.maven_coordinates_name, d.bazel_label_name) for d in deps]
+sys.stdout.buffer.write(pickle.dumps(deps))
+"""
+        src_dir_path = os.path.dirname(os.path.dirname(dependency.__file__))
+        env = dict(os.environ, PYTHONHASHSEED="3", PYTHONPATH=src_dir_path)
+        output = subprocess.check_output([sys.executable, "-c", script], env=env)
+
+        deps = pickle.loads(output)
+
+        expected_deps = [dependency.new_dep_from_maven_art_str("g1:a1:1.0", "name"),
+                         dependency.new_dep_from_maven_art_str("g1:a1:jar:c1:1.0", "name")]
+        self.assertEqual(expected_deps, deps)
+        for dep, expected_dep in zip(deps, expected_deps):
+            self.assertIn(dep, set(expected_deps))
+            self.assertIn(expected_dep, set(deps))
+            self.assertEqual(expected_dep.maven_coordinates_name, dep.maven_coordinates_name)
+            self.assertEqual(expected_dep.bazel_label_name, dep.bazel_label_name)
+            self.assertEqual("1.0", dep.version)
+
     def test_bazel_buildable__external_dep(self):
         artifact = "com.google.guava:guava:20.0"
 
@@ -527,6 +595,33 @@ class DependencyTest(unittest.TestCase):
         self.assertTrue(dep.bazel_buildable)
 
 
+    def test_dependency_table(self):
+        table = dependency.DependencyTable()
+        d1 = dependency.new_dep_from_maven_art_str("g1:a1:1.0", "name")
+        d2 = dependency.new_dep_from_maven_art_str("g1:a2:1.0", "name")
+
+        ids = table.get_ids([d1, d2, d1])
+
+        self.assertEqual([0, 1, 0], list(ids))
+        self.assertEqual("I", ids.typecode)
+        self.assertEqual(2, len(table))
+        self.assertEqual([d1, d2, d1], table.get_dependencies(ids))
+        self.assertIs(d2, table.get_dependency(1))
+
+    def test_dependency_table__equal_dependencies(self):
+        table = dependency.DependencyTable()
+        d1 = dependency.new_dep_from_maven_art_str("g1:a1:1.0", "name")
+        d1_other_version = dependency.new_dep_from_maven_art_str("g1:a1:2.0", "name")
+        d2 = dependency.new_dep_from_maven_art_str("g1:a1:jar:tests:1.0", "name")
+
+        id1, id2, id3 = table.get_ids([d1, d1_other_version, d2])
+
+        # equal dependencies share the key id, but each instance has its own id
+        self.assertNotEqual(id1, id2)
+        self.assertEqual(table.get_key_id(id1), table.get_key_id(id2))
+        self.assertNotEqual(table.get_key_id(id1), table.get_key_id(id3))
+        self.assertIs(d1_other_version, table.get_dependency(id2))
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -0,0 +1,119 @@
+"""
+Copyright (c) 2025, salesforce.com, inc.
+All rights reserved.
+SPDX-License-Identifier: BSD-3-Clause
+For full license text, see the LICENSE file in the repo root or https://opensource.org/licenses/BSD-3-Clause
+"""
+
+from common.os_util import run_cmd
+from config import exclusions
+from crawl import git
+import os
+import tempfile
+import unittest
+
+
+class GitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.repo_root_path = tempfile.mkdtemp("monorepo")
+        run_cmd("git init .", cwd=self.repo_root_path)
+        run_cmd("git config user.email 'test@example.com'", cwd=self.repo_root_path)
+        run_cmd("git config user.name 'test example'", cwd=self.repo_root_path)
+        run_cmd("git config commit.gpgsign false", cwd=self.repo_root_path)
+        self._write_file("libs/a/src/main/java/A.java")
+        self._write_file("libs/a/src/test/java/ATest.java")
+        self._write_file("libs/a/BUILD")
+        self._write_file("libs/a/README.md")
+        self._write_file("libs/a/MVN-INF/BUILD.pom")
+        self._write_file("libs/a/nested/MVN-INF/BUILD.pom")
+        self._write_file("libs/a/nested/N.java")
+        self._write_file("libs/ab/B.java")
+        self._write_file("libs/a.txt")
+        self._commit()
+        self.source_exclusions = exclusions.src_exclusions(
+            relative_paths=("src/test",), file_names=(".gitignore",),
+            file_extensions=(".md",))
+
+    def test_get_dir_hash__same_as_git_hash_object(self):
+        for rel_paths in (["libs/a"], ["libs/ab"], ["libs/a", "libs/ab"],
+                          ["libs"], ["libs/a/nested"]):
+            self.assertEqual(self._get_git_hash_object_dir_hash(rel_paths),
+                             git.get_dir_hash(self.repo_root_path, rel_paths,
+                                              self.source_exclusions),
+                             rel_paths)
+
+    def test_get_dir_hash__paths_requiring_quoting(self):
+        self._write_file("libs/a/src/main/java/Ä.java")
+        self._write_file("libs/a/src/main/java/with space.java")
+        self._commit()
+
+        self.assertEqual(self._get_git_hash_object_dir_hash(["libs/a"]),
+                         git.get_dir_hash(self.repo_root_path, ["libs/a"],
+                                          self.source_exclusions))
+
+    def test_get_dir_hash__index_changes(self):
+        h1 = git.get_dir_hash(self.repo_root_path, ["libs/a"], self.source_exclusions)
+        self._write_file("libs/a/src/main/java/A2.java")
+        self._commit()
+
+        h2 = git.get_dir_hash(self.repo_root_path, ["libs/a"], self.source_exclusions)
+
+        self.assertNotEqual(h1, h2)
+        self.assertEqual(self._get_git_hash_object_dir_hash(["libs/a"]), h2)
+
+    def test_git_status__has_uncommitted_changes(self):
+        self._write_file("libs/a/src/main/java/A.java", "changed")
+        self._write_file("libs/a/src/test/java/New.java")
+        self._write_file("libs/a/nested/MVN-INF/BUILD.pom", "changed")
+        self._write_file("libs/ab/README.md", "changed")
+        run_cmd("git mv libs/a.txt libs/c.txt", cwd=self.repo_root_path)
+        git_status = git.GitStatus(self.repo_root_path)
+
+        for rel_path in ("libs/a", "libs/ab", "libs/a/nested", "libs",
+                         "libs/c.txt", "libs/a.txt", "libs/b", "other"):
+            self.assertEqual(git.has_uncommitted_changes(self.repo_root_path, rel_path, self.source_exclusions),
+                             git_status.has_uncommitted_changes(rel_path, self.source_exclusions),
+                             rel_path)
+
+    def test_git_status__only_excluded_changes(self):
+        self._write_file("libs/a/src/test/java/ATest.java", "changed")
+        self._write_file("libs/a/README.md", "changed")
+        self._write_file("libs/a/MVN-INF/BUILD.pom", "changed")
+        git_status = git.GitStatus(self.repo_root_path)
+
+        self.assertFalse(git_status.has_uncommitted_changes("libs/a", self.source_exclusions))
+        self._write_file("libs/a/src/main/java/A.java", "changed")
+        # the status is not refreshed
+        self.assertFalse(git_status.has_uncommitted_changes("libs/a", self.source_exclusions))
+        self.assertTrue(git.GitStatus(self.repo_root_path).has_uncommitted_changes("libs/a", self.source_exclusions))
+
+    def _get_git_hash_object_dir_hash(self, rel_paths):
+        """
+        The original hash implementation, one "git ls-files" and one
+        "git hash-object" call per invocation.
+        """
+        files_output = ""
+        for rel_path in rel_paths:
+            file_path_filter = git._get_file_path_filter(rel_path, self.source_exclusions)
+            output = run_cmd("git ls-files -s %s" % rel_path, cwd=self.repo_root_path).splitlines()
+            lines = [line for line in output if file_path_filter(line[line.index(rel_path):].strip())]
+            files_output += "\n".join(sorted(lines))
+        with tempfile.NamedTemporaryFile("w") as f:
+            f.write(files_output)
+            f.flush()
+            return run_cmd("git hash-object %s" % f.name, cwd=self.repo_root_path).strip()
+
+    def _write_file(self, rel_path, content=None):
+        path = os.path.join(self.repo_root_path, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(rel_path if content is None else content)
+
+    def _commit(self):
+        run_cmd("git add .", cwd=self.repo_root_path)
+        run_cmd("git commit -m 'message'", cwd=self.repo_root_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -161,5 +161,31 @@ class LabelTest(unittest.TestCase):
                          n1.with_target("foo").canonical_form)
 
 
+    def test_interned(self):
+        n1 = label.Label("//a/b/c:foo")
+
+        self.assertIs(n1, label.Label("//a/b/c:foo"))
+        self.assertIs(n1, label.Label(" //a/b/c:foo "))
+
+    def test_equal_labels_with_different_names(self):
+        n1 = label.Label("//a/b/c")
+        n2 = label.Label("//a/b/c:c")
+
+        self.assertEqual(n1, n2)
+        self.assertEqual(hash(n1), hash(n2))
+        self.assertEqual(1, len(set([n1, n2])))
+
+    def test_pickle(self):
+        import pickle
+        n1 = label.Label("@pomgen//a/b/c:foo")
+
+        self.assertIs(n1, pickle.loads(pickle.dumps(n1)))
+
+    def test_immutable(self):
+        n1 = label.Label("//a/b/c:foo")
+
+        with self.assertRaises(AttributeError):
+            n1.target = "bar"
+
 if __name__ == '__main__':
     unittest.main()
@@ -106,6 +106,53 @@ class LibAggregatorTest(unittest.TestCase):
         self.assertTrue(lib.requires_release)
         self.assertEqual(ReleaseReason.ARTIFACT, lib.release_reason)
 
+    def test_deep_library_chain(self):
+        """
+        mylib0 -> mylib1 -> ... -> mylib2000
+        """
+        artifact_nodes = []
+        for i in range(2001):
+            node = self._create_library_artifact_node("g1", "a%i" % i, "1.0.0",
+                                                      "mylib%i" % i,
+                                                      requires_release=True)
+            if len(artifact_nodes) > 0:
+                artifact_nodes[-1].children = [node]
+            artifact_nodes.append(node)
+
+        lib_nodes = crawl.libaggregator.get_libraries_to_release(artifact_nodes)
+        pretty_output = lib_nodes[0].pretty_print()
+
+        self.assertEqual(1, len(lib_nodes))
+        lib = lib_nodes[0]
+        for i in range(2000):
+            self.assertEqual("mylib%i" % i, lib.library_path)
+            self.assertEqual(1, len(lib.children))
+            lib = lib.children[0]
+        self.assertEqual("mylib2000", lib.library_path)
+        self.assertIn("\n%smylib2000 + 1.0.0-SNAPSHOT" % (" " * 4000), pretty_output)
+
+    def test_pretty_print__circular_library_references(self):
+        """
+        mylib -> mylib2 -> mylib
+        """
+        l1a1 = self._create_library_artifact_node("g1", "a1", "1.0.0", "mylib",
+                                                  requires_release=True)
+        l2a1 = self._create_library_artifact_node("g2", "a1", "2.0.0", "mylib2",
+                                                  requires_release=True)
+        l1a2 = self._create_library_artifact_node("g1", "a2", "1.0.0", "mylib",
+                                                  requires_release=True)
+        l1a1.children = [l2a1]
+        l2a1.children = [l1a2]
+
+        lib_nodes = crawl.libaggregator.get_libraries_to_release([l1a1])
+        pretty_output = lib_nodes[0].pretty_print()
+
+        self.assertEqual(["mylib + 1.0.0-SNAPSHOT",
+                          "  mylib2 + 2.0.0-SNAPSHOT",
+                          "    mylib + 1.0.0-SNAPSHOT",
+                          "    ..."],
+                         pretty_output.split("\n")[:4])
+
     def test_release_reason_precedence__always(self):
         self.assertEqual(ReleaseReason.ALWAYS, crawl.libaggregator._get_lib_release_reason(ReleaseReason.ALWAYS, ReleaseReason.ALWAYS))
         self.assertEqual(ReleaseReason.ALWAYS, crawl.libaggregator._get_lib_release_reason(ReleaseReason.ALWAYS, ReleaseReason.FIRST))
@@ -0,0 +1,194 @@
+"""
+Copyright (c) 2025, salesforce.com, inc.
+All rights reserved.
+SPDX-License-Identifier: BSD-3-Clause
+For full license text, see the LICENSE file in the repo root or https://opensource.org/licenses/BSD-3-Clause
+"""
+
+from crawl import bazel
+from crawl import maveninstallcache
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+
+class MavenInstallCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp("mvninstallcache")
+        self.pinned_file_path = os.path.join(tempfile.mkdtemp("pinned"), "maven_install.json")
+        self._write_pinned_file(MVN_INSTALL_JSON_CONTENT)
+        self.names_and_paths = [("maven", self.pinned_file_path)]
+
+    def test_get__miss(self):
+        cache = maveninstallcache.MavenInstallCache(self.cache_dir)
+
+        self.assertIsNone(cache.get(self.names_and_paths, {}))
+
+    def test_put_and_get(self):
+        result = bazel.parse_maven_install(self.names_and_paths)
+        cache = maveninstallcache.MavenInstallCache(self.cache_dir)
+        cache.put(self.names_and_paths, {}, result)
+
+        # a new instance to make sure the result is read from disk
+        cache = maveninstallcache.MavenInstallCache(self.cache_dir)
+        cached_result = cache.get(self.names_and_paths, {})
+
+        self.assertEqual(len(result), len(cached_result))
+        for (dep, transitives), (cached_dep, cached_transitives) in zip(result, cached_result):
+            self.assertEqual(dep, cached_dep)
+            self.assertEqual(dep.version, cached_dep.version)
+            self.assertEqual(dep.bazel_label_name, cached_dep.bazel_label_name)
+            self.assertEqual(transitives, cached_transitives)
+
+    def test_get__dependency_identity(self):
+        """
+        The transitives are the same instances as the top level deps, like
+        the deps returned by bazel.parse_maven_install.
+        """
+        cache = maveninstallcache.MavenInstallCache(self.cache_dir)
+        cache.put(self.names_and_paths, {},
+                  bazel.parse_maven_install(self.names_and_paths))
+
+        cached_result = cache.get(self.names_and_paths, {})
+
+        deps = [dep for dep, _ in cached_result]
+        logback_classic_transitives = [t for d, t in cached_result if d.artifact_id == "logback-classic"][0]
+        self.assertEqual(2, len(logback_classic_transitives))
+        for transitive in logback_classic_transitives:
+            self.assertTrue(any(transitive is d for d in deps))
+
+    def test_put_and_get__other_process(self):
+        """
+        The cache file is written by another pomgen invocation, which uses
+        different string hashes.
+        """
+        script = """
+import sys
+from crawl import bazel, maveninstallcache
+cache_dir, pinned_file_path = sys.argv[1:]
+names_and_paths = [("maven", pinned_file_path)]
+result = bazel.parse_maven_install(names_and_paths)
+maveninstallcache.MavenInstallCache(cache_dir).put(names_and_paths, {}, result)
+"""
+        src_dir_path = os.path.dirname(os.path.dirname(maveninstallcache.__file__))
+        env = dict(os.environ, PYTHONHASHSEED="3", PYTHONPATH=src_dir_path)
+        subprocess.check_call([sys.executable, "-c", script, self.cache_dir, self.pinned_file_path], env=env)
+
+        cache = maveninstallcache.MavenInstallCache(self.cache_dir)
+        cached_result = cache.get(self.names_and_paths, {})
+
+        result = bazel.parse_maven_install(self.names_and_paths)
+        self.assertEqual(len(result), len(cached_result))
+        deps = set([dep for dep, _ in result])
+        cached_deps = set([dep for dep, _ in cached_result])
+        for dep, transitives in result:
+            self.assertIn(dep, cached_deps)
+        for cached_dep, cached_transitives in cached_result:
+            self.assertIn(cached_dep, deps)
+            for transitive in cached_transitives:
+                self.assertIn(transitive, deps)
+        self.assertEqual(dict(result), dict(cached_result))
+
+    def test_pinned_file_change_invalidates_cache(self):
+        cache = maveninstallcache.MavenInstallCache(self.cache_dir)
+        cache.put(self.names_and_paths, {},
+                  bazel.parse_maven_install(self.names_and_paths))
+
+        self._write_pinned_file(MVN_INSTALL_JSON_CONTENT.replace("1.2.3", "1.2.4"))
+
+        self.assertIsNone(cache.get(self.names_and_paths, {}))
+
+    def test_maven_install_name_change_invalidates_cache(self):
+        cache = maveninstallcache.MavenInstallCache(self.cache_dir)
+        cache.put(self.names_and_paths, {},
+                  bazel.parse_maven_install(self.names_and_paths))
+
+        self.assertIsNone(cache.get([("maven2", self.pinned_file_path)], {}))
+
+    def test_overrides_change_invalidates_cache(self):
+        cache = maveninstallcache.MavenInstallCache(self.cache_dir)
+        cache.put(self.names_and_paths, {},
+                  bazel.parse_maven_install(self.names_and_paths))
+
+        overrides = {"org_slf4j_slf4j_api": "@maven//:ch_qos_logback_logback_core"}
+        self.assertIsNone(cache.get(self.names_and_paths, overrides))
+
+    def test_format_version_change_invalidates_cache(self):
+        cache = maveninstallcache.MavenInstallCache(self.cache_dir)
+        cache.put(self.names_and_paths, {},
+                  bazel.parse_maven_install(self.names_and_paths))
+        orig_version = maveninstallcache.CACHE_FORMAT_VERSION
+        try:
+            maveninstallcache.CACHE_FORMAT_VERSION = "0"
+
+            self.assertIsNone(cache.get(self.names_and_paths, {}))
+        finally:
+            maveninstallcache.CACHE_FORMAT_VERSION = orig_version
+
+    def test_corrupt_cache_file_is_ignored(self):
+        cache = maveninstallcache.MavenInstallCache(self.cache_dir)
+        with open(cache.get_cache_file_path(self.names_and_paths), "wb") as f:
+            f.write(b"not a pickle")
+
+        self.assertIsNone(cache.get(self.names_and_paths, {}))
+
+    def test_get_maven_install_cache__no_cache_dir(self):
+        cache = maveninstallcache.get_maven_install_cache("/repo", None)
+
+        self.assertIs(maveninstallcache.NOOP, cache)
+
+    def test_get_maven_install_cache__relative_cache_dir(self):
+        cache = maveninstallcache.get_maven_install_cache("/repo", ".pomgen/cache")
+
+        self.assertEqual("/repo/.pomgen/cache", cache.cache_dir)
+
+    def _write_pinned_file(self, content):
+        with open(self.pinned_file_path, "w") as f:
+            f.write(content)
+
+
+MVN_INSTALL_JSON_CONTENT = """
+{
+    "artifacts": {
+        "ch.qos.logback:logback-classic": {
+            "shasums": {
+                "jar": "ef95ae468097f378880be69a8c6756f8d15180e0f07547fb0a99617ff421b2ac"
+            },
+            "version": "1.2.3"
+        },
+        "ch.qos.logback:logback-core": {
+            "shasums": {
+                "jar": "ef95ae468097f378880be69a8c6756f8d15180e0f07547fb0a99617ff421b2ac"
+            },
+            "version": "1.2.3"
+        },
+        "org.slf4j:slf4j-api": {
+            "shasums": {
+                "jar": "ef95ae468097f378880be69a8c6756f8d15180e0f07547fb0a99617ff421b2ac"
+            },
+            "version": "1.7.30"
+        }
+    },
+    "dependencies": {
+        "ch.qos.logback:logback-classic": [
+            "ch.qos.logback:logback-core",
+            "org.slf4j:slf4j-api"
+        ]
+    },
+    "repositories": {
+        "https://maven.google.com/": [
+            "ch.qos.logback:logback-classic",
+            "ch.qos.logback:logback-core",
+            "org.slf4j:slf4j-api"
+        ]
+    },
+    "version": "2"
+}
+"""
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -76,6 +76,22 @@ class MdFilesTest(unittest.TestCase):
         content = self._read_file(root_path, package_path, "MVN-INF", "MYFILE")
         self.assertEqual(FILE_CONTENT, content)
 
+    def test_write_file__unchanged_content(self):
+        root_path = tempfile.mkdtemp("monorepo")
+        package_path = "projects/libs/pastry/abstractions"
+        os.makedirs(os.path.join(root_path, package_path))
+
+        path, written = mdfiles.write_file(FILE_CONTENT, root_path, package_path, "MYFILE")
+        self.assertTrue(written)
+        self.assertEqual(os.path.join(root_path, package_path, "MVN-INF", "MYFILE"), path)
+        path, written = mdfiles.write_file(FILE_CONTENT, root_path, package_path, "MYFILE")
+        self.assertFalse(written)
+        path, written = mdfiles.write_file(FILE_CONTENT + "2", root_path, package_path, "MYFILE")
+        self.assertTrue(written)
+
+        content = self._read_file(root_path, package_path, "MVN-INF", "MYFILE")
+        self.assertEqual(FILE_CONTENT + "2", content)
+
     def test_write_file__md_dir_name(self):
         root_path = tempfile.mkdtemp("monorepo")
         package_path = "projects/libs/pastry/abstractions"
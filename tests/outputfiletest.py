@@ -0,0 +1,98 @@
+"""
+Copyright (c) 2025, salesforce.com, inc.
+All rights reserved.
+SPDX-License-Identifier: BSD-3-Clause
+For full license text, see the LICENSE file in the repo root or https://opensource.org/licenses/BSD-3-Clause
+"""
+
+from common import outputfile
+import os
+import tempfile
+import unittest
+
+
+class OutputFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp("outputfile")
+        self.path = os.path.join(self.dir, "pom.xml")
+
+    def test_write_file__new_file(self):
+        written = outputfile.write_file(self.path, "<project/>")
+
+        self.assertTrue(written)
+        self.assertEqual("<project/>", self._read_file())
+        self.assertEqual(["pom.xml"], os.listdir(self.dir))
+
+    def test_write_file__unchanged_content_is_not_written(self):
+        outputfile.write_file(self.path, "<project/>")
+        os.utime(self.path, (0, 0))
+
+        written = outputfile.write_file(self.path, "<project/>")
+
+        self.assertFalse(written)
+        self.assertEqual(0, os.stat(self.path).st_mtime)
+
+    def test_write_file__changed_content_same_size(self):
+        outputfile.write_file(self.path, "<project>a</project>")
+
+        written = outputfile.write_file(self.path, "<project>b</project>")
+
+        self.assertTrue(written)
+        self.assertEqual("<project>b</project>", self._read_file())
+
+    def test_write_file__changed_content_different_size(self):
+        outputfile.write_file(self.path, "<project>a</project>")
+
+        written = outputfile.write_file(self.path, "<project>abc</project>")
+
+        self.assertTrue(written)
+        self.assertEqual("<project>abc</project>", self._read_file())
+
+    def test_write_file__non_ascii_content(self):
+        outputfile.write_file(self.path, "<name>Crème</name>")
+
+        self.assertFalse(outputfile.write_file(self.path, "<name>Crème</name>"))
+        self.assertTrue(outputfile.write_file(self.path, "<name>Creme</name>"))
+
+    def test_write_file__mode_is_kept(self):
+        outputfile.write_file(self.path, "a")
+        os.chmod(self.path, 0o640)
+
+        outputfile.write_file(self.path, "b")
+
+        self.assertEqual(0o640, os.stat(self.path).st_mode & 0o777)
+
+    def test_write_file__new_file_mode(self):
+        outputfile.write_file(self.path, "a")
+
+        # the same mode as a file created by open(), which applies the umask
+        other_path = os.path.join(self.dir, "other.xml")
+        with open(other_path, "w") as f:
+            f.write("a")
+        self.assertEqual(os.stat(other_path).st_mode & 0o777, os.stat(self.path).st_mode & 0o777)
+
+    def test_write_file__failed_write_keeps_existing_file(self):
+        outputfile.write_file(self.path, "a")
+
+        def replace(src, dst):
+            raise OSError("disk full")
+        orig_replace = os.replace
+        os.replace = replace
+        try:
+            with self.assertRaises(OSError):
+                outputfile.write_file(self.path, "b")
+        finally:
+            os.replace = orig_replace
+
+        self.assertEqual("a", self._read_file())
+        # the temporary file has been removed
+        self.assertEqual(["pom.xml"], os.listdir(self.dir))
+
+    def _read_file(self):
+        with open(self.path, "r") as f:
+            return f.read()
+
+
+if __name__ == '__main__':
+    unittest.main()
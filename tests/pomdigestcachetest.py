@@ -0,0 +1,145 @@
+"""
+Copyright (c) 2025, salesforce.com, inc.
+All rights reserved.
+SPDX-License-Identifier: BSD-3-Clause
+For full license text, see the LICENSE file in the repo root or https://opensource.org/licenses/BSD-3-Clause
+"""
+
+from crawl import pomdigestcache
+from crawl import pomparser
+import os
+import tempfile
+import unittest
+
+
+POM = """<project><artifactId>%s</artifactId></project>"""
+
+
+class PomDigestCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = os.path.join(tempfile.mkdtemp("pomdigests"), "crawl")
+        self.orig_get_digest = pomparser.get_digest_for_comparison
+        self.digested_poms = []
+        def get_digest(pom_content):
+            self.digested_poms.append(pom_content)
+            return self.orig_get_digest(pom_content)
+        pomparser.get_digest_for_comparison = get_digest
+
+    def tearDown(self):
+        pomparser.get_digest_for_comparison = self.orig_get_digest
+
+    def test_get_digest(self):
+        cache = pomdigestcache.PomDigestCache(self.cache_dir)
+
+        digest = cache.get_digest(POM % "a1")
+
+        self.assertEqual(self.orig_get_digest(POM % "a1"), digest)
+
+    def test_get_digest__computed_once(self):
+        cache = pomdigestcache.PomDigestCache(self.cache_dir)
+        cache.get_digest(POM % "a1")
+        cache.save()
+
+        # a new instance to make sure the digest is read from disk
+        cache = pomdigestcache.PomDigestCache(self.cache_dir)
+        digest = cache.get_digest(POM % "a1")
+
+        self.assertEqual(self.orig_get_digest(POM % "a1"), digest)
+        self.assertEqual([POM % "a1"], self.digested_poms)
+
+    def test_get_digest__changed_content(self):
+        cache = pomdigestcache.PomDigestCache(self.cache_dir)
+        cache.get_digest(POM % "a1")
+        cache.save()
+
+        cache = pomdigestcache.PomDigestCache(self.cache_dir)
+        digest = cache.get_digest(POM % "a2")
+
+        self.assertEqual(self.orig_get_digest(POM % "a2"), digest)
+        self.assertEqual([POM % "a1", POM % "a2"], self.digested_poms)
+
+    def test_put(self):
+        cache = pomdigestcache.PomDigestCache(self.cache_dir)
+        cache.put(POM % "a1", "digest1")
+        cache.save()
+
+        cache = pomdigestcache.PomDigestCache(self.cache_dir)
+
+        self.assertEqual("digest1", cache.get_digest(POM % "a1"))
+        self.assertEqual([], self.digested_poms)
+
+    def test_load(self):
+        cache = pomdigestcache.PomDigestCache(self.cache_dir)
+        cache.put(POM % "a1", "digest1")
+        cache.save()
+        cache = pomdigestcache.PomDigestCache(self.cache_dir)
+
+        cache.load()
+        # the cache file is not read again
+        os.remove(cache.cache_file_path)
+
+        self.assertEqual("digest1", cache.get_digest(POM % "a1"))
+
+    def test_save__unchanged_cache_is_not_written(self):
+        cache = pomdigestcache.PomDigestCache(self.cache_dir)
+        cache.get_digest(POM % "a1")
+        cache.save()
+        os.utime(cache.cache_file_path, (0, 0))
+
+        cache = pomdigestcache.PomDigestCache(self.cache_dir)
+        cache.get_digest(POM % "a1")
+        cache.save()
+
+        self.assertEqual(0, os.stat(cache.cache_file_path).st_mtime)
+
+    def test_save__least_recently_used_digests_are_evicted(self):
+        cache = pomdigestcache.PomDigestCache(self.cache_dir, max_entries=2)
+        cache.put(POM % "a1", "digest1")
+        cache.put(POM % "a2", "digest2")
+        cache.put(POM % "a3", "digest3")
+        cache.get_digest(POM % "a1")
+        cache.save()
+
+        cache = pomdigestcache.PomDigestCache(self.cache_dir)
+
+        self.assertEqual("digest1", cache.get_digest(POM % "a1"))
+        self.assertEqual("digest3", cache.get_digest(POM % "a3"))
+        self.assertEqual(self.orig_get_digest(POM % "a2"), cache.get_digest(POM % "a2"))
+
+    def test_format_version_change_invalidates_cache(self):
+        cache = pomdigestcache.PomDigestCache(self.cache_dir)
+        cache.put(POM % "a1", "digest1")
+        cache.save()
+        orig_version = pomdigestcache.CACHE_FORMAT_VERSION
+        try:
+            pomdigestcache.CACHE_FORMAT_VERSION = "0"
+            cache = pomdigestcache.PomDigestCache(self.cache_dir)
+
+            self.assertEqual(self.orig_get_digest(POM % "a1"), cache.get_digest(POM % "a1"))
+        finally:
+            pomdigestcache.CACHE_FORMAT_VERSION = orig_version
+
+    def test_corrupt_cache_file_is_ignored(self):
+        cache = pomdigestcache.PomDigestCache(self.cache_dir)
+        os.makedirs(self.cache_dir)
+        with open(cache.cache_file_path, "wb") as f:
+            f.write(b"not a pickle")
+
+        self.assertEqual(self.orig_get_digest(POM % "a1"), cache.get_digest(POM % "a1"))
+
+    def test_get_pom_digest_cache__disabled(self):
+        cache = pomdigestcache.get_pom_digest_cache("/repo", ".pomgen/crawl",
+                                                    enabled=False)
+
+        self.assertIs(pomdigestcache.NOOP, cache)
+        self.assertEqual(self.orig_get_digest(POM % "a1"), cache.get_digest(POM % "a1"))
+
+    def test_get_pom_digest_cache__relative_cache_dir(self):
+        cache = pomdigestcache.get_pom_digest_cache("/repo", ".pomgen/crawl")
+
+        self.assertEqual("/repo/.pomgen/crawl", cache.cache_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -145,6 +145,125 @@ class PomParserTest(unittest.TestCase):
         self.assertNotEqual(pomparser.format_for_comparison(pom1), pomparser.format_for_comparison(pom2))
 
 
+    def test_get_digest_for_comparison__similar_poms(self):
+        """
+        Comments, whitespace and the root <description> element are ignored.
+        """
+        pom1 = """<?xml version="1.0" encoding="UTF-8"?>
+<project xmlns="http://maven.apache.org/POM/4.0.0" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:schemaLocation="http://maven.apache.org/POM/4.0.0 http://maven.apache.org/xsd/maven-4.0.0.xsd">
+    <description>before</description>
+    <dependencies>
+        <dependency>
+            <groupId>net.bytebuddy</groupId>
+            <artifactId>byte-buddy</artifactId>
+            <version>1.7.9</version>
+        </dependency>
+    </dependencies>
+</project>"""
+        pom2 = """<?xml version="1.0" encoding="UTF-8"?>
+<project xmlns="http://maven.apache.org/POM/4.0.0" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:schemaLocation="http://maven.apache.org/POM/4.0.0 http://maven.apache.org/xsd/maven-4.0.0.xsd">
+
+    <description>
+        after
+    </description>
+            <dependencies>
+        <!-- This must be ignored -->
+    <dependency>
+            <groupId>net.bytebuddy</groupId>
+            <artifactId>byte-buddy</artifactId>
+
+            <version>1.7.9</version>
+            <!-- This must be ignored -->
+        </dependency>
+    </dependencies>
+</project>
+        """
+        self.assertEqual(pomparser.format_for_comparison(pom1), pomparser.format_for_comparison(pom2))
+        self.assertEqual(pomparser.get_digest_for_comparison(pom1), pomparser.get_digest_for_comparison(pom2))
+
+    def test_get_digest_for_comparison__different_poms(self):
+        pom = """<?xml version="1.0" encoding="UTF-8"?>
+<project xmlns="http://maven.apache.org/POM/4.0.0">
+    <dependencies>
+        <dependency>
+            <groupId>net.bytebuddy</groupId>
+            <artifactId>byte-buddy</artifactId>
+            <version>%s</version>
+        </dependency>
+    </dependencies>
+</project>"""
+
+        self.assertNotEqual(pomparser.get_digest_for_comparison(pom % "1.7.9"),
+                            pomparser.get_digest_for_comparison(pom % "1.9.7"))
+        self.assertNotEqual(pomparser.get_digest_for_comparison(pom % "1.7.9"),
+                            pomparser.get_digest_for_comparison(pom % " 1.7.9"))
+
+    def test_get_digest_for_comparison__structure(self):
+        """
+        The same text in different elements results in different digests.
+        """
+        pom1 = """<project><a>x</a><b/></project>"""
+        pom2 = """<project><a/><b>x</b></project>"""
+        pom3 = """<project><a><b/>x</a></project>"""
+        pom4 = """<project><a><b>x</b></a></project>"""
+
+        digests = set([pomparser.get_digest_for_comparison(pom) for pom in (pom1, pom2, pom3, pom4)])
+
+        self.assertEqual(4, len(digests))
+
+    def test_get_digest_for_comparison__does_not_ignore_nested_description(self):
+        pom = """<?xml version="1.0" encoding="UTF-8"?>
+<project xmlns="http://maven.apache.org/POM/4.0.0">
+    <dependencies>
+        <description>%s</description>
+    </dependencies>
+</project>"""
+
+        self.assertNotEqual(pomparser.get_digest_for_comparison(pom % "a"),
+                            pomparser.get_digest_for_comparison(pom % "b"))
+
+    def test_get_digest_for_comparison__attribute_order_is_ignored(self):
+        pom1 = """<project><a x="1" y="2"/></project>"""
+        pom2 = """<project><a y="2" x="1"/></project>"""
+        pom3 = """<project><a y="1" x="2"/></project>"""
+
+        self.assertEqual(pomparser.get_digest_for_comparison(pom1), pomparser.get_digest_for_comparison(pom2))
+        self.assertNotEqual(pomparser.get_digest_for_comparison(pom1), pomparser.get_digest_for_comparison(pom3))
+
+    def test_get_digest_for_comparison__text_next_to_comment(self):
+        pom1 = """<project><groupId><!-- c -->g1</groupId></project>"""
+        pom2 = """<project><groupId><!-- c -->g2</groupId></project>"""
+
+        self.assertNotEqual(pomparser.get_digest_for_comparison(pom1), pomparser.get_digest_for_comparison(pom2))
+
+    def test_format_for_comparison__consistent_with_digest(self):
+        """
+        Poms are formatted to the same string if and only if they have the
+        same digest.
+        """
+        pom = """<project xmlns="http://maven.apache.org/POM/4.0.0">%s</project>"""
+        similar_poms = (
+            ("<version>1.0<!-- x -->-SNAPSHOT</version>", "<version>1.0-SNAPSHOT</version>"),
+            ("<version>1.0<?pi x?>-SNAPSHOT</version>", "<version>1.0-SNAPSHOT</version>"),
+            ("""<a x="1" y="2"/>""", """<a y="2" x="1"/>"""),
+            ("<a/>", "<a></a>"),
+        )
+        different_poms = (
+            ("<version>1.0<!-- x -->-SNAPSHOT</version>", "<version>1.0</version>"),
+            ("""<a x="1" y="2"/>""", """<a y="1" x="2"/>"""),
+            ("<a>x</a>", "<a> x</a>"),
+        )
+
+        for content1, content2 in similar_poms:
+            pom1, pom2 = pom % content1, pom % content2
+            self.assertEqual(pomparser.format_for_comparison(pom1), pomparser.format_for_comparison(pom2))
+            self.assertEqual(pomparser.get_digest_for_comparison(pom1), pomparser.get_digest_for_comparison(pom2))
+        for content1, content2 in different_poms:
+            pom1, pom2 = pom % content1, pom % content2
+            self.assertNotEqual(pomparser.format_for_comparison(pom1), pomparser.format_for_comparison(pom2))
+            self.assertNotEqual(pomparser.get_digest_for_comparison(pom1), pomparser.get_digest_for_comparison(pom2))
+
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -0,0 +1,84 @@
+"""
+Copyright (c) 2025, salesforce.com, inc.
+All rights reserved.
+SPDX-License-Identifier: BSD-3-Clause
+For full license text, see the LICENSE file in the repo root or https://opensource.org/licenses/BSD-3-Clause
+"""
+
+from crawl import pomtemplate
+import unittest
+
+
+class PomTemplateTest(unittest.TestCase):
+
+    def test_render(self):
+        template = pomtemplate.PomTemplate("<a>#{a}</a><b>#{b}</b><a>#{a}</a>")
+
+        content = template.render({"a": "1", "b": "2"})
+
+        self.assertEqual("<a>1</a><b>2</b><a>1</a>", content)
+
+    def test_render__no_placeholders(self):
+        template = pomtemplate.PomTemplate("<a>1</a>")
+
+        self.assertEqual("<a>1</a>", template.render({"a": "2"}))
+
+    def test_render__values_are_not_rendered(self):
+        template = pomtemplate.PomTemplate("#{a}")
+
+        self.assertEqual("#{b}", template.render({"a": "#{b}", "b": "2"}))
+
+    def test_render__missing_value(self):
+        template = pomtemplate.PomTemplate("<a>#{a}</a><b>#{b}</b>")
+
+        self.assertEqual("<a>1</a><b>#{b}</b>", template.render({"a": "1"}))
+
+    def test_render__remove_line(self):
+        template = pomtemplate.PomTemplate("""<project>
+    #{a}
+    #{b}
+</project>
+""")
+
+        content = template.render({"a": pomtemplate.REMOVE_LINE, "b": "2"})
+
+        self.assertEqual("""<project>
+        2
+</project>
+""", content)
+
+    def test_render__remove_line__only_first_occurrence(self):
+        template = pomtemplate.PomTemplate("""#{a} the rest of the line
+#{a}
+""")
+
+        content = template.render({"a": pomtemplate.REMOVE_LINE})
+
+        self.assertEqual("#{a}\n", content)
+
+    def test_render__remove_line__last_line(self):
+        template = pomtemplate.PomTemplate("<a/>\n#{a} #{b}")
+
+        content = template.render({"a": pomtemplate.REMOVE_LINE, "b": "2"})
+
+        self.assertEqual("<a/>\n", content)
+
+    def test_placeholders(self):
+        template = pomtemplate.PomTemplate("#{a} #{@maven//:guava.version} #{a}")
+
+        self.assertEqual(("a", "@maven//:guava.version", "a"), template.placeholders)
+
+    def test_get_unresolved_placeholders(self):
+        template = pomtemplate.PomTemplate("#{a} #{b} #{c} #{b}")
+
+        self.assertEqual(["b", "b"], template.get_unresolved_placeholders({"a": "1", "c": "3"}))
+
+    def test_get_template__cached_by_content(self):
+        template = pomtemplate.get_template("#{a}")
+
+        self.assertIs(template, pomtemplate.get_template("#{a}"))
+        self.assertIsNot(template, pomtemplate.get_template("#{b}"))
+
+
+if __name__ == '__main__':
+    unittest.main()
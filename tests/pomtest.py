@@ -283,8 +283,10 @@ class PomTest(unittest.TestCase):
         dep_art_def = buildpom.MavenArtifactDef("class-group", "class-art", "1", bazel_target="g1")
         dep = dependency.new_dep_from_maven_artifact_def(dep_art_def)
 
-        dep_element, _ = pomgen._gen_dependency_element(
-            pom.PomContentType.RELEASE, dep, "", indent=0, close_element=True)
+        writer = pom.XmlWriter(indent=0)
+        pomgen._gen_dependency_element(
+            pom.PomContentType.RELEASE, dep, writer, close_element=True)
+        dep_element = writer.get_content()
         
         self.assertIn("""<dependency>
     <groupId>class-group</groupId>
@@ -376,6 +378,56 @@ monorepo artifact version #{version}
         self.assertIn("qualified 1.2.3", generated_pom)
         self.assertIn("monorepo artifact version 1.4.4", generated_pom)
 
+    def test_template_var_sub__external_versions_computed_once(self):
+        """
+        The version properties of external dependencies are shared by all
+        template artifacts of a workspace.
+        """
+        depmd = dependencym.DependencyMetadata(None)
+        ws = workspace.Workspace("some/path",
+                                 self._get_config(),
+                                 self._mocked_mvn_install_info("maven"),
+                                 pomcontent.NOOP,
+                                 depmd,
+                                 label_to_overridden_fq_label={})
+        # called each time the workspace's external dependencies are listed
+        parse_calls = []
+        orig_parse_all_maven_installs = ws._parse_all_maven_installs
+        def parse_all_maven_installs():
+            parse_calls.append(1)
+            orig_parse_all_maven_installs()
+        ws._parse_all_maven_installs = parse_all_maven_installs
+        generated_poms = []
+        for artifact_id, version in (("a1", "1.0.0"), ("a2", "2.0.0")):
+            artifact_def = buildpom.MavenArtifactDef("g1", artifact_id, version, bazel_target="t1")
+            artifact_def.custom_pom_template_content = "#{artifact_id} #{version} #{@maven//:ch_qos_logback_logback_classic.version}"
+            pomgen = pom.TemplatePomGen(ws, artifact_def)
+            for pomcontenttype in (pom.PomContentType.RELEASE, pom.PomContentType.GOLDFILE):
+                generated_poms.append(pomgen.gen(pomcontenttype))
+
+        self.assertEqual(["a1 1.0.0 1.2.3", "a1 *** 1.2.3",
+                          "a2 2.0.0 1.2.3", "a2 *** 1.2.3"], generated_poms)
+        self.assertEqual(1, len(parse_calls))
+
+    def test_overlay_dict(self):
+        base = {"a": 1, "b": 2}
+        d = pom._OverlayDict(base)
+
+        d["c"] = 3
+        d["a"] = 10
+        del d["b"]
+
+        self.assertEqual({"a": 10, "c": 3}, dict(d))
+        self.assertNotIn("b", d)
+        self.assertIsNone(d.get("b"))
+        self.assertEqual(2, len(d))
+        # the base mapping is not changed
+        self.assertEqual({"a": 1, "b": 2}, base)
+        with self.assertRaises(KeyError):
+            del d["b"]
+        d["b"] = 20
+        self.assertEqual(20, d["b"])
+
     def test_template_var_sub__monorepo_deps(self):
         """
         Verifies references of source dependency versions in a pom template.
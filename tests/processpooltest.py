@@ -0,0 +1,67 @@
+"""
+Copyright (c) 2025, salesforce.com, inc.
+All rights reserved.
+SPDX-License-Identifier: BSD-3-Clause
+For full license text, see the LICENSE file in the repo root or https://opensource.org/licenses/BSD-3-Clause
+"""
+
+from common import processpool
+import os
+import threading
+import unittest
+
+
+class ProcessPoolTest(unittest.TestCase):
+
+    def test_parallel_map__serial(self):
+        results = processpool.parallel_map(lambda i: (i * 2, os.getpid()), range(10), jobs=1)
+
+        self.assertEqual([i * 2 for i in range(10)], [r[0] for r in results])
+        self.assertEqual({os.getpid()}, set(r[1] for r in results))
+
+    def test_parallel_map__concurrent(self):
+        results = processpool.parallel_map(lambda i: (i * 2, os.getpid()), range(100), jobs=4)
+
+        # the results are in the order of the items
+        self.assertEqual([i * 2 for i in range(100)], [r[0] for r in results])
+        self.assertNotIn(os.getpid(), set(r[1] for r in results))
+
+    def test_parallel_map__items_state_is_inherited(self):
+        # the items do not need to be picklable
+        items = [lambda i=i: i for i in range(20)]
+
+        results = processpool.parallel_map(lambda item: item(), items, jobs=3)
+
+        self.assertEqual(list(range(20)), results)
+
+    def test_parallel_map__concurrent_calls(self):
+        results = {}
+        def run(name, function):
+            results[name] = processpool.parallel_map(function, range(50), jobs=2)
+        threads = [threading.Thread(target=run, args=("double", lambda i: i * 2)),
+                   threading.Thread(target=run, args=("negate", lambda i: -i))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([i * 2 for i in range(50)], results["double"])
+        self.assertEqual([-i for i in range(50)], results["negate"])
+
+    def test_parallel_map__no_items(self):
+        self.assertEqual([], processpool.parallel_map(lambda i: i, [], jobs=4))
+
+    def test_parallel_map__exception_is_raised(self):
+        def fail_on_3(i):
+            if i == 3:
+                raise Exception("failed on %i" % i)
+            return i
+
+        with self.assertRaises(Exception) as ctx:
+            processpool.parallel_map(fail_on_3, range(10), jobs=2)
+
+        self.assertIn("failed on 3", str(ctx.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
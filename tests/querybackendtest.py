@@ -0,0 +1,189 @@
+"""
+Copyright (c) 2025, salesforce.com, inc.
+All rights reserved.
+SPDX-License-Identifier: BSD-3-Clause
+For full license text, see the LICENSE file in the repo root or https://opensource.org/licenses/BSD-3-Clause
+"""
+
+from crawl import querybackend
+import os
+import tempfile
+import unittest
+
+
+class QueryBackendTest(unittest.TestCase):
+
+    def setUp(self):
+        self.repo_root_path = tempfile.mkdtemp("monorepo")
+        self.fallback_backend = _RecordingQueryBackend()
+        self.backend = querybackend.OfflineQueryBackend(
+            self.repo_root_path, self.fallback_backend)
+
+    def test_offline__deps_and_runtime_deps(self):
+        self._write_build_file("a/b", """
+load("@rules_java//java:defs.bzl", "java_library")
+
+java_library(
+    name = "b",
+    srcs = glob(["src/main/java/**/*.java"]),
+    deps = [
+        ":private",
+        "//c/d",
+        "@maven//:com_google_guava_guava",
+    ],
+    runtime_deps = ["//e:foo", "//c/d"],
+)
+""")
+
+        deps = self.backend.query_deps_attributes({"//a/b": ("deps", "runtime_deps")})
+
+        self.assertEqual({"//a/b": ["//a/b:private", "//c/d:d",
+                                    "@maven//:com_google_guava_guava",
+                                    "//e:foo"]}, deps)
+        self.assertEqual([], self.fallback_backend.queried_target_patterns)
+
+    def test_offline__variables_concatenation_and_select(self):
+        self._write_build_file("a", """
+COMMON_DEPS = ["//common"]
+
+java_library(
+    name = "a",
+    deps = COMMON_DEPS + select({
+        "//conditions:linux": ["//linux"],
+        "//conditions:default": [],
+    }),
+)
+""")
+
+        deps = self.backend.query_deps_attributes({"//a": ("deps",)})
+
+        self.assertEqual({"//a": ["//common:common", "//linux:linux"]}, deps)
+
+    def test_offline__macro_falls_back(self):
+        self._write_build_file("a", """
+load("//tools:macros.bzl", "my_java_library")
+
+my_java_library(
+    name = "a",
+    deps = ["//b"],
+)
+
+java_library(
+    name = "c",
+    deps = ["//d"],
+)
+""")
+
+        deps = self.backend.query_deps_attributes({"//a": ("deps",),
+                                                   "//a:c": ("deps",)})
+
+        self.assertEqual({"//a": ["//fallback"], "//a:c": ["//d:d"]}, deps)
+        self.assertEqual(["//a"], self.fallback_backend.queried_target_patterns)
+
+    def test_offline__rule_name_loaded_from_macro_file_falls_back(self):
+        self._write_build_file("a", """
+load("//tools:macros.bzl", "java_library")
+load("@rules_java//java:defs.bzl", jl = "java_library")
+
+java_library(
+    name = "a",
+    deps = ["//b"],
+)
+
+jl(
+    name = "c",
+    deps = ["//d"],
+)
+""")
+
+        deps = self.backend.query_deps_attributes({"//a": ("deps",),
+                                                   "//a:c": ("deps",)})
+
+        self.assertEqual({"//a": ["//fallback"], "//a:c": ["//d:d"]}, deps)
+        self.assertEqual(["//a"], self.fallback_backend.queried_target_patterns)
+
+    def test_offline__rule_name_loaded_under_alias_falls_back(self):
+        self._write_build_file("a", """
+load("//tools:macros.bzl", java_library = "my_java_library")
+
+java_library(
+    name = "a",
+    deps = ["//b"],
+)
+""")
+
+        deps = self.backend.query_deps_attributes({"//a": ("deps",)})
+
+        self.assertEqual({"//a": ["//fallback"]}, deps)
+
+    def test_offline__unknown_value_falls_back(self):
+        self._write_build_file("a", """
+java_library(
+    name = "a",
+    deps = some_function(),
+)
+""")
+
+        deps = self.backend.query_deps_attributes({"//a": ("deps",)})
+
+        self.assertEqual({"//a": ["//fallback"]}, deps)
+
+    def test_offline__missing_build_file_falls_back(self):
+        deps = self.backend.query_deps_attributes({"//a": ("deps",)})
+
+        self.assertEqual({"//a": ["//fallback"]}, deps)
+
+    def test_offline__never_link(self):
+        self._write_build_file("lombok", """
+java_library(
+    name = "lombok",
+    neverlink = 1,
+)
+
+java_library(
+    name = "not_neverlink",
+)
+""")
+
+        never_link_labels = self.backend.query_never_link_labels(
+            ["//lombok", "//lombok:not_neverlink", "//lombok:macro"])
+
+        self.assertEqual(set(["//lombok", "//fallback"]), never_link_labels)
+        self.assertEqual(["//lombok:macro"], self.fallback_backend.queried_labels)
+
+    def test_get_query_backend(self):
+        self.assertIsInstance(
+            querybackend.get_query_backend("query", self.repo_root_path),
+            querybackend.SubprocessQueryBackend)
+        self.assertIsInstance(
+            querybackend.get_query_backend("batch_query", self.repo_root_path),
+            querybackend.BatchQueryBackend)
+        self.assertIsInstance(
+            querybackend.get_query_backend("offline", self.repo_root_path),
+            querybackend.OfflineQueryBackend)
+
+    def _write_build_file(self, package_path, content):
+        path = os.path.join(self.repo_root_path, package_path)
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "BUILD"), "w") as f:
+            f.write(content)
+
+
+class _RecordingQueryBackend(querybackend.AbstractQueryBackend):
+
+    def __init__(self):
+        super(_RecordingQueryBackend, self).__init__("")
+        self.queried_target_patterns = []
+        self.queried_labels = []
+
+    def query_deps_attributes(self, target_pattern_to_dep_attributes):
+        self.queried_target_patterns += target_pattern_to_dep_attributes.keys()
+        return {t: ["//fallback"] for t in target_pattern_to_dep_attributes.keys()}
+
+    def query_never_link_labels(self, labels):
+        self.queried_labels += labels
+        return set(["//fallback"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+Copyright (c) 2025, salesforce.com, inc.
+All rights reserved.
+SPDX-License-Identifier: BSD-3-Clause
+For full license text, see the LICENSE file in the repo root or https://opensource.org/licenses/BSD-3-Clause
+"""
+
+from common import label
+from crawl import querycache
+import os
+import tempfile
+import time
+import unittest
+
+
+class QueryCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.repo_root_path = tempfile.mkdtemp("monorepo")
+        self.cache_dir = tempfile.mkdtemp("querycache")
+        self._write_file("a/b/BUILD", "java_library(name = 'b')")
+
+    def test_get__miss(self):
+        cache = querycache.QueryCache(self.repo_root_path, self.cache_dir)
+
+        self.assertIsNone(cache.get(label.Label("//a/b"), ("deps",)))
+
+    def test_put_and_get(self):
+        cache = querycache.QueryCache(self.repo_root_path, self.cache_dir)
+        cache.put(label.Label("//a/b"), ("deps",), ["//c", "@maven//:guava"])
+
+        # a new instance to make sure the result is read from disk
+        cache = querycache.QueryCache(self.repo_root_path, self.cache_dir)
+
+        self.assertEqual(["//c", "@maven//:guava"],
+                         cache.get(label.Label("//a/b"), ("deps",)))
+        self.assertIsNone(cache.get(label.Label("//a/b"), ("deps", "runtime_deps")))
+        self.assertIsNone(cache.get(label.Label("//a/b:foo"), ("deps",)))
+
+    def test_build_file_change_invalidates_entry(self):
+        cache = querycache.QueryCache(self.repo_root_path, self.cache_dir)
+        cache.put(label.Label("//a/b"), ("deps",), ["//c"])
+        self._write_file("a/b/BUILD", "java_library(name = 'b', deps = ['//c', '//d'])")
+
+        cache = querycache.QueryCache(self.repo_root_path, self.cache_dir)
+
+        self.assertIsNone(cache.get(label.Label("//a/b"), ("deps",)))
+
+    def test_loaded_bzl_file_change_invalidates_entry(self):
+        self._write_file("a/b/BUILD", """
+load("//tools:defs.bzl", "lib")
+lib(name = "b")
+""")
+        self._write_file("tools/defs.bzl", """
+load(":more_defs.bzl", "more")
+""")
+        self._write_file("tools/more_defs.bzl", "def more(): pass")
+        cache = querycache.QueryCache(self.repo_root_path, self.cache_dir)
+        cache.put(label.Label("//a/b"), ("deps",), ["//c"])
+        cache = querycache.QueryCache(self.repo_root_path, self.cache_dir)
+        self.assertEqual(["//c"], cache.get(label.Label("//a/b"), ("deps",)))
+        self._write_file("tools/more_defs.bzl", "def more(): return 1")
+
+        cache = querycache.QueryCache(self.repo_root_path, self.cache_dir)
+
+        self.assertIsNone(cache.get(label.Label("//a/b"), ("deps",)))
+
+    def test_lru_eviction(self):
+        labels = [label.Label("//p%i" % i) for i in range(11)]
+        for lbl in labels:
+            self._write_file("%s/BUILD" % lbl.package_path, "")
+        cache = querycache.QueryCache(self.repo_root_path, self.cache_dir,
+                                      max_entries=10)
+        for i, lbl in enumerate(labels[:10]):
+            cache.put(lbl, ("deps",), ["//dep%i" % i])
+            mtime = time.time() - 100 + i
+            os.utime(cache._get_entry_path(lbl, ("deps",)), (mtime, mtime))
+        # make p0 the most recently used entry
+        cache.get(labels[0], ("deps",))
+
+        # the cache is full - this evicts entries until 90% are left
+        cache.put(labels[10], ("deps",), ["//dep10"])
+
+        self.assertEqual(9, len(os.listdir(self.cache_dir)))
+        self.assertEqual(["//dep0"], cache.get(labels[0], ("deps",)))
+        self.assertIsNone(cache.get(labels[1], ("deps",)))
+        self.assertIsNone(cache.get(labels[2], ("deps",)))
+        self.assertEqual(["//dep3"], cache.get(labels[3], ("deps",)))
+        self.assertEqual(["//dep10"], cache.get(labels[10], ("deps",)))
+
+    def test_dependency_discovery_mode_is_part_of_key(self):
+        cache = querycache.QueryCache(self.repo_root_path, self.cache_dir,
+                                      dependency_discovery_mode="query")
+        cache.put(label.Label("//a/b"), ("deps",), ["//d", "//c"])
+
+        cache = querycache.QueryCache(self.repo_root_path, self.cache_dir,
+                                      dependency_discovery_mode="offline")
+
+        self.assertIsNone(cache.get(label.Label("//a/b"), ("deps",)))
+        cache.put(label.Label("//a/b"), ("deps",), ["//c", "//d"])
+        cache = querycache.QueryCache(self.repo_root_path, self.cache_dir,
+                                      dependency_discovery_mode="query")
+        self.assertEqual(["//d", "//c"], cache.get(label.Label("//a/b"), ("deps",)))
+
+    def test_get_query_cache(self):
+        self.assertIs(querycache.NOOP,
+                      querycache.get_query_cache(self.repo_root_path, None))
+        self.assertIs(querycache.NOOP,
+                      querycache.get_query_cache(self.repo_root_path, "cache",
+                                                 enabled=False))
+        cache = querycache.get_query_cache(self.repo_root_path, "cache")
+        self.assertEqual(os.path.join(self.repo_root_path, "cache"),
+                         cache.cache_dir)
+        cache = querycache.get_query_cache(self.repo_root_path, "cache", "batch_query")
+        self.assertEqual("batch_query", cache.dependency_discovery_mode)
+
+    def _write_file(self, rel_path, content):
+        path = os.path.join(self.repo_root_path, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+Copyright (c) 2025, salesforce.com, inc.
+All rights reserved.
+SPDX-License-Identifier: BSD-3-Clause
+For full license text, see the LICENSE file in the repo root or https://opensource.org/licenses/BSD-3-Clause
+"""
+
+from common import mdfiles
+from common import repoindex
+import os
+import tempfile
+import unittest
+
+
+class RepositoryIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.repo_root_path = tempfile.mkdtemp("monorepo")
+        self._add_md_file("libs/a", mdfiles.LIB_ROOT_FILE_NAME)
+        self._add_md_file("libs/a/a1", mdfiles.BUILD_POM_FILE_NAME)
+        self._add_md_file("libs/a/a2", mdfiles.BUILD_POM_FILE_NAME)
+        self._add_md_file("libs/b", mdfiles.LIB_ROOT_FILE_NAME)
+        self._add_md_file("libs/b", mdfiles.BUILD_POM_FILE_NAME)
+
+    def test_get_artifact_packages(self):
+        index = repoindex.RepositoryIndex(self.repo_root_path)
+
+        self.assertEqual(["libs/a/a1", "libs/a/a2", "libs/b"],
+                         sorted(index.get_artifact_packages("libs")))
+        self.assertEqual(["libs/a/a1", "libs/a/a2"],
+                         sorted(index.get_artifact_packages("libs/a")))
+        self.assertEqual(["libs/b"], index.get_artifact_packages("libs/b"))
+        self.assertEqual([], index.get_artifact_packages("libs/c"))
+
+    def test_get_artifact_packages__same_order_as_os_walk(self):
+        for i in range(20):
+            self._add_md_file("libs/l%i/nested" % i, mdfiles.BUILD_POM_FILE_NAME)
+            self._add_md_file("libs/l%i" % i, mdfiles.BUILD_POM_FILE_NAME)
+        expected_packages = []
+        for rootdir, _, _ in os.walk(self.repo_root_path):
+            if mdfiles.is_artifact_package(rootdir):
+                expected_packages.append(os.path.relpath(rootdir, self.repo_root_path))
+        index = repoindex.RepositoryIndex(self.repo_root_path)
+
+        self.assertEqual(expected_packages, index.get_artifact_packages(""))
+
+    def test_get_artifact_packages__subtree_answered_from_index(self):
+        index = repoindex.RepositoryIndex(self.repo_root_path)
+        index.get_artifact_packages("libs")
+        # not seen by the index, the subtree has already been indexed
+        self._add_md_file("libs/a/a3", mdfiles.BUILD_POM_FILE_NAME)
+
+        self.assertEqual(["libs/a/a1", "libs/a/a2"],
+                         sorted(index.get_artifact_packages("libs/a")))
+
+    def test_get_artifact_packages__parent_of_indexed_path(self):
+        self._add_md_file("", mdfiles.BUILD_POM_FILE_NAME)
+        self._add_md_file("other", mdfiles.BUILD_POM_FILE_NAME)
+        index = repoindex.RepositoryIndex(self.repo_root_path)
+        index.get_artifact_packages("libs/a")
+
+        self.assertEqual([".", "libs/a/a1", "libs/a/a2", "libs/b", "other"],
+                         sorted(index.get_artifact_packages(".")))
+
+    def test_pruned_directories(self):
+        self._add_md_file("node_modules/foo", mdfiles.BUILD_POM_FILE_NAME)
+        self._add_md_file(".git/foo", mdfiles.BUILD_POM_FILE_NAME)
+        self._add_md_file("bazel-out/foo", mdfiles.BUILD_POM_FILE_NAME)
+        index = repoindex.RepositoryIndex(self.repo_root_path)
+
+        self.assertEqual(["libs/a/a1", "libs/a/a2", "libs/b"],
+                         sorted(index.get_artifact_packages("")))
+
+    def test_is_library_package(self):
+        index = repoindex.RepositoryIndex(self.repo_root_path)
+        # not indexed yet
+        self.assertTrue(index.is_library_package("libs/a"))
+        index.get_artifact_packages("libs")
+
+        self.assertTrue(index.is_library_package("libs/a"))
+        self.assertTrue(index.is_library_package("libs/b"))
+        self.assertFalse(index.is_library_package("libs/a/a1"))
+        self.assertFalse(index.is_library_package("libs"))
+
+    def test_get_repository_index(self):
+        index = repoindex.get_repository_index(self.repo_root_path)
+
+        self.assertIs(index, repoindex.get_repository_index(self.repo_root_path))
+        repoindex.clear()
+        self.assertIsNot(index, repoindex.get_repository_index(self.repo_root_path))
+
+    def _add_md_file(self, package_path, md_file_name):
+        md_dir_path = os.path.join(self.repo_root_path, package_path, mdfiles.MD_DIR_NAME)
+        os.makedirs(md_dir_path, exist_ok=True)
+        with open(os.path.join(md_dir_path, md_file_name), "w") as f:
+            f.write("")
+
+
+if __name__ == '__main__':
+    unittest.main()
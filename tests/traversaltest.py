@@ -0,0 +1,139 @@
+"""
+Copyright (c) 2025, salesforce.com, inc.
+All rights reserved.
+SPDX-License-Identifier: BSD-3-Clause
+For full license text, see the LICENSE file in the repo root or https://opensource.org/licenses/BSD-3-Clause
+"""
+
+from crawl import traversal
+import unittest
+
+
+class TraversalTest(unittest.TestCase):
+
+    def test_walk__pre_and_post_order(self):
+        """
+        a -> (b -> d, c)
+        """
+        graph = {"a": ["b", "c"], "b": ["d"], "c": [], "d": []}
+        visits = []
+
+        traversal.walk(["a"], graph.__getitem__,
+                       pre_visit=lambda n, p, ctx: visits.append("pre %s" % n),
+                       post_visit=lambda n, p, ctx: visits.append("post %s" % n))
+
+        self.assertEqual(["pre a", "pre b", "pre d", "post d", "post b",
+                          "pre c", "post c", "post a"], visits)
+
+    def test_walk__context(self):
+        graph = {"a": ["b"], "b": ["c"], "c": []}
+        node_to_depth = {}
+
+        def pre_visit(node, parent, parent_depth):
+            depth = 0 if parent is None else parent_depth + 1
+            node_to_depth[node] = depth
+            return depth
+
+        traversal.walk(["a"], graph.__getitem__, pre_visit)
+
+        self.assertEqual({"a": 0, "b": 1, "c": 2}, node_to_depth)
+
+    def test_walk__memoize(self):
+        """
+        a -> (b -> d, c -> d)
+        """
+        graph = {"a": ["b", "c"], "b": ["d"], "c": ["d"], "d": []}
+        visited = []
+        revisited = []
+
+        traversal.walk(["a"], graph.__getitem__,
+                       pre_visit=lambda n, p, ctx: visited.append(n),
+                       revisit=lambda n, p, ctx: revisited.append((p, n)))
+
+        self.assertEqual(["a", "b", "d", "c"], visited)
+        self.assertEqual([("c", "d")], revisited)
+
+    def test_walk__memoize_across_roots(self):
+        graph = {"a": ["c"], "b": ["c"], "c": []}
+        visited = []
+
+        traversal.walk(["a", "b"], graph.__getitem__,
+                       pre_visit=lambda n, p, ctx: visited.append(n))
+
+        self.assertEqual(["a", "c", "b"], visited)
+
+    def test_walk__no_memoize(self):
+        graph = {"a": ["b", "c"], "b": ["d"], "c": ["d"], "d": []}
+        visited = []
+
+        traversal.walk(["a"], graph.__getitem__,
+                       pre_visit=lambda n, p, ctx: visited.append(n),
+                       memoize=False)
+
+        self.assertEqual(["a", "b", "d", "c", "d"], visited)
+
+    def test_walk__skip(self):
+        graph = {"a": ["b", "c"], "b": ["d"], "c": [], "d": []}
+        visited = []
+
+        def pre_visit(node, parent, parent_context):
+            visited.append(node)
+            return traversal.SKIP if node == "b" else None
+
+        post_visited = []
+        traversal.walk(["a"], graph.__getitem__, pre_visit,
+                       post_visit=lambda n, p, ctx: post_visited.append(n))
+
+        self.assertEqual(["a", "b", "c"], visited)
+        self.assertEqual(["c", "a"], post_visited)
+
+    def test_walk__cycle(self):
+        graph = {"a": ["b"], "b": ["c"], "c": ["a"]}
+
+        with self.assertRaises(Exception) as ctx:
+            traversal.walk(["a"], graph.__getitem__)
+
+        self.assertIn("Found a dependency cycle: a -> b -> c -> a", str(ctx.exception))
+
+    def test_walk__on_cycle(self):
+        graph = {"a": ["b"], "b": ["c"], "c": ["b"]}
+        cycles = []
+
+        traversal.walk(["a"], graph.__getitem__,
+                       on_cycle=lambda n, p, ctx, cycle: cycles.append(cycle))
+
+        self.assertEqual([["b", "c", "b"]], cycles)
+
+    def test_walk__deep_graph(self):
+        """
+        A chain of nodes that is much longer than Python's recursion limit.
+        """
+        depth = 10000
+        visited = []
+
+        traversal.walk([0], lambda n: [n + 1] if n < depth else [],
+                       post_visit=lambda n, p, ctx: visited.append(n))
+
+        self.assertEqual(list(range(depth, -1, -1)), visited)
+
+    def test_get_strongly_connected_components(self):
+        """
+        a -> b -> (c -> b, d)
+        """
+        graph = {"a": ["b"], "b": ["c", "d"], "c": ["b"], "d": []}
+
+        components = traversal.get_strongly_connected_components(["a"], graph.__getitem__)
+
+        self.assertEqual([["d"], ["c", "b"], ["a"]], components)
+
+    def test_get_strongly_connected_components__deep_graph(self):
+        depth = 10000
+
+        components = traversal.get_strongly_connected_components(
+            [0], lambda n: [n + 1] if n < depth else [])
+
+        self.assertEqual([[n] for n in range(depth, -1, -1)], components)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,6 +6,7 @@ For full license text, see the LICENSE file in the repo root or https://opensour
 """
 
 from common.os_util import run_cmd
+from common import label
 from common import maveninstallinfo
 from config import config
 from config import exclusions
@@ -74,6 +75,78 @@ class WorkspaceTest(unittest.TestCase):
         self.assertIn("json files have been registered", str(ctx.exception))
         self.assertIn("maven_install_paths in the pomgen config file", str(ctx.exception))
 
+    def test_maven_install_is_parsed_lazily(self):
+        """
+        Verifies that only the maven_install rule referenced by a label is
+        parsed, and only once it is needed.
+        """
+        f = dependency.new_dep_from_maven_art_str
+        name_to_result = {
+            "maven": [(f("com.google.guava:guava:23.0", "maven"), [],)],
+            "maven2": [(f("ch.qos.logback:logback-classic:1.2.3", "maven2"), [],)],
+        }
+        parsed_names = []
+        def parse_maven_install(names_and_paths, overrides, verbose):
+            names = [n for n, _ in names_and_paths]
+            parsed_names.append(names)
+            return [dt for n in names for dt in name_to_result[n]]
+        bazel.parse_maven_install = parse_maven_install
+        ws = workspace.Workspace("some/path",
+                                 self._get_config(),
+                                 maven_install_info=self._mocked_mvn_install_info("maven", "maven2"),
+                                 pom_content=pomcontent.NOOP,
+                                 dependency_metadata=dependencym.DependencyMetadata(None),
+                                 label_to_overridden_fq_label={})
+        self.assertEqual([], parsed_names)
+
+        deps = ws.parse_dep_labels(["@maven2//:ch_qos_logback_logback_classic"])
+        self.assertEqual("logback-classic", deps[0].artifact_id)
+        self.assertEqual([["maven2"]], parsed_names)
+
+        ws.parse_dep_labels(["@maven2//:ch_qos_logback_logback_classic"])
+        self.assertEqual([["maven2"]], parsed_names)
+
+        # in maven_install rule order, not in parse order
+        self.assertEqual(["guava", "logback-classic"],
+                         [d.artifact_id for d in ws.external_dependencies])
+        self.assertEqual([["maven2"], ["maven"]], parsed_names)
+
+    def test_maven_install_is_parsed_lazily__overrides(self):
+        """
+        Verifies that the maven_install rules referenced by overrides are
+        parsed together with the requested maven_install rule, and that deps
+        remain singletons.
+        """
+        f = dependency.new_dep_from_maven_art_str
+        guava = ("com.google.guava:guava:23.0", "maven")
+        name_to_result = {
+            "maven": [(guava, [],)],
+            "maven2": [(("ch.qos.logback:logback-classic:1.2.3", "maven2"), [guava],)],
+            "maven3": [(("org.slf4j:slf4j-api:1.7.30", "maven3"), [],)],
+        }
+        parsed_names = []
+        def parse_maven_install(names_and_paths, overrides, verbose):
+            names = [n for n, _ in names_and_paths]
+            parsed_names.append(names)
+            # new dep instances every time, like bazel.parse_maven_install
+            return [(f(*d), [f(*t) for t in ts])
+                    for n in names for d, ts in name_to_result[n]]
+        bazel.parse_maven_install = parse_maven_install
+        ws = workspace.Workspace("some/path",
+                                 self._get_config(),
+                                 maven_install_info=self._mocked_mvn_install_info("maven", "maven2", "maven3"),
+                                 pom_content=pomcontent.NOOP,
+                                 dependency_metadata=dependencym.DependencyMetadata(None),
+                                 label_to_overridden_fq_label={"com_google_guava_guava": "@maven//:com_google_guava_guava"})
+
+        guava_dep = ws.parse_dep_labels(["@maven//:com_google_guava_guava"])[0]
+        logback_dep = ws.parse_dep_labels(["@maven2//:ch_qos_logback_logback_classic"])[0]
+
+        self.assertEqual([["maven"], ["maven", "maven2"]], parsed_names)
+        transitives = ws.get_transitive_closure(logback_dep)
+        self.assertEqual(1, len(transitives))
+        self.assertIs(guava_dep, transitives[0])
+
     def test_excluded_dependency_paths(self):
         """
         Verifies that excluded dependency paths are not added to the list of 
@@ -251,6 +324,42 @@ class WorkspaceTest(unittest.TestCase):
 
         self.assertEqual(1, len(deps))
 
+    def test_src_deps_with_neverlink_enabled__single_query(self):
+        """
+        Verifies that the neverlink attribute of all deps without a BUILD.pom
+        file is checked using a single bazel query.
+        """
+        package_name = "package"
+        repo_root = tempfile.mkdtemp("monorepo")
+        self._touch_file_at_path(repo_root, "", "MVN-INF", "LIBRARY.root")
+        self._write_build_pom(repo_root, package_name, "art1", "group1", "1.2.3")
+        for never_link_package_name in ("lombok", "autovalue"):
+            self._write_build_file(repo_root, never_link_package_name, True)
+        depmd = dependencym.DependencyMetadata(None)
+        ws = workspace.Workspace(repo_root,
+                                 self._get_config(),
+                                 maveninstallinfo.NOOP,
+                                 pom_content=pomcontent.NOOP,
+                                 dependency_metadata=depmd,
+                                 label_to_overridden_fq_label={})
+        queried_labels = []
+        def query(repo_root_path, labels, verbose):
+            queried_labels.append(labels)
+            return set(["//lombok", "//autovalue"])
+        orig_query = bazel.query_never_link_labels
+        bazel.query_never_link_labels = query
+        try:
+            deps = ws.parse_dep_labels(["//%s" % package_name,
+                                        "//lombok:lombok",
+                                        "//autovalue:autovalue",
+                                        "//lombok"])
+            self.assertTrue(ws.is_never_link_label(label.Label("//lombok:lombok")))
+        finally:
+            bazel.query_never_link_labels = orig_query
+
+        self.assertEqual(1, len(deps))
+        self.assertEqual([["//lombok", "//autovalue"]], queried_labels)
+
     def test_parse_invalid_dep(self):
         """
         Verifies that parsing of an invalid label behaves as expected.
@@ -403,9 +512,9 @@ released_maven_artifact(
         with open(os.path.join(path, "BUILD.pom.released"), "w") as f:
            f.write(build_pom_released % (released_version, released_artifact_hash))
 
-    def _mocked_mvn_install_info(self, maven_install_name):
+    def _mocked_mvn_install_info(self, *maven_install_names):
         mii = maveninstallinfo.MavenInstallInfo(())
-        mii.get_maven_install_names_and_paths = lambda r: [(maven_install_name, "some/repo/path",)]
+        mii.get_maven_install_names_and_paths = lambda r: [(n, "some/repo/path",) for n in maven_install_names]
         return mii
 
     def _write_build_file(self, repo_root_path, package_rel_path, neverlink_attr_enabled = False):